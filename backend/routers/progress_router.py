@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import os
+import json
+import logging
+
+from services.progress_service import get_progress_hub
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["job-progress"])
+
+# Seconds between keepalive comments on idle streams, so proxies keep them open
+KEEPALIVE_SECONDS = float(os.getenv("PROGRESS_KEEPALIVE_SECONDS", "15"))
+
+
+def format_sse_event(state: dict) -> str:
+    """Format a job state as a Server-Sent Events message"""
+    return f"id: {state['seq']}\nevent: {state['event']}\ndata: {json.dumps(state, default=str)}\n\n"
+
+
+@router.get("/{job_id}/progress")
+async def get_job_progress(job_id: str):
+    """Latest progress of a job"""
+    state = get_progress_hub().get_state(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No progress recorded for job {job_id}")
+    return state
+
+
+@router.get("/{job_id}/events")
+async def stream_job_progress(job_id: str, request: Request):
+    """Stream a job's progress as Server-Sent Events, starting with its latest state"""
+    async def events():
+        async for state in get_progress_hub().subscribe(job_id, keepalive=KEEPALIVE_SECONDS):
+            if await request.is_disconnected():
+                logger.info(f"Progress stream client disconnected for job {job_id}")
+                return
+            yield ": keepalive\n\n" if state is None else format_sse_event(state)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
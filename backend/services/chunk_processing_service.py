@@ -0,0 +1,279 @@
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Sized, Tuple
+
+from models.tradeline_models import DocumentAIResult
+from .enhanced_extraction_service import EnhancedExtractionService, TradelineStream
+from .progress_service import ProgressHub, get_progress_hub
+
+logger = logging.getLogger(__name__)
+
+# Process-wide cap on in-flight Document AI chunk requests, shared by all jobs. asyncio
+# primitives belong to one event loop, so each running loop gets its own semaphore.
+_global_chunk_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+    weakref.WeakKeyDictionary()
+_global_chunk_semaphore_lock = threading.Lock()
+
+
+def get_global_chunk_semaphore() -> asyncio.Semaphore:
+    """Return the running loop's chunk semaphore (DOCUMENT_AI_MAX_CONCURRENCY, default 8)"""
+    loop = asyncio.get_running_loop()
+    with _global_chunk_semaphore_lock:
+        semaphore = _global_chunk_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _global_chunk_semaphores[loop] = asyncio.Semaphore(
+                int(os.getenv("DOCUMENT_AI_MAX_CONCURRENCY", "8"))
+            )
+        return semaphore
+
+
+class ChunkProcessingService:
+    """Sends PDF chunks to Document AI concurrently and collects their results"""
+
+    def __init__(self, document_ai: Any, storage: Any, progress_hub: ProgressHub = None,
+                 max_concurrent_chunks: int = 4):
+        self.document_ai = document_ai
+        self.storage = storage
+        self.progress_hub = progress_hub or get_progress_hub()
+        self.max_concurrent_chunks = max_concurrent_chunks
+
+    async def process_chunks(self, job_id: str, filename: str, pdf_chunks: Iterable[Dict[str, Any]],
+                             on_chunk_result: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+                             ) -> List[Dict[str, Any]]:
+        """
+        Process PDF chunks with Document AI concurrently
+
+        At most max_concurrent_chunks chunks of this job are in flight at once, and all
+        jobs together are capped by the process-wide semaphore. Failed chunks are
+        skipped; results keep the original chunk order.
+
+        pdf_chunks may be a list or a lazy iterator such as PDFChunkingService.iter_chunks.
+        A chunk is only pulled, and its bytes serialized in a worker thread, once one of
+        the job's slots is free, so at most max_concurrent_chunks serialized chunks are
+        held at a time and an iterator's source PDF is closed right after the last one.
+
+        on_chunk_result, if given, is awaited with each successful result in chunk order
+        as soon as that chunk and every chunk before it have finished, so consumers can
+        start on the first pages while later chunks are still in flight.
+        """
+        job_semaphore = asyncio.Semaphore(self.max_concurrent_chunks)
+        chunk_iterator = iter(pdf_chunks)
+        total_chunks = len(pdf_chunks) if isinstance(pdf_chunks, Sized) else None
+        finished = {'completed': 0, 'failed': 0}
+        outcomes: Dict[int, Optional[Dict[str, Any]]] = {}
+        released = {'next': 0}
+        release_lock = asyncio.Lock()
+
+        async def release_in_order() -> None:
+            async with release_lock:
+                while released['next'] in outcomes:
+                    result = outcomes.pop(released['next'])
+                    released['next'] += 1
+                    if result is not None:
+                        await on_chunk_result(result)
+
+        async def process_and_report(i: int, chunk: Dict[str, Any], chunk_data: Any) -> Optional[Dict[str, Any]]:
+            try:
+                result = await self._process_chunk(job_id, filename, i, chunk, chunk_data, total_chunks)
+            finally:
+                job_semaphore.release()
+            finished['completed' if result is not None else 'failed'] += 1
+            self.progress_hub.publish(
+                job_id, 'chunk_completed' if result is not None else 'chunk_failed',
+                stage='document_ai', stage_progress=sum(finished.values()) / total_chunks,
+                chunk=i, chunks_completed=finished['completed'], chunks_failed=finished['failed']
+            )
+            if on_chunk_result is not None:
+                outcomes[i] = result
+                await release_in_order()
+            return result
+
+        tasks = []
+        try:
+            while True:
+                await job_semaphore.acquire()
+                pulled = await asyncio.to_thread(self._pull_chunk, chunk_iterator)
+                if pulled is None:
+                    job_semaphore.release()
+                    break
+                chunk, chunk_data = pulled
+                if not tasks:
+                    total_chunks = total_chunks or chunk.get('chunks_total', 1)
+                    self.progress_hub.publish(job_id, 'stage_started', stage='document_ai',
+                                              chunks_total=total_chunks, chunks_completed=0, chunks_failed=0)
+                tasks.append(asyncio.create_task(process_and_report(len(tasks), chunk, chunk_data)))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        chunk_outcomes = await asyncio.gather(*tasks)
+        return [result for result in chunk_outcomes if result is not None]
+
+    @staticmethod
+    def _pull_chunk(chunk_iterator: Iterator[Dict[str, Any]]) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """Next chunk and its serialized bytes (or the serialization error), None when exhausted"""
+        chunk = next(chunk_iterator, None)
+        if chunk is None:
+            return None
+        try:
+            return chunk, chunk['chunk_data']
+        except Exception as e:
+            return chunk, e
+
+    async def _process_chunk(self, job_id: str, filename: str, i: int, chunk: Dict[str, Any],
+                             chunk_data: Any, total_chunks: int) -> Optional[Dict[str, Any]]:
+        """Process one PDF chunk with Document AI; returns None if the chunk failed"""
+        chunk_result = None
+        async with get_global_chunk_semaphore():
+            logger.info(f"Processing chunk {i+1}/{total_chunks} for job {job_id} "
+                       f"(pages {chunk['page_range']['start']}-{chunk['page_range']['end']})")
+
+            try:
+                if isinstance(chunk_data, Exception):
+                    raise chunk_data
+
+                # Process chunk with Document AI
+                chunk_ai_result = await self.document_ai.process_document(
+                    chunk_data,
+                    f"{filename}_chunk_{i+1}"
+                )
+                chunk_ai_result.job_id = f"{job_id}_chunk_{i}"
+
+                # Extract structured data for this chunk
+                chunk_tables = self.extract_tables(chunk_ai_result)
+                chunk_text_content = self.extract_text(chunk_ai_result)
+
+                # Store chunk results
+                chunk_result = {
+                    'job_id': job_id,
+                    'chunk_id': i,
+                    'chunk_info': dict(chunk),  # metadata only; drops the view's reference to the source PDF
+                    'document_type': chunk_ai_result.document_type.value if hasattr(chunk_ai_result, 'document_type') else 'unknown',
+                    'processing_time': chunk_ai_result.processing_time if hasattr(chunk_ai_result, 'processing_time') else 0,
+                    'confidence_score': chunk_ai_result.confidence_score if hasattr(chunk_ai_result, 'confidence_score') else 0,
+                    'raw_text': chunk_text_content.get('raw_text', ''),
+                    'tables': chunk_tables,
+                    'text_blocks': chunk_text_content.get('text_blocks', []),
+                    'total_pages': chunk['total_pages'],
+                    'metadata': chunk_ai_result.metadata if hasattr(chunk_ai_result, 'metadata') else {}
+                }
+
+                # Store individual chunk results for debugging/reference
+                await self.storage.store_chunk_ai_results(job_id, i, chunk_result)
+
+                logger.info(f"Completed processing chunk {i+1}/{total_chunks} for job {job_id}")
+
+            except Exception as chunk_error:
+                logger.error(f"Error processing chunk {i+1} for job {job_id}: {str(chunk_error)}")
+                # Continue with other chunks even if one fails
+
+        return chunk_result
+
+    @staticmethod
+    def extract_tables(ai_result: DocumentAIResult) -> List[Dict[str, Any]]:
+        """Extract and format tables from AI result"""
+        formatted_tables = []
+
+        for table in ai_result.tables:
+            formatted_table = {
+                'table_id': table.table_id,
+                'headers': table.headers,
+                'rows': table.rows,
+                'confidence': table.confidence,
+                'page_number': table.page_number,
+                'row_count': len(table.rows),
+                'column_count': len(table.headers),
+                'bounding_box': table.bounding_box
+            }
+            formatted_tables.append(formatted_table)
+
+        logger.info(f"Extracted {len(formatted_tables)} tables")
+        return formatted_tables
+
+    @staticmethod
+    def extract_text(ai_result: DocumentAIResult) -> Dict[str, Any]:
+        """Extract and format text content from AI result"""
+        text_data = {
+            'raw_text': ai_result.raw_text,
+            'text_blocks': [],
+            'total_confidence': ai_result.confidence_score,
+            'page_count': ai_result.total_pages
+        }
+
+        for block in ai_result.text_blocks:
+            text_block = {
+                'content': block.content,
+                'page_number': block.page_number,
+                'confidence': block.confidence,
+                'word_count': len(block.content.split()),
+                'bounding_box': block.bounding_box
+            }
+            text_data['text_blocks'].append(text_block)
+
+        logger.info(f"Extracted text from {len(text_data['text_blocks'])} blocks")
+        return text_data
+
+
+class ChunkTradelineStream:
+    """
+    Regex tradelines streamed out of Document AI chunk results as their pages arrive
+
+    Pass add_chunk as process_chunks' on_chunk_result: each chunk's pages are fed to a
+    TradelineStream in a worker thread and the tradelines whose sections closed are
+    published as a 'tradelines_found' progress event while later chunks are still being
+    processed. The bureau is detected from the first chunk. These are early regex
+    results for display; the saved tradelines still come from the LLM stage, which
+    needs the whole document. Streaming is best effort: an error ends the stream, not
+    the job.
+    """
+
+    def __init__(self, job_id: str, extraction: EnhancedExtractionService, bureau_detector: Any,
+                 progress_hub: ProgressHub = None):
+        self.job_id = job_id
+        self.extraction = extraction
+        self.bureau_detector = bureau_detector
+        self.progress_hub = progress_hub or get_progress_hub()
+        self.tradelines: List[Dict[str, Any]] = []
+        self._stream: Optional[TradelineStream] = None
+        self._failed = False
+
+    def _feed_pages(self, pages: List[str]) -> List[Dict[str, Any]]:
+        if self._stream is None:
+            bureau, confidence, _ = self.bureau_detector.detect_credit_bureau(pages[0] if pages else '')
+            self._stream = TradelineStream(self.extraction, bureau if confidence >= 0.5 else "Unknown")
+        tradelines = []
+        for page_text in pages:
+            tradelines.extend(self._stream.feed(page_text))
+        return tradelines
+
+    def _close(self) -> List[Dict[str, Any]]:
+        return self._stream.close() if self._stream is not None else []
+
+    async def _run(self, step: Callable[..., List[Dict[str, Any]]], *args: Any) -> None:
+        if self._failed:
+            return
+        try:
+            tradelines = await asyncio.to_thread(step, *args)
+        except Exception as e:
+            logger.error(f"Tradeline streaming stopped for job {self.job_id}: {str(e)}")
+            self._failed = True
+            return
+        if tradelines:
+            self.tradelines.extend(tradelines)
+            self.progress_hub.publish(self.job_id, 'tradelines_found', new_tradelines=tradelines,
+                                      tradelines_found=len(self.tradelines))
+
+    async def add_chunk(self, chunk_result: Dict[str, Any]) -> None:
+        """Feed the next chunk's pages (chunks must arrive in page order)"""
+        pages = [block['content'] for block in chunk_result.get('text_blocks', [])]
+        await self._run(self._feed_pages, pages or [chunk_result.get('raw_text', '')])
+
+    async def finish(self) -> List[Dict[str, Any]]:
+        """Extract the last open section; returns every streamed tradeline"""
+        await self._run(self._close)
+        logger.info(f"Streamed {len(self.tradelines)} tradelines for job {self.job_id}")
+        return self.tradelines
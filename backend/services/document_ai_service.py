@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Iterator, Optional, Tuple
 from datetime import datetime
 from enum import Enum
 
@@ -136,66 +136,56 @@ class DocumentAIService:
         
         return tables
 
+    def iter_pdf_pages(self, content: bytes) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, page_text) one page at a time without building the full text"""
+        import PyPDF2
+        import io
+        
+        reader = PyPDF2.PdfReader(io.BytesIO(content))
+        for page_num, page in enumerate(reader.pages, 1):
+            yield page_num, page.extract_text() or ""
+
     async def _process_pdf(self, content: bytes, file_name: str) -> DocumentAIResult:
         """Process PDF document - NOW ACTUALLY PROCESSES THE PDF"""
         try:
-            import PyPDF2
-            import io
-            import tempfile
-            import os
-            
-            # Create temporary file from bytes
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-                temp_file.write(content)
-                temp_file_path = temp_file.name
+            page_texts = []
+            text_blocks = []
             
-            try:
-                # Extract text using PyPDF2
-                with open(temp_file_path, 'rb') as file:
-                    reader = PyPDF2.PdfReader(file)
-                    raw_text = ""
-                    text_blocks = []
-                    
-                    for page_num, page in enumerate(reader.pages, 1):
-                        page_text = page.extract_text()
-                        raw_text += page_text + "\n"
-                        
-                        # Create text block for each page
-                        if page_text.strip():
-                            text_blocks.append(ExtractedText(
-                                content=page_text,
-                                page_number=page_num,
-                                confidence=0.85,  # Lower confidence for PyPDF2 vs real Document AI
-                                bounding_box={"x": 0, "y": 0, "width": 612, "height": 792}
-                            ))
-                
-                # Extract structured data from text
-                tables = self._extract_tables_from_text(raw_text)
+            # Extract text page by page using PyPDF2
+            for page_num, page_text in self.iter_pdf_pages(content):
+                page_texts.append(page_text)
                 
-                logger.info(f"✅ PDF processing completed: {len(text_blocks)} pages, {len(tables)} tables")
-                
-                return DocumentAIResult(
-                    job_id="",  # Will be set by caller
-                    document_type=DocumentType.PDF,
-                    total_pages=len(reader.pages),
-                    tables=tables,
-                    text_blocks=text_blocks,
-                    raw_text=raw_text,
-                    metadata={
-                        "file_name": file_name,
-                        "file_size": len(content),
-                        "processing_method": "pypdf2_extraction"
-                    },
-                    processing_time=0.0,
-                    confidence_score=0.85
-                )
-                
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_file_path)
-                except:
-                    pass
+                # Create text block for each page
+                if page_text.strip():
+                    text_blocks.append(ExtractedText(
+                        content=page_text,
+                        page_number=page_num,
+                        confidence=0.85,  # Lower confidence for PyPDF2 vs real Document AI
+                        bounding_box={"x": 0, "y": 0, "width": 612, "height": 792}
+                    ))
+            
+            raw_text = "".join(f"{page_text}\n" for page_text in page_texts)
+            
+            # Extract structured data from text
+            tables = self._extract_tables_from_text(raw_text)
+            
+            logger.info(f"✅ PDF processing completed: {len(text_blocks)} pages, {len(tables)} tables")
+            
+            return DocumentAIResult(
+                job_id="",  # Will be set by caller
+                document_type=DocumentType.PDF,
+                total_pages=len(page_texts),
+                tables=tables,
+                text_blocks=text_blocks,
+                raw_text=raw_text,
+                metadata={
+                    "file_name": file_name,
+                    "file_size": len(content),
+                    "processing_method": "pypdf2_extraction"
+                },
+                processing_time=0.0,
+                confidence_score=0.85
+            )
                     
         except Exception as e:
             logger.error(f"❌ PDF processing failed: {str(e)}")
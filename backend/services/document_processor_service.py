@@ -1,5 +1,8 @@
+import os
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Any, Tuple
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 from datetime import datetime
 
 from .document_ai_service import DocumentAIService
@@ -7,8 +10,15 @@ from .storage_service import StorageService
 from .job_service import JobService
 from models.tradeline_models import ProcessingStatus, DocumentAIResult
 from .llm_parser_service import LLMParserService
+from .enhanced_extraction_service import shutdown_extraction_pool
+from .chunk_processing_service import ChunkProcessingService, ChunkTradelineStream
 from .ocr_service import OCRService
 from .pdf_chunking_service import PDFChunkingService
+from .result_cache_service import ResultCacheService
+from .job_queue_service import JobQueueService, PipelineWorkerPool, get_job_queue
+from .job_state_service import close_job_state_stores
+from .progress_service import ProgressHub, get_progress_hub
+from utils.llm_helpers import TokenCounter
 from ..enhanced_bureau_detection import EnhancedBureauDetector
 
 logger = logging.getLogger(__name__)
@@ -19,17 +29,50 @@ class DocumentProcessorService:
     def __init__(self, storage_service: StorageService, job_service: JobService,
                  document_ai_service: DocumentAIService = None, llm_parser: LLMParserService = None,
                  ocr_service: OCRService = None, chunking_service: PDFChunkingService = None,
-                 bureau_detector: EnhancedBureauDetector = None):
+                 bureau_detector: EnhancedBureauDetector = None, max_concurrent_chunks: int = 4,
+                 result_cache: ResultCacheService = None, supabase_client: Any = None,
+                 job_queue: JobQueueService = None, progress_hub: ProgressHub = None,
+                 use_job_queue: Optional[bool] = None):
         self.storage = storage_service
         self.job_service = job_service
         self.document_ai = document_ai_service or DocumentAIService()
-        self.llm_parser = llm_parser or LLMParserService(config=None) # config will be set by the caller
+        self.llm_parser = llm_parser or LLMParserService(config=None, supabase_client=supabase_client) # config will be set by the caller
         self.ocr_service = ocr_service or OCRService()
-        self.chunking_service = chunking_service or PDFChunkingService(max_pages_per_chunk=30)
+        self.chunking_service = chunking_service or PDFChunkingService(
+            max_pages_per_chunk=30,
+            max_tokens_per_chunk=int(os.getenv("CHUNK_MAX_TOKENS", "32000")) or None,
+            token_counter=TokenCounter()
+        )
         self.bureau_detector = bureau_detector or EnhancedBureauDetector()
+        self.max_concurrent_chunks = max_concurrent_chunks
+        self.result_cache = result_cache or ResultCacheService(self.storage.base_path / "cache")
+        self.supabase_client = supabase_client
+        self.job_queue = job_queue
+        self.progress_hub = progress_hub or get_progress_hub()
+        self.chunk_processor = ChunkProcessingService(self.document_ai, self.storage, self.progress_hub,
+                                                      max_concurrent_chunks)
+        # Jobs run inline unless PIPELINE_USE_QUEUE=true; queued jobs only run once the
+        # application has called start_workers() in at least one process
+        self.use_job_queue = (os.getenv("PIPELINE_USE_QUEUE", "false").lower() == "true"
+                              if use_job_queue is None else use_job_queue)
+        self._worker_pool: Optional[PipelineWorkerPool] = None
     
     async def document_ai_workflow(self, job_id: str) -> bool:
-        """Main workflow for Document AI processing phase with PDF chunking"""
+        """Start processing an uploaded job: queue it for the pipeline workers, or run it inline"""
+        if not self.use_job_queue:
+            return await self.run_document_workflow(job_id)
+        try:
+            await self.enqueue_document_job(job_id)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to queue job {job_id}: {str(e)}")
+            await self.job_service.update_job_status(job_id, ProcessingStatus.FAILED)
+            await self.job_service.update_job_error(job_id, str(e))
+            self.progress_hub.publish(job_id, 'failed', error=str(e))
+            return False
+    
+    async def run_document_workflow(self, job_id: str) -> bool:
+        """Main workflow for Document AI processing phase with PDF chunking, run in the caller"""
         try:
             logger.info(f"Starting Document AI workflow with PDF chunking for job {job_id}")
             
@@ -40,108 +83,40 @@ class DocumentProcessorService:
             file_content, file_metadata = await self.get_stored_file(job_id)
             filename = file_metadata.get('file_name', 'unknown')
             
-            # Step 1: Add OCR text layer to PDF using OCRmyPDF + Tesseract
-            logger.info(f"Adding OCR text layer to PDF for job {job_id}")
-            ocr_file_content, ocr_success = await self.ocr_service.add_ocr_layer(file_content, filename)
-            
-            if ocr_success:
-                logger.info(f"OCR processing successful for job {job_id}, using OCR'd PDF")
-                await self.storage.store_ocr_pdf(job_id, ocr_file_content)
-                processed_file_content = ocr_file_content
+            # Steps 1-3: OCR, chunking and Document AI, reused from the content cache when possible
+            file_hash = file_metadata.get('file_hash') or hashlib.sha256(file_content).hexdigest()
+            chunk_results = await self.result_cache.get_json(file_hash, 'chunk_results')
+            if chunk_results:
+                logger.info(f"Reusing cached Document AI results for job {job_id}")
+                chunk_results = [{**result, 'job_id': job_id} for result in chunk_results]
+                self.progress_hub.publish(job_id, 'stage_completed', stage='document_ai', stage_progress=1.0, cached=True)
             else:
-                logger.warning(f"OCR processing failed for job {job_id}, using original PDF")
-                processed_file_content = file_content
-            
-            # Step 2: Split PDF into chunks (≤30 pages each)
-            logger.info(f"Splitting PDF into chunks for job {job_id}")
-            pdf_chunks = await self.chunking_service.split_pdf(processed_file_content, filename)
-            logger.info(f"Split PDF into {len(pdf_chunks)} chunk(s) for job {job_id}")
-            
-            # Step 3: Process each chunk with Document AI
-            chunk_results = []
-            for i, chunk in enumerate(pdf_chunks):
-                logger.info(f"Processing chunk {i+1}/{len(pdf_chunks)} for job {job_id} "
-                           f"(pages {chunk['page_range']['start']}-{chunk['page_range']['end']})")
-                
-                try:
-                    # Process chunk with Document AI
-                    chunk_ai_result = await self.document_ai.process_document(
-                        chunk['chunk_data'], 
-                        f"{filename}_chunk_{i+1}"
-                    )
-                    chunk_ai_result.job_id = f"{job_id}_chunk_{i}"
-                    
-                    # Extract structured data for this chunk
-                    chunk_tables = self.extract_tables(chunk_ai_result)
-                    chunk_text_content = self.extract_text(chunk_ai_result)
-                    
-                    # Store chunk results
-                    chunk_result = {
-                        'job_id': job_id,
-                        'chunk_id': i,
-                        'chunk_info': chunk,
-                        'document_type': chunk_ai_result.document_type.value if hasattr(chunk_ai_result, 'document_type') else 'unknown',
-                        'processing_time': chunk_ai_result.processing_time if hasattr(chunk_ai_result, 'processing_time') else 0,
-                        'confidence_score': chunk_ai_result.confidence_score if hasattr(chunk_ai_result, 'confidence_score') else 0,
-                        'raw_text': chunk_text_content.get('raw_text', ''),
-                        'tables': chunk_tables,
-                        'text_blocks': chunk_text_content.get('text_blocks', []),
-                        'total_pages': chunk['total_pages'],
-                        'metadata': chunk_ai_result.metadata if hasattr(chunk_ai_result, 'metadata') else {}
-                    }
-                    
-                    chunk_results.append(chunk_result)
-                    
-                    # Store individual chunk results for debugging/reference
-                    await self.storage.store_chunk_ai_results(job_id, i, chunk_result)
-                    
-                    logger.info(f"Completed processing chunk {i+1}/{len(pdf_chunks)} for job {job_id}")
-                    
-                except Exception as chunk_error:
-                    logger.error(f"Error processing chunk {i+1} for job {job_id}: {str(chunk_error)}")
-                    # Continue with other chunks even if one fails
-                    continue
+                chunk_results = await self._run_document_ai_stages(job_id, file_content, filename, file_hash)
             
             if not chunk_results:
                 raise Exception("Failed to process any PDF chunks successfully")
             
-            # Step 4: Combine results from all chunks
-            logger.info(f"Combining results from {len(chunk_results)} chunks for job {job_id}")
-            combined_result = await self.chunking_service.combine_chunk_results(chunk_results, filename)
-            
-            # Step 5: Detect credit bureau from combined text
-            raw_text = combined_result.get('raw_text', '')
-            detected_bureau = await self._detect_credit_bureau(raw_text, job_id)
-            logger.info(f"Detected credit bureau: {detected_bureau} for job {job_id}")
-            
-            # Step 6: Extract and format final results with bureau info
-            final_tables = combined_result.get('tables', [])
-            final_text_content = {
-                'raw_text': raw_text,
-                'text_blocks': combined_result.get('text_blocks', []),
-                'total_confidence': combined_result.get('confidence_score', 0),
-                'page_count': combined_result.get('total_pages', 0),
-                'detected_bureau': detected_bureau
-            }
-            
-            # Create a mock AI result object for compatibility
-            mock_ai_result = type('MockAIResult', (), {
-                'job_id': job_id,
-                'document_type': type('DocumentType', (), {'value': combined_result.get('document_type', 'unknown')})(),
-                'processing_time': combined_result.get('processing_time', 0),
-                'confidence_score': combined_result.get('confidence_score', 0),
-                'total_pages': combined_result.get('total_pages', 0),
-                'metadata': combined_result.get('metadata', {})
-            })()
-            
-            # Store final combined results
-            await self.store_ai_results(job_id, mock_ai_result, final_tables, final_text_content)
+            # Steps 4-6: Combine chunk results, detect the bureau and store the final results
+            combined_result, final_tables, final_text_content = await self._store_combined_results(
+                job_id, chunk_results, filename
+            )
             
             # Update job status
             await self.job_service.update_job_status(job_id, ProcessingStatus.COMPLETED)
             
-            # Trigger LLM processing
-            await self.trigger_llm_processing(job_id)
+            # Trigger LLM processing unless the normalized tradelines are already cached; the
+            # cache holds only the normalization, so saving runs for this job's user either way
+            cached_llm_results = await self.result_cache.get_json(file_hash, 'llm_results')
+            if cached_llm_results:
+                logger.info(f"Reusing cached LLM results for job {job_id}, skipping LLM normalization")
+                await self.storage.store_llm_results(job_id, {**cached_llm_results, 'job_id': job_id})
+                await self.llm_parser.persist_job_results(job_id)
+            else:
+                await self.trigger_llm_processing(job_id)
+                llm_results = await self.storage.get_llm_results(job_id)
+                if llm_results:
+                    await self.result_cache.put_json(file_hash, 'llm_results', llm_results)
+            self.progress_hub.publish(job_id, 'completed')
             
             logger.info(f"Document AI workflow with chunking completed for job {job_id}: "
                        f"{len(final_tables)} tables, {len(final_text_content.get('text_blocks', []))} text blocks, "
@@ -152,8 +127,237 @@ class DocumentProcessorService:
             logger.error(f"Document AI workflow with chunking failed for job {job_id}: {str(e)}")
             await self.job_service.update_job_status(job_id, ProcessingStatus.FAILED)
             await self.job_service.update_job_error(job_id, str(e))
+            self.progress_hub.publish(job_id, 'failed', error=str(e))
             return False
     
+    # Queued pipeline: each stage runs as its own durable task (see JobQueueService)
+    
+    async def enqueue_document_job(self, job_id: str) -> None:
+        """Queue a job on the durable pipeline instead of running it in the caller"""
+        await asyncio.to_thread((self.job_queue or get_job_queue()).enqueue, job_id)
+        self.progress_hub.publish(job_id, 'queued')
+    
+    def create_worker_pool(self, concurrency: Optional[int] = None) -> PipelineWorkerPool:
+        """Worker pool running this service's stage handlers (PIPELINE_WORKERS, default 4)"""
+        return PipelineWorkerPool(
+            self.job_queue or get_job_queue(),
+            handlers={
+                'ocr': self.run_ocr_stage,
+                'chunk': self.run_chunk_stage,
+                'document_ai': self.run_document_ai_stage,
+                'llm': self.run_llm_stage,
+                'persist': self.run_persist_stage
+            },
+            concurrency=concurrency or int(os.getenv("PIPELINE_WORKERS", "4")),
+            on_job_failed=self._fail_queued_job
+        )
+    
+    async def start_workers(self, concurrency: Optional[int] = None) -> PipelineWorkerPool:
+        """Start this process's pipeline workers (call from application startup)"""
+        if self._worker_pool is None:
+            self._worker_pool = self.create_worker_pool(concurrency)
+            await self._worker_pool.start()
+        return self._worker_pool
+    
+    async def shutdown(self) -> None:
+        """Stop the pipeline workers and close shared connections (call from application shutdown)"""
+        if self._worker_pool is not None:
+            await self._worker_pool.stop()
+            self._worker_pool = None
+        await asyncio.to_thread(shutdown_extraction_pool)
+        close_job_state_stores()
+        if self.supabase_client is None:
+            # Only the process-wide pool is ours to close; an injected client belongs to the caller
+            from .supabase_client_service import close_supabase_pool
+            close_supabase_pool()
+    
+    async def _get_job_file(self, job_id: str) -> Tuple[bytes, str, str]:
+        """Uploaded file content, filename and content hash of a job"""
+        file_content, file_metadata = await self.get_stored_file(job_id)
+        file_hash = file_metadata.get('file_hash') or hashlib.sha256(file_content).hexdigest()
+        return file_content, file_metadata.get('file_name', 'unknown'), file_hash
+    
+    async def _get_processed_file(self, job_id: str, file_content: bytes) -> bytes:
+        """The job's OCR'd PDF if the OCR stage produced one, else the original upload"""
+        ocr_pdf = await self.storage.get_ocr_pdf(job_id)
+        return ocr_pdf['content'] if ocr_pdf else file_content
+    
+    async def run_ocr_stage(self, job_id: str) -> None:
+        """Stage 1: add the OCR text layer (nothing to do if Document AI results are cached)"""
+        await self.job_service.update_job_status(job_id, ProcessingStatus.PROCESSING)
+        file_content, filename, file_hash = await self._get_job_file(job_id)
+        if await self.result_cache.get_json(file_hash, 'chunk_results'):
+            return
+        self.progress_hub.publish(job_id, 'stage_started', stage='ocr')
+        await self._add_ocr_layer(job_id, file_content, filename, file_hash)
+    
+    async def run_chunk_stage(self, job_id: str) -> None:
+        """Stage 2: plan chunk page ranges and store the plan (chunk bytes are rebuilt later)"""
+        file_content, filename, file_hash = await self._get_job_file(job_id)
+        if await self.result_cache.get_json(file_hash, 'chunk_results'):
+            return
+        processed_file_content = await self._get_processed_file(job_id, file_content)
+        self.progress_hub.publish(job_id, 'stage_started', stage='chunk')
+        pdf_chunks = await self.chunking_service.split_pdf(processed_file_content, filename)
+        await self.result_cache.put_json(file_hash, 'chunk_plan', [dict(chunk) for chunk in pdf_chunks])
+        self.progress_hub.publish(job_id, 'stage_completed', stage='chunk', stage_progress=1.0,
+                                  chunks_total=len(pdf_chunks))
+        logger.info(f"Planned {len(pdf_chunks)} chunk(s) for job {job_id}")
+    
+    async def run_document_ai_stage(self, job_id: str) -> None:
+        """Stage 3: process the planned chunks with Document AI and store the combined results"""
+        file_content, filename, file_hash = await self._get_job_file(job_id)
+        chunk_results = await self.result_cache.get_json(file_hash, 'chunk_results')
+        if chunk_results:
+            logger.info(f"Reusing cached Document AI results for job {job_id}")
+            chunk_results = [{**result, 'chunk_info': dict(result['chunk_info']), 'job_id': job_id}
+                             for result in chunk_results]
+            self.progress_hub.publish(job_id, 'stage_completed', stage='document_ai', stage_progress=1.0, cached=True)
+        else:
+            processed_file_content = await self._get_processed_file(job_id, file_content)
+            chunk_plan = await self.result_cache.get_json(file_hash, 'chunk_plan')
+            if chunk_plan:
+                with self.chunking_service.open_source(processed_file_content) as source:
+                    pdf_chunks = self.chunking_service.chunks_from_plan(source, chunk_plan, filename)
+                    chunk_results = await self.process_chunks(job_id, filename, pdf_chunks)
+            else:
+                pdf_chunks = self.chunking_service.iter_chunks(processed_file_content, filename)
+                chunk_results = await self.process_chunks(job_id, filename, pdf_chunks)
+            await self._cache_chunk_results(file_hash, chunk_results)
+        
+        if not chunk_results:
+            raise Exception("Failed to process any PDF chunks successfully")
+        await self._store_combined_results(job_id, chunk_results, filename)
+    
+    async def run_llm_stage(self, job_id: str) -> None:
+        """Stage 4: normalize tradelines with the LLM and store the results"""
+        _, _, file_hash = await self._get_job_file(job_id)
+        cached_llm_results = await self.result_cache.get_json(file_hash, 'llm_results')
+        if cached_llm_results:
+            logger.info(f"Reusing cached LLM results for job {job_id}, skipping LLM processing")
+            await self.storage.store_llm_results(job_id, {**cached_llm_results, 'job_id': job_id})
+            return
+        await self.llm_parser.normalize_document_job(job_id)
+        llm_results = await self.storage.get_llm_results(job_id)
+        if llm_results:
+            await self.result_cache.put_json(file_hash, 'llm_results', llm_results)
+    
+    async def run_persist_stage(self, job_id: str) -> None:
+        """Stage 5: validate, deduplicate and save the job's tradelines"""
+        await self.llm_parser.persist_job_results(job_id, raise_errors=True)
+        await self.job_service.update_job_status(job_id, ProcessingStatus.COMPLETED)
+        self.progress_hub.publish(job_id, 'completed')
+    
+    async def _fail_queued_job(self, job_id: str, stage: str, error: str) -> None:
+        """Mark a queued job failed once a stage has used up its retries"""
+        await self.job_service.update_job_status(job_id, ProcessingStatus.FAILED, f"{stage}: {error}")
+        self.progress_hub.publish(job_id, 'failed', stage=stage, error=f"{stage}: {error}")
+    
+    async def _run_document_ai_stages(self, job_id: str, file_content: bytes, filename: str,
+                                      file_hash: str) -> List[Dict[str, Any]]:
+        """Run OCR, chunking and Document AI for an uncached file and cache the outputs"""
+        # Step 1: Add OCR text layer to PDF using OCRmyPDF + Tesseract
+        self.progress_hub.publish(job_id, 'stage_started', stage='ocr')
+        processed_file_content = await self._add_ocr_layer(job_id, file_content, filename, file_hash)
+        
+        # Step 2-3: Split PDF into chunks (≤30 pages each, balanced by estimated tokens) and
+        # process them with Document AI concurrently; chunks are pulled and serialized lazily
+        logger.info(f"Splitting PDF into chunks for job {job_id}")
+        self.progress_hub.publish(job_id, 'stage_started', stage='chunk')
+        pdf_chunks = self.chunking_service.iter_chunks(processed_file_content, filename)
+        chunk_results = await self.process_chunks(job_id, filename, pdf_chunks)
+        
+        await self._cache_chunk_results(file_hash, chunk_results)
+        return chunk_results
+    
+    async def _store_combined_results(self, job_id: str, chunk_results: List[Dict[str, Any]],
+                                      filename: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+        """Combine chunk results, detect the credit bureau and store the AI results and LLM input"""
+        # Step 4: Combine results from all chunks
+        logger.info(f"Combining results from {len(chunk_results)} chunks for job {job_id}")
+        combined_result = await self.chunking_service.combine_chunk_results(chunk_results, filename)
+        
+        # Step 5: Detect credit bureau from combined text
+        raw_text = combined_result.get('raw_text', '')
+        detected_bureau = await self._detect_credit_bureau(raw_text, job_id)
+        logger.info(f"Detected credit bureau: {detected_bureau} for job {job_id}")
+        
+        # Step 6: Extract and format final results with bureau info
+        final_tables = combined_result.get('tables', [])
+        final_text_content = {
+            'raw_text': raw_text,
+            'text_blocks': combined_result.get('text_blocks', []),
+            'total_confidence': combined_result.get('confidence_score', 0),
+            'page_count': combined_result.get('total_pages', 0),
+            'detected_bureau': detected_bureau
+        }
+        
+        # Create a mock AI result object for compatibility
+        mock_ai_result = type('MockAIResult', (), {
+            'job_id': job_id,
+            'document_type': type('DocumentType', (), {'value': combined_result.get('document_type', 'unknown')})(),
+            'processing_time': combined_result.get('processing_time', 0),
+            'confidence_score': combined_result.get('confidence_score', 0),
+            'total_pages': combined_result.get('total_pages', 0),
+            'metadata': combined_result.get('metadata', {})
+        })()
+        
+        # Store final combined results
+        await self.store_ai_results(job_id, mock_ai_result, final_tables, final_text_content)
+        self.progress_hub.publish(
+            job_id, 'document_ai_completed', stage='document_ai', stage_progress=1.0,
+            tables_extracted=len(final_tables),
+            processing_time=mock_ai_result.processing_time,
+            confidence_score=mock_ai_result.confidence_score,
+            detected_bureau=detected_bureau
+        )
+        return combined_result, final_tables, final_text_content
+    
+    async def _add_ocr_layer(self, job_id: str, file_content: bytes, filename: str, file_hash: str) -> bytes:
+        """Add an OCR text layer (reusing the content cache); returns the PDF to process"""
+        ocr_file_content = await self.result_cache.get_bytes(file_hash, 'ocr_pdf')
+        ocr_success = ocr_file_content is not None
+        if ocr_success:
+            logger.info(f"Reusing cached OCR PDF for job {job_id}")
+        else:
+            logger.info(f"Adding OCR text layer to PDF for job {job_id}")
+            ocr_file_content, ocr_success = await self.ocr_service.add_ocr_layer(file_content, filename)
+            if ocr_success:
+                await self.result_cache.put_bytes(file_hash, 'ocr_pdf', ocr_file_content)
+        
+        if ocr_success:
+            logger.info(f"OCR processing successful for job {job_id}, using OCR'd PDF")
+            await self.storage.store_ocr_pdf(job_id, ocr_file_content)
+            processed_file_content = ocr_file_content
+        else:
+            logger.warning(f"OCR processing failed for job {job_id}, using original PDF")
+            processed_file_content = file_content
+        return processed_file_content
+    
+    async def _cache_chunk_results(self, file_hash: str, chunk_results: List[Dict[str, Any]]) -> None:
+        """Cache chunk results by file hash for later jobs on the same file"""
+        if chunk_results:
+            # Chunk PDF bytes are not needed downstream and are not JSON-serializable
+            await self.result_cache.put_json(file_hash, 'chunk_results', [
+                {**result, 'chunk_info': {k: v for k, v in result['chunk_info'].items() if k != 'chunk_data'}}
+                for result in chunk_results
+            ])
+    
+    async def process_chunks(self, job_id: str, filename: str,
+                             pdf_chunks: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Process PDF chunks with Document AI concurrently (see ChunkProcessingService)
+        
+        Regex tradelines are streamed from the chunks' pages as they arrive and published
+        as 'tradelines_found' progress events, ahead of the LLM stage.
+        """
+        tradeline_stream = ChunkTradelineStream(job_id, self.llm_parser.enhanced_extraction,
+                                                self.bureau_detector, self.progress_hub)
+        chunk_results = await self.chunk_processor.process_chunks(job_id, filename, pdf_chunks,
+                                                                  tradeline_stream.add_chunk)
+        await tradeline_stream.finish()
+        return chunk_results
+    
     async def get_stored_file(self, job_id: str) -> Tuple[bytes, Dict[str, Any]]:
         """Retrieve uploaded file from storage"""
         try:
@@ -165,45 +369,11 @@ class DocumentProcessorService:
     
     def extract_tables(self, ai_result: DocumentAIResult) -> List[Dict[str, Any]]:
         """Extract and format tables from AI result"""
-        formatted_tables = []
-        
-        for table in ai_result.tables:
-            formatted_table = {
-                'table_id': table.table_id,
-                'headers': table.headers,
-                'rows': table.rows,
-                'confidence': table.confidence,
-                'page_number': table.page_number,
-                'row_count': len(table.rows),
-                'column_count': len(table.headers),
-                'bounding_box': table.bounding_box
-            }
-            formatted_tables.append(formatted_table)
-        
-        logger.info(f"Extracted {len(formatted_tables)} tables")
-        return formatted_tables
+        return ChunkProcessingService.extract_tables(ai_result)
     
     def extract_text(self, ai_result: DocumentAIResult) -> Dict[str, Any]:
         """Extract and format text content from AI result"""
-        text_data = {
-            'raw_text': ai_result.raw_text,
-            'text_blocks': [],
-            'total_confidence': ai_result.confidence_score,
-            'page_count': ai_result.total_pages
-        }
-        
-        for block in ai_result.text_blocks:
-            text_block = {
-                'content': block.content,
-                'page_number': block.page_number,
-                'confidence': block.confidence,
-                'word_count': len(block.content.split()),
-                'bounding_box': block.bounding_box
-            }
-            text_data['text_blocks'].append(text_block)
-        
-        logger.info(f"Extracted text from {len(text_data['text_blocks'])} blocks")
-        return text_data
+        return ChunkProcessingService.extract_text(ai_result)
     
     async def store_ai_results(self, job_id: str, ai_result: DocumentAIResult, 
                              tables: List[Dict], text_content: Dict) -> None:
@@ -254,20 +424,37 @@ class DocumentProcessorService:
             raise
     
     async def get_processing_status(self, job_id: str) -> Dict[str, Any]:
-        """Get current processing status for a job"""
+        """
+        Get current processing status for a job
+        
+        Progress comes from the in-memory progress hub; the stored Document AI results
+        are read only when the hub has no Document AI summary for the job (e.g. after a
+        restart), and the summary is then published so later polls skip the read.
+        """
         try:
-            job_status = await self.job_service.get_job_status(job_id)
-            ai_results = await self.storage.get_document_ai_results(job_id)
+            job_data = await self.storage.get_job_data(job_id) or {}
+            progress = self.progress_hub.get_state(job_id) or {}
+            if 'tables_extracted' not in progress:
+                ai_results = await self.storage.get_document_ai_results(job_id)
+                if ai_results:
+                    progress = self.progress_hub.publish(
+                        job_id, 'document_ai_completed', stage=None if progress.get('stage') else 'document_ai',
+                        stage_progress=1.0,
+                        tables_extracted=len(ai_results.get('tables', [])),
+                        processing_time=ai_results.get('processing_time'),
+                        confidence_score=ai_results.get('confidence_score')
+                    )
             
             return {
                 'job_id': job_id,
-                'status': job_status.get('status'),
-                'progress': job_status.get('progress', 0),
-                'ai_processing_complete': ai_results is not None,
-                'processing_time': ai_results.get('processing_time') if ai_results else None,
-                'confidence_score': ai_results.get('confidence_score') if ai_results else None,
-                'tables_extracted': len(ai_results.get('tables', [])) if ai_results else 0,
-                'error': job_status.get('error')
+                'status': job_data.get('status'),
+                'progress': progress.get('progress', 0),
+                'stage': progress.get('stage'),
+                'ai_processing_complete': 'tables_extracted' in progress,
+                'processing_time': progress.get('processing_time'),
+                'confidence_score': progress.get('confidence_score'),
+                'tables_extracted': progress.get('tables_extracted', 0),
+                'error': job_data.get('error_message')
             }
             
         except Exception as e:
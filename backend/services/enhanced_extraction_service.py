@@ -1,19 +1,163 @@
 import re
+import os
 import json
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 from decimal import Decimal
 
+from utils.field_scanner import FieldScanner, compile_patterns
+from utils.creditor_lexicon import load_creditor_lexicon
+
 logger = logging.getLogger(__name__)
 
+# Process pool shared by all service instances; workers hold a warm EnhancedExtractionService
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_extraction_pool_size = 0
+_extraction_pool_lock = threading.Lock()
+_worker_service: Optional['EnhancedExtractionService'] = None
+
+# Bureau-specific section boundaries
+BUREAU_SECTION_SPLITS = {
+    # TransUnion typically has clear separators
+    'transunion': re.compile(r'\n\n+|\n\s*(?=[A-Z][A-Z\s,&.]+(?:BANK|CARD|FINANCIAL|CREDIT|AUTO|LOAN))'),
+    # Experian often has tabular format
+    'experian': re.compile(r'\n\s*(?=[A-Z][A-Z\s]+\s+\*+\d+)'),
+    # Equifax has block format
+    'equifax': re.compile(r'\n\s*(?=[A-Z][A-Z\s&]+\s+Account)'),
+}
+BLANK_LINE_SPLIT = re.compile(r'\n\s*\n+')
+
+
+def _init_extraction_worker() -> None:
+    """Build the per-process service so compiled patterns and the lexicon are ready"""
+    global _worker_service
+    _worker_service = EnhancedExtractionService()
+
+
+def _warm_extraction_worker(_: int = 0) -> int:
+    return os.getpid()
+
+
+def _prepare_sections_in_worker(text: str, detected_bureau: str) -> List[str]:
+    corrected_text = _worker_service.fix_ocr_errors(text)
+    return _worker_service._split_into_tradeline_sections(corrected_text, detected_bureau)
+
+
+def _extract_sections_in_worker(sections: List[str],
+                                count_unrecognized_fields: bool = False) -> List[Tuple[Optional[Dict[str, Any]], int]]:
+    """(tradeline, field count) per section; fields are only counted for sections without a creditor"""
+    results = []
+    for section in sections:
+        tradeline = _worker_service._extract_tradeline_from_section(section)
+        field_count = 0
+        if count_unrecognized_fields and not (tradeline and tradeline.get('creditor_name')):
+            field_count = _worker_service._count_section_fields(section)
+        results.append((tradeline, field_count))
+    return results
+
+
+def get_extraction_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Return the process-wide extraction pool, creating and pre-warming it on first use"""
+    global _extraction_pool, _extraction_pool_size
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            return _extraction_pool
+        max_workers = max_workers or int(os.getenv("EXTRACTION_WORKERS", os.cpu_count() or 1))
+        pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_extraction_worker)
+        # Start every worker now so the first request doesn't pay for compilation
+        warm_pids = set(pool.map(_warm_extraction_worker, range(max_workers)))
+        logger.info(f"Started extraction pool with {max_workers} workers ({len(warm_pids)} warmed)")
+        _extraction_pool, _extraction_pool_size = pool, max_workers
+        return _extraction_pool
+
+
+def reset_extraction_pool(broken_pool: ProcessPoolExecutor) -> None:
+    """Discard a pool whose worker died so the next get_extraction_pool() starts a fresh one"""
+    global _extraction_pool, _extraction_pool_size
+    with _extraction_pool_lock:
+        if _extraction_pool is broken_pool:
+            _extraction_pool, _extraction_pool_size = None, 0
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+    logger.warning("Extraction pool broken (a worker process died), starting a new one")
+
+
+def shutdown_extraction_pool() -> None:
+    """Shut down the process-wide extraction pool (application shutdown hook)"""
+    global _extraction_pool, _extraction_pool_size
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(wait=True)
+            _extraction_pool, _extraction_pool_size = None, 0
+
+
+class TradelineStream:
+    """
+    Push-based page-by-page tradeline extraction
+    
+    Pages are fed in document order as they are parsed. Each page is appended to a small
+    buffer that is split with the same boundaries as _split_into_tradeline_sections;
+    every piece except the last is closed and extracted right away, and the last piece
+    is carried into the next page so sections straddling page (or chunk) boundaries stay
+    whole. A carried piece that spans more than max_window_pages pages without a
+    boundary is flushed to bound memory.
+    """
+    
+    def __init__(self, service: 'EnhancedExtractionService', detected_bureau: str = "Unknown",
+                 max_window_pages: int = 3):
+        self.service = service
+        self.bureau_split = BUREAU_SECTION_SPLITS.get(detected_bureau.lower())
+        self.max_window_pages = max_window_pages
+        self.tradelines_found = 0
+        self._carry = ''
+        self._carry_pages = 0
+    
+    def _extract(self, sections: List[str]) -> List[Dict[str, Any]]:
+        tradelines = []
+        for section in sections:
+            if not self.service._is_tradeline_section(section):
+                continue
+            tradeline = self.service._extract_tradeline_from_section(section.strip())
+            if not tradeline or not tradeline.get('creditor_name'):
+                continue
+            validated = self.service._validate_and_enhance_tradelines([tradeline])
+            if validated:
+                tradelines.append(validated[0])
+        self.tradelines_found += len(tradelines)
+        return tradelines
+    
+    def feed(self, page_text: str) -> List[Dict[str, Any]]:
+        """Add the next page; returns tradelines from the sections it closed"""
+        page_text = self.service.fix_ocr_errors(page_text)
+        buffer = f"{self._carry}\n{page_text}" if self._carry else page_text
+        pieces = self.bureau_split.split(buffer) if self.bureau_split else self.service._split_generic_sections(buffer)
+        self._carry = pieces.pop()
+        self._carry_pages = self._carry_pages + 1 if not pieces else 1
+        
+        if self._carry_pages > self.max_window_pages:
+            logger.debug(f"Flushing section spanning {self._carry_pages} pages without a boundary")
+            pieces.append(self._carry)
+            self._carry, self._carry_pages = '', 0
+        return self._extract(pieces)
+    
+    def close(self) -> List[Dict[str, Any]]:
+        """End of document; returns tradelines from the last open section"""
+        carry, self._carry, self._carry_pages = self._carry, '', 0
+        return self._extract([carry]) if carry else []
+
+
 class EnhancedExtractionService:
     """Enhanced service for extracting tradelines with improved accuracy and completeness"""
     
     def __init__(self):
         self.field_patterns = self._initialize_field_patterns()
-        self.creditor_patterns = self._initialize_creditor_patterns()
+        self.creditor_lexicon = load_creditor_lexicon()
         self.common_ocr_fixes = self._initialize_ocr_fixes()
+        self.field_scanner = FieldScanner(self.field_patterns)
         
     def _initialize_field_patterns(self) -> Dict[str, List[str]]:
         """Initialize comprehensive field detection patterns"""
@@ -81,77 +225,6 @@ class EnhancedExtractionService:
             ]
         }
     
-    def _initialize_creditor_patterns(self) -> List[str]:
-        """Initialize comprehensive creditor name patterns"""
-        return [
-            # Major Credit Cards - with variations
-            r'(CHASE|Chase|chase)(?:\s+(?:BANK|Bank|bank|CARD|Card|card))?',
-            r'(CAPITAL\s*ONE|Capital\s*One|capital\s*one)',
-            r'(AMERICAN\s*EXPRESS|American\s*Express|Amex|AMEX|amex)',
-            r'(BANK\s*OF\s*AMERICA|Bank\s*of\s*America|BOA|boa)',
-            r'(WELLS\s*FARGO|Wells\s*Fargo|wells\s*fargo)',
-            r'(CITI|Citi|citi|CITIBANK|Citibank|citibank)',
-            r'(DISCOVER|Discover|discover)',
-            r'(SYNCHRONY|Synchrony|synchrony)',
-            r'(BARCLAY|Barclays?|barclay)',
-            r'(US\s*BANK|US\s*Bank|us\s*bank)',
-            
-            # Store Cards - enhanced patterns
-            r'(AMAZON|Amazon|amazon)(?:\s+(?:STORE|store|CARD|card))?',
-            r'(TARGET|Target|target)(?:\s+(?:CARD|card))?',
-            r'(HOME\s*DEPOT|Home\s*Depot|HOMEDEPOT)',
-            r'(LOWES?|Lowe\'s|LOWE\'S|lowes?)',
-            r'(WALMART|Walmart|walmart)',
-            r'(COSTCO|Costco|costco)',
-            r'(NORDSTROM|Nordstrom|nordstrom)',
-            r'(MACY\'S|Macy\'s|macys)',
-            r'(KOHL\'S|Kohl\'s|kohls)',
-            r'(BEST\s*BUY|Best\s*Buy|bestbuy)',
-            
-            # Auto Loans - with financing variations
-            r'(FORD\s*(?:CREDIT|MOTOR\s*CREDIT)?|Ford\s*(?:Credit|Motor\s*Credit)?)',
-            r'(HONDA\s*(?:FINANCIAL|FINANCE)?|Honda\s*(?:Financial|Finance)?)',
-            r'(TOYOTA\s*(?:FINANCIAL|FINANCE)?|Toyota\s*(?:Financial|Finance)?)',
-            r'(NISSAN\s*(?:MOTOR|FINANCIAL)?|Nissan\s*(?:Motor|Financial)?)',
-            r'(GM\s*FINANCIAL|GM\s*Financial|gm\s*financial)',
-            r'(CHRYSLER\s*CAPITAL|Chrysler\s*Capital)',
-            r'(ALLY\s*(?:AUTO|FINANCIAL)?|Ally\s*(?:Auto|Financial)?)',
-            r'(SANTANDER|Santander|santander)',
-            
-            # Student Loans - with variations
-            r'(NAVIENT|Navient|navient)',
-            r'(GREAT\s*LAKES|Great\s*Lakes|great\s*lakes)',
-            r'(NELNET|Nelnet|nelnet)',
-            r'(FEDLOAN|FedLoan|fedloan)',
-            r'(MOHELA|MOHELA|mohela)',
-            r'(DEPT\.?\s*OF\s*EDUCATION|Department\s*of\s*Education)',
-            r'(STUDENT\s*LOAN|Student\s*Loan)',
-            
-            # Mortgage - with variations
-            r'(QUICKEN\s*LOANS|Quicken\s*Loans|ROCKET\s*MORTGAGE|Rocket\s*Mortgage)',
-            r'(FREEDOM\s*MORTGAGE|Freedom\s*Mortgage)',
-            r'(PENNYMAC|PennyMac|pennymac)',
-            r'(CALIBER|Caliber|caliber)',
-            r'(MORTGAGE|Mortgage|mortgage)',
-            
-            # Credit Unions
-            r'(NAVY\s*FEDERAL|Navy\s*Federal)',
-            r'(USAA|usaa)',
-            r'(PENTAGON\s*FCU|Pentagon\s*FCU)',
-            r'(CREDIT\s*UNION|Credit\s*Union)',
-            
-            # Fintech and Others
-            r'(PAYPAL|PayPal|paypal)',
-            r'(AFFIRM|Affirm|affirm)',
-            r'(KLARNA|Klarna|klarna)',
-            r'(SOFI|SoFi|sofi)',
-            r'(UPSTART|Upstart|upstart)',
-            r'(LENDING\s*CLUB|Lending\s*Club)',
-            r'(PROSPER|Prosper|prosper)',
-            r'(AVANT|Avant|avant)',
-            r'(ONEMAIN|OneMain|onemain)',
-        ]
-    
     def _initialize_ocr_fixes(self) -> Dict[str, str]:
         """Initialize common OCR error corrections"""
         return {
@@ -208,43 +281,165 @@ class EnhancedExtractionService:
         logger.info(f"Enhanced extraction completed: {len(validated_tradelines)} tradelines found")
         return validated_tradelines
     
+    async def _extract_sections_parallel(self, text: str, detected_bureau: str, min_sections_per_batch: int,
+                                         count_unrecognized_fields: bool = False
+                                         ) -> Tuple[List[str], List[Tuple[Optional[Dict[str, Any]], int]]]:
+        """
+        Split text into sections and extract each one in the process pool
+        
+        Returns (sections, results) with a (tradeline, field count) result per section;
+        see _extract_sections_in_worker.
+        """
+        loop = asyncio.get_running_loop()
+        pool = await loop.run_in_executor(None, get_extraction_pool)
+        try:
+            return await self._run_sections_in_pool(pool, text, detected_bureau, min_sections_per_batch,
+                                                    count_unrecognized_fields)
+        except BrokenProcessPool:
+            # A dead worker breaks the whole pool; replace it and retry once
+            reset_extraction_pool(pool)
+            pool = await loop.run_in_executor(None, get_extraction_pool)
+            return await self._run_sections_in_pool(pool, text, detected_bureau, min_sections_per_batch,
+                                                    count_unrecognized_fields)
+    
+    async def _run_sections_in_pool(self, pool: ProcessPoolExecutor, text: str, detected_bureau: str,
+                                    min_sections_per_batch: int, count_unrecognized_fields: bool
+                                    ) -> Tuple[List[str], List[Tuple[Optional[Dict[str, Any]], int]]]:
+        loop = asyncio.get_running_loop()
+        
+        # Step 1-2: Fix OCR errors and split into sections off the event loop
+        tradeline_sections = await loop.run_in_executor(
+            pool, _prepare_sections_in_worker, text, detected_bureau
+        )
+        
+        # Step 3: Extract sections in ordered batches, one or more per worker
+        batch_count = max(1, min(_extraction_pool_size, len(tradeline_sections) // min_sections_per_batch))
+        batch_size = -(-len(tradeline_sections) // batch_count)
+        batches = [tradeline_sections[i:i + batch_size] for i in range(0, len(tradeline_sections), batch_size)]
+        batch_results = await asyncio.gather(*[
+            loop.run_in_executor(pool, _extract_sections_in_worker, batch, count_unrecognized_fields)
+            for batch in batches
+        ])
+        logger.debug(f"Extracted {len(tradeline_sections)} sections in {len(batches)} batches")
+        return tradeline_sections, [result for batch in batch_results for result in batch]
+    
+    async def extract_enhanced_tradelines_parallel(self, text: str, detected_bureau: str = "Unknown",
+                                                   min_sections_per_batch: int = 4) -> List[Dict[str, Any]]:
+        """
+        Enhanced tradeline extraction fanned out to the process pool
+        
+        OCR fixes and section splitting run in a worker, then sections are extracted in
+        contiguous batches across workers. Results keep the original section order.
+        """
+        logger.info(f"Starting parallel enhanced tradeline extraction for {detected_bureau} bureau")
+        tradeline_sections, section_results = await self._extract_sections_parallel(
+            text, detected_bureau, min_sections_per_batch
+        )
+        
+        tradelines = [
+            tradeline
+            for tradeline, _ in section_results
+            if tradeline and tradeline.get('creditor_name')
+        ]
+        
+        # Step 4: Post-process and validate
+        validated_tradelines = self._validate_and_enhance_tradelines(tradelines)
+        
+        logger.info(f"Parallel enhanced extraction completed: {len(validated_tradelines)} tradelines found "
+                    f"from {len(tradeline_sections)} sections")
+        return validated_tradelines
+    
+    async def route_sections_parallel(self, text: str, detected_bureau: str = "Unknown",
+                                      escalation_threshold: float = 0.5,
+                                      min_sections_per_batch: int = 4) -> List[Dict[str, Any]]:
+        """
+        Extract every section with regex and decide which ones need the LLM
+        
+        A section is escalated when its regex tradeline scores below escalation_threshold,
+        or when no creditor was recognized but the section still carries at least two
+        tradeline fields (account number, balance, dates, ...). Sections with no tradeline
+        signal are dropped.
+        
+        Returns:
+            Routes in section order: {'index', 'section', 'tradeline', 'escalate'} where
+            tradeline is the validated regex result (or None)
+        """
+        tradeline_sections, section_results = await self._extract_sections_parallel(
+            text, detected_bureau, min_sections_per_batch, count_unrecognized_fields=True
+        )
+        
+        routes = []
+        for index, (section, (tradeline, field_count)) in enumerate(zip(tradeline_sections, section_results)):
+            if tradeline and tradeline.get('creditor_name'):
+                escalate = tradeline.get('confidence_score', 0) < escalation_threshold
+                validated = self._validate_and_enhance_tradelines([tradeline])
+                tradeline = validated[0] if validated else None
+            else:
+                tradeline = None
+                escalate = field_count >= 2
+            if tradeline or escalate:
+                routes.append({'index': index, 'section': section, 'tradeline': tradeline, 'escalate': escalate})
+        
+        escalated = sum(1 for route in routes if route['escalate'])
+        logger.info(f"Routed {len(tradeline_sections)} sections: {len(routes) - escalated} resolved by regex, "
+                    f"{escalated} escalated to LLM (threshold {escalation_threshold})")
+        return routes
+    
     def _split_into_tradeline_sections(self, text: str, bureau: str) -> List[str]:
         """Split text into individual tradeline sections based on bureau format"""
         sections = []
         
         # First try bureau-specific splitting
-        if bureau.lower() == "transunion":
-            # TransUnion typically has clear separators
-            sections = re.split(r'\n\n+|\n\s*(?=[A-Z][A-Z\s,&.]+(?:BANK|CARD|FINANCIAL|CREDIT|AUTO|LOAN))', text)
-        
-        elif bureau.lower() == "experian":
-            # Experian often has tabular format
-            sections = re.split(r'\n\s*(?=[A-Z][A-Z\s]+\s+\*+\d+)', text)
-        
-        elif bureau.lower() == "equifax":
-            # Equifax has block format
-            sections = re.split(r'\n\s*(?=[A-Z][A-Z\s&]+\s+Account)', text)
+        bureau_split = BUREAU_SECTION_SPLITS.get(bureau.lower())
+        if bureau_split:
+            sections = bureau_split.split(text)
         
         # If bureau-specific didn't work well, try generic approach
         if not sections or len(sections) < 2:
-            # Generic approach - split on creditor patterns or empty lines
-            creditor_pattern = '|'.join([f'(?:{pattern})' for pattern in self.creditor_patterns])
-            sections = re.split(f'\n\s*(?=(?:{creditor_pattern}))', text, flags=re.IGNORECASE)
-            
-            # Also try splitting on double newlines
-            if len(sections) < 2:
-                sections = re.split(r'\n\s*\n+', text)
+            sections = self._split_generic_sections(text)
         
         # Filter sections and ensure we have reasonable content
-        filtered_sections = []
-        for section in sections:
-            section = section.strip()
-            if len(section) > 30 and any(pattern in section.upper() for pattern in 
-                ['ACCOUNT', 'BANK', 'CARD', 'CREDIT', 'BALANCE', 'LIMIT', 'PAYMENT']):
-                filtered_sections.append(section)
+        filtered_sections = [section.strip() for section in sections if self._is_tradeline_section(section)]
         
         return filtered_sections if filtered_sections else [text]  # Return original if splitting failed
     
+    def segment_text(self, text: str, bureau: str = "Unknown") -> List[str]:
+        """
+        Split text at the same section boundaries as _split_into_tradeline_sections
+        
+        Unlike that method nothing is filtered out, so joining the segments keeps all of
+        the report's content (headers, personal info, inquiries) for prompt packing.
+        """
+        bureau_split = BUREAU_SECTION_SPLITS.get(bureau.lower())
+        sections = bureau_split.split(text) if bureau_split else []
+        if len(sections) < 2:
+            sections = self._split_generic_sections(text)
+        return [section.strip() for section in sections if section.strip()]
+    
+    def _split_generic_sections(self, text: str) -> List[str]:
+        """Split on lines starting with a known creditor, falling back to blank lines"""
+        sections = self.creditor_lexicon.split_at_line_mentions(text)
+        
+        # Also try splitting on double newlines
+        if len(sections) < 2:
+            sections = BLANK_LINE_SPLIT.split(text)
+        return sections
+    
+    def _is_tradeline_section(self, section: str) -> bool:
+        """Check whether a split piece has enough content to hold a tradeline"""
+        section = section.strip()
+        return len(section) > 30 and any(pattern in section.upper() for pattern in 
+            ['ACCOUNT', 'BANK', 'CARD', 'CREDIT', 'BALANCE', 'LIMIT', 'PAYMENT'])
+    
+    def iter_tradelines_from_pages(self, pages: Iterable[str], detected_bureau: str = "Unknown",
+                                   max_window_pages: int = 3) -> Iterator[Dict[str, Any]]:
+        """Extract tradelines incrementally from an iterable of page texts (see TradelineStream)"""
+        stream = TradelineStream(self, detected_bureau, max_window_pages)
+        for page_text in pages:
+            yield from stream.feed(page_text)
+        yield from stream.close()
+        logger.info(f"Streaming extraction completed: {stream.tradelines_found} tradelines found")
+    
     def _extract_tradeline_from_section(self, section: str) -> Optional[Dict[str, Any]]:
         """Extract a complete tradeline from a text section"""
         tradeline = {}
@@ -259,12 +454,10 @@ class EnhancedExtractionService:
         # Extract account type based on creditor
         tradeline['account_type'] = self._determine_account_type(creditor_name)
         
-        # Extract all other fields
-        for field_name, patterns in self.field_patterns.items():
-            if field_name not in ['creditor_name']:  # Skip already extracted
-                value = self._extract_field_value(section, patterns, field_name)
-                if value:
-                    tradeline[field_name] = value
+        # Extract all other fields with the precompiled scanner
+        tradeline.update(self.field_scanner.scan(
+            section, self._post_process_field_value, skip_fields=('creditor_name',)
+        ))
         
         # Set defaults for missing fields
         tradeline = self._set_field_defaults(tradeline)
@@ -274,16 +467,16 @@ class EnhancedExtractionService:
         
         return tradeline
     
+    def _count_section_fields(self, section: str) -> int:
+        """Number of tradeline fields found in a section, creditor or not"""
+        return len(self.field_scanner.scan(section, self._post_process_field_value))
+    
     def _extract_creditor_name(self, section: str) -> Optional[str]:
         """Extract creditor name from section using enhanced patterns"""
-        # Try each creditor pattern
-        for pattern in self.creditor_patterns:
-            match = re.search(pattern, section, re.IGNORECASE)
-            if match:
-                creditor_name = match.group(0).strip()
-                # Clean up the name
-                creditor_name = re.sub(r'\s+', ' ', creditor_name)  # Normalize whitespace
-                return creditor_name.title()  # Proper case
+        # Look up known creditors in the lexicon automaton
+        mention = self.creditor_lexicon.best_match(section)
+        if mention:
+            return mention.matched_text.title()  # Proper case
         
         # Fallback: Look for capitalized words at beginning of section
         lines = section.split('\n')
@@ -297,13 +490,10 @@ class EnhancedExtractionService:
     
     def _extract_field_value(self, section: str, patterns: List[str], field_name: str) -> Optional[str]:
         """Extract field value using multiple patterns"""
-        for pattern in patterns:
-            match = re.search(pattern, section, re.IGNORECASE | re.MULTILINE)
+        for compiled in compile_patterns(tuple(patterns)):
+            match = compiled.search(section)
             if match:
-                if match.groups():
-                    value = match.group(1).strip()
-                else:
-                    value = match.group(0).strip()
+                value = FieldScanner.match_value(match)
                 
                 # Post-process based on field type
                 value = self._post_process_field_value(value, field_name)
@@ -636,4 +826,45 @@ CRITICAL SUCCESS FACTORS:
 5. Note any extraction challenges
 
 Be extremely thorough - the current system is missing many tradelines and field values.
-"""
\ No newline at end of file
+"""
+
+    def get_section_extraction_prompt(self, sections: List[Tuple[int, str]], detected_bureau: str = "Unknown") -> str:
+        """Generate an LLM prompt that extracts tradelines from specific report sections"""
+        section_text = "\n\n".join(f"=== SECTION {index} ===\n{section}" for index, section in sections)
+        
+        return f"""
+You are an expert credit report parser with deep knowledge of {detected_bureau} bureau formats.
+
+The sections below come from one credit report. Automated parsing could not read them
+reliably. Extract every tradeline account they contain.
+
+{section_text}
+
+For each tradeline, extract the creditor name exactly as shown, the masked account number,
+account type (Credit Card, Auto Loan, Mortgage, Student Loan, Personal Loan, Line of Credit),
+current balance, credit limit, monthly payment, payment status, account status, and the
+date opened/closed (YYYY-MM-DD). Use null for values that are not present. A section may
+contain zero, one or several tradelines.
+
+RESPONSE FORMAT:
+Return valid JSON with this structure:
+
+{{
+  "tradelines": [
+    {{
+      "section_index": 3,
+      "creditor_name": "CHASE BANK",
+      "account_number": "****1234",
+      "account_type": "Credit Card",
+      "current_balance": "1250.00",
+      "credit_limit": "5000.00",
+      "monthly_payment": "35.00",
+      "payment_status": "Current",
+      "account_status": "Open",
+      "date_opened": "2020-01-15",
+      "date_closed": null,
+      "confidence_score": 0.95
+    }}
+  ]
+}}
+"""
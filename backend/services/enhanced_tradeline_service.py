@@ -1,3 +1,5 @@
+import os
+import asyncio
 import logging
 import re
 import uuid
@@ -5,13 +7,32 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from supabase import Client
 
+from utils.tradeline_index import TradelineIndex, TradelineIndexCache, get_tradeline_index_cache
+
 logger = logging.getLogger(__name__)
 
+# Columns of the tradelines table written by this service
+TRADELINE_COLUMNS = [
+    'id', 'user_id', 'credit_bureau', 'account_number', 'creditor_name', 'account_type',
+    'account_balance', 'credit_limit', 'monthly_payment', 'account_status', 'date_opened',
+    'dispute_count', 'is_negative'
+]
+
+# Rows per bulk insert request
+INSERT_BATCH_SIZE = int(os.getenv("TRADELINE_INSERT_BATCH_SIZE", "500"))
+
+# Fields of a stored tradeline that later uploads may fill in
+ENRICHABLE_FIELDS = [
+    'account_number', 'account_type', 'account_balance', 'credit_limit',
+    'monthly_payment', 'account_status', 'date_opened'
+]
+
 class EnhancedTradelineService:
     """Enhanced tradeline service with duplicate detection and progressive enrichment"""
     
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: Client, index_cache: TradelineIndexCache = None):
         self.supabase = supabase_client
+        self.index_cache = index_cache or get_tradeline_index_cache()
     
     def get_account_first_4(self, account_number: str) -> str:
         """Get first 4 alphanumeric characters from account number"""
@@ -30,6 +51,115 @@ class EnhancedTradelineService:
         if existing_value in ['$0', '$0.00', '0', 0]:
             return True
         return False
+    
+    def get_tradeline_index(self, user_id: str, credit_bureau: str) -> TradelineIndex:
+        """Stored tradelines of a user and bureau, loaded with one query and cached across jobs"""
+        def load() -> List[Dict[str, Any]]:
+            result = self.supabase.table('tradelines').select('*')\
+                .eq('user_id', user_id).eq('credit_bureau', credit_bureau).execute()
+            return result.data or []
+        return self.index_cache.get_or_load(user_id, credit_bureau, load)
+    
+    def find_existing_tradeline(self, tradeline: Dict[str, Any], user_id: str) -> Optional[Dict[str, Any]]:
+        """Find the stored duplicate (same creditor, account first 4 and date opened) of a tradeline"""
+        return self.get_tradeline_index(user_id, tradeline.get('credit_bureau')).find(tradeline)
+    
+    def get_enrichment_updates(self, existing: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        """Fields of a stored tradeline that the new data can fill in"""
+        updates = {}
+        for field in ENRICHABLE_FIELDS:
+            new_value = new.get(field)
+            if new_value in (None, '') or new_value == existing.get(field):
+                continue
+            if self.should_update_field(existing.get(field), new_value):
+                updates[field] = new_value
+        return updates
+    
+    def _to_row(self, tradeline: Dict[str, Any]) -> Dict[str, Any]:
+        """Database row for a tradeline, with ids and dates as strings; missing columns keep their defaults"""
+        row = {}
+        for column in TRADELINE_COLUMNS:
+            value = tradeline.get(column)
+            if value is None:
+                continue
+            if isinstance(value, (uuid.UUID, datetime)):
+                value = value.isoformat() if isinstance(value, datetime) else str(value)
+            row[column] = value
+        if not row.get('id'):
+            row['id'] = str(uuid.uuid4())
+        return row
+    
+    async def process_tradeline(self, tradeline: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Save one tradeline (see process_tradelines); returns the saved row, or None if nothing was written"""
+        return (await self.process_tradelines([tradeline]))[0]
+    
+    async def process_tradelines(self, tradelines: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Save tradelines, enriching their stored duplicates instead of inserting copies
+        
+        Duplicates are found in the user's cached tradeline index rather than with a
+        database query per tradeline. Enrichments are written as they are found; if the
+        matched row has been deleted since the index was loaded, the tradeline is
+        inserted instead. New rows are collected and written with one bulk insert per
+        INSERT_BATCH_SIZE rows. Returns the saved row for each tradeline, or None where
+        nothing was written.
+        """
+        saved_rows: List[Optional[Dict[str, Any]]] = []
+        new_rows: Dict[str, Tuple[TradelineIndex, Dict[str, Any]]] = {}
+        
+        for tradeline in tradelines:
+            user_id = str(tradeline.get('user_id') or '')
+            credit_bureau = tradeline.get('credit_bureau')
+            if not user_id or not credit_bureau or not tradeline.get('creditor_name'):
+                logger.warning(f"Skipping tradeline without user, bureau or creditor: {tradeline.get('creditor_name')}")
+                saved_rows.append(None)
+                continue
+            
+            index = await asyncio.to_thread(self.get_tradeline_index, user_id, credit_bureau)
+            existing = index.find(tradeline)
+            
+            saved = None
+            if existing:
+                updates = self.get_enrichment_updates(existing, tradeline)
+                if not updates or existing['id'] in new_rows:
+                    # Rows not inserted yet are enriched in place before the bulk insert
+                    existing.update(updates)
+                    saved_rows.append(existing)
+                    continue
+                result = await asyncio.to_thread(
+                    lambda: self.supabase.table('tradelines').update(updates).eq('id', existing['id']).execute()
+                )
+                if result.data:
+                    saved = {**existing, **updates}
+                    logger.debug(f"Enriched tradeline {existing['id']} with {sorted(updates)}")
+                else:
+                    logger.info(f"Tradeline {existing['id']} no longer exists, inserting instead")
+                    index.remove(existing['id'])
+            if saved is None:
+                saved = self._to_row(tradeline)
+                new_rows[saved['id']] = (index, saved)
+            
+            index.add(saved)
+            saved_rows.append(saved)
+        
+        pending = list(new_rows.values())
+        for start in range(0, len(pending), INSERT_BATCH_SIZE):
+            batch = pending[start:start + INSERT_BATCH_SIZE]
+            try:
+                await asyncio.to_thread(
+                    lambda: self.supabase.table('tradelines').insert([row for _, row in batch]).execute()
+                )
+            except Exception:
+                # Keep the indexes in step with the database; a conflict means an index
+                # missed a row written elsewhere, so reload those users' indexes next time
+                for index, row in pending[start:]:
+                    index.remove(row['id'])
+                for user_id in {index.user_id for index, _ in pending[start:]}:
+                    self.index_cache.invalidate(user_id)
+                raise
+        if pending:
+            logger.debug(f"Inserted {len(pending)} new tradelines")
+        return saved_rows
 
 
     # Pre-save validation to prevent the issues seen in logs
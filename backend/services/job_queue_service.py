@@ -0,0 +1,340 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in execution order; each stage's outputs are persisted before the next is queued
+PIPELINE_STAGES = ['ocr', 'chunk', 'document_ai', 'llm', 'persist']
+
+StageHandler = Callable[[str], Awaitable[Any]]
+
+
+class LeaseLostError(Exception):
+    """Raised when a worker records an outcome for a task whose lease another worker has taken"""
+
+
+class JobQueueService:
+    """
+    Durable SQLite queue of pipeline stage tasks
+
+    Each job is a chain of stage tasks (see PIPELINE_STAGES). Completing a stage and
+    queueing the next one happens in one transaction, so a job always resumes from its
+    last completed stage. A claimed task is leased for visibility_timeout seconds; if
+    its worker dies and stops renewing the lease, the task becomes visible again and
+    another worker picks it up. Failed attempts are retried with exponential backoff up
+    to max_attempts. The database runs in WAL mode so several worker processes can
+    share it.
+    """
+
+    def __init__(self, db_path: Path = Path("storage") / "queue" / "jobs.sqlite3",
+                 visibility_timeout: float = 300,
+                 max_attempts: int = 3,
+                 retry_base_delay: float = 5):
+        self.db_path = Path(db_path)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_tasks (
+                task_id TEXT PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_expires_at REAL,
+                worker_id TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (job_id, stage)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_tasks_ready "
+                           "ON pipeline_tasks (status, available_at)")
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn inside BEGIN IMMEDIATE so concurrent processes serialize their writes"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _queue_stage(conn: sqlite3.Connection, job_id: str, stage: str, now: float) -> None:
+        conn.execute("""
+            INSERT INTO pipeline_tasks (task_id, job_id, stage, status, available_at, created_at, updated_at)
+            VALUES (?, ?, ?, 'queued', ?, ?, ?)
+            ON CONFLICT (job_id, stage) DO UPDATE SET
+                status = 'queued', attempts = 0, available_at = excluded.available_at,
+                lease_expires_at = NULL, worker_id = NULL, last_error = NULL, updated_at = excluded.updated_at
+        """, (str(uuid.uuid4()), job_id, stage, now, now, now))
+
+    def enqueue(self, job_id: str, stage: str = PIPELINE_STAGES[0]) -> None:
+        """Queue a job starting at the given stage"""
+        if stage not in PIPELINE_STAGES:
+            raise ValueError(f"Unknown pipeline stage: {stage}")
+        self._transaction(lambda conn: self._queue_stage(conn, job_id, stage, time.time()))
+        logger.info(f"Queued job {job_id} at stage {stage}")
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next ready task: queued and due, or running with an expired lease
+
+        A running task whose lease expired on its last attempt (its worker kept dying)
+        is marked failed instead of being leased again, and returned with exhausted=True
+        so the caller can report the job as failed.
+        """
+        def claim_next(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            now = time.time()
+            row = conn.execute("""
+                UPDATE pipeline_tasks
+                SET status = 'failed', lease_expires_at = NULL, updated_at = ?,
+                    last_error = 'Lease expired on attempt ' || attempts || ' (worker stopped)'
+                WHERE task_id = (
+                    SELECT task_id FROM pipeline_tasks
+                    WHERE status = 'running' AND lease_expires_at < ? AND attempts >= ?
+                    LIMIT 1
+                )
+                RETURNING task_id, job_id, stage, attempts, last_error
+            """, (now, now, self.max_attempts)).fetchone()
+            if row:
+                return {**dict(row), 'exhausted': True}
+            row = conn.execute("""
+                UPDATE pipeline_tasks
+                SET status = 'running', attempts = attempts + 1, worker_id = ?,
+                    lease_expires_at = ?, updated_at = ?
+                WHERE task_id = (
+                    SELECT task_id FROM pipeline_tasks
+                    WHERE (status = 'queued' AND available_at <= ?)
+                       OR (status = 'running' AND lease_expires_at < ? AND attempts < ?)
+                    ORDER BY available_at
+                    LIMIT 1
+                )
+                RETURNING task_id, job_id, stage, attempts
+            """, (worker_id, now + self.visibility_timeout, now, now, now, self.max_attempts)).fetchone()
+            return dict(row) if row else None
+        return self._transaction(claim_next)
+
+    def extend_lease(self, task: Dict[str, Any], worker_id: str) -> bool:
+        """Renew a running task's lease; False if another worker has taken it over"""
+        def extend(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            return conn.execute("""
+                UPDATE pipeline_tasks SET lease_expires_at = ?, updated_at = ?
+                WHERE task_id = ? AND status = 'running' AND worker_id = ?
+            """, (now + self.visibility_timeout, now, task['task_id'], worker_id)).rowcount == 1
+        return self._transaction(extend)
+
+    def complete(self, task: Dict[str, Any], worker_id: str) -> Optional[str]:
+        """
+        Mark a task done and queue the job's next stage; returns that stage, if any
+
+        Raises LeaseLostError if this worker no longer holds the task's lease (nothing recorded).
+        """
+        stage_index = PIPELINE_STAGES.index(task['stage'])
+        next_stage = PIPELINE_STAGES[stage_index + 1] if stage_index + 1 < len(PIPELINE_STAGES) else None
+
+        def finish(conn: sqlite3.Connection) -> int:
+            now = time.time()
+            updated = conn.execute("""
+                UPDATE pipeline_tasks SET status = 'done', lease_expires_at = NULL, updated_at = ?
+                WHERE task_id = ? AND status = 'running' AND worker_id = ?
+            """, (now, task['task_id'], worker_id)).rowcount
+            if updated and next_stage:
+                self._queue_stage(conn, task['job_id'], next_stage, now)
+            return updated
+        if not self._transaction(finish):
+            raise LeaseLostError(f"Worker {worker_id} no longer holds stage {task['stage']} of job {task['job_id']}")
+        return next_stage
+
+    def fail(self, task: Dict[str, Any], worker_id: str, error: str) -> Optional[bool]:
+        """
+        Record a failed attempt; returns True if the task will be retried, False if it has
+        failed for good, and None if this worker no longer holds its lease (nothing recorded)
+        """
+        retry = task['attempts'] < self.max_attempts
+
+        def record(conn: sqlite3.Connection) -> int:
+            now = time.time()
+            return conn.execute("""
+                UPDATE pipeline_tasks
+                SET status = ?, available_at = ?, lease_expires_at = NULL, last_error = ?, updated_at = ?
+                WHERE task_id = ? AND status = 'running' AND worker_id = ?
+            """, ('queued' if retry else 'failed',
+                  now + self.retry_base_delay * 2 ** (task['attempts'] - 1),
+                  error, now, task['task_id'], worker_id)).rowcount
+        if not self._transaction(record):
+            return None
+        return retry
+
+    def resume_job(self, job_id: str) -> Optional[str]:
+        """Re-queue a job from its first unfinished stage; returns that stage"""
+        def resume(conn: sqlite3.Connection) -> Optional[str]:
+            done = {row['stage'] for row in conn.execute(
+                "SELECT stage FROM pipeline_tasks WHERE job_id = ? AND status = 'done'", (job_id,)
+            )}
+            stage = next((stage for stage in PIPELINE_STAGES if stage not in done), None)
+            if stage:
+                self._queue_stage(conn, job_id, stage, time.time())
+            return stage
+        stage = self._transaction(resume)
+        logger.info(f"Resumed job {job_id} at stage {stage}")
+        return stage
+
+    def get_job_tasks(self, job_id: str) -> List[Dict[str, Any]]:
+        """Stage tasks of a job in pipeline order"""
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(
+                "SELECT stage, status, attempts, last_error, updated_at FROM pipeline_tasks WHERE job_id = ?",
+                (job_id,)
+            )]
+        return sorted(rows, key=lambda row: PIPELINE_STAGES.index(row['stage']))
+
+    def get_stats(self) -> Dict[str, int]:
+        """Count tasks by status"""
+        with self._lock:
+            return {row['status']: row['count'] for row in self._conn.execute(
+                "SELECT status, COUNT(*) AS count FROM pipeline_tasks GROUP BY status"
+            )}
+
+
+class PipelineWorkerPool:
+    """
+    Async workers that run queued stage tasks with the registered stage handlers
+
+    Each worker claims one task at a time and renews its lease while the handler runs.
+    Throughput scales with concurrency (or with more processes sharing the queue),
+    independently of how many HTTP requests are in flight.
+    """
+
+    def __init__(self, queue: JobQueueService, handlers: Dict[str, StageHandler],
+                 concurrency: int = 4, poll_interval: float = 1.0,
+                 on_job_failed: Optional[Callable[[str, str, str], Awaitable[None]]] = None):
+        missing = [stage for stage in PIPELINE_STAGES if stage not in handlers]
+        if missing:
+            raise ValueError(f"No handler for pipeline stages: {missing}")
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.on_job_failed = on_job_failed
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    async def start(self) -> None:
+        """Start the workers (call from application startup)"""
+        self._stopping.clear()
+        self._tasks = [
+            asyncio.create_task(self._worker(f"{self.worker_prefix}:{i}"))
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} pipeline workers")
+
+    async def stop(self) -> None:
+        """Stop the workers; tasks they were running become visible again once their leases expire"""
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, worker_id: str) -> None:
+        while not self._stopping.is_set():
+            try:
+                task = await asyncio.to_thread(self.queue.claim, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to claim a task: {str(e)}")
+                task = None
+            if task is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_task(task, worker_id)
+
+    async def run_task(self, task: Dict[str, Any], worker_id: str) -> None:
+        """Run one claimed task, renewing its lease until the handler finishes; exhausted tasks are reported failed"""
+        job_id, stage = task['job_id'], task['stage']
+        if task.get('exhausted'):
+            logger.error(f"Stage {stage} of job {job_id} failed: {task['last_error']}, giving up")
+            if self.on_job_failed:
+                await self.on_job_failed(job_id, stage, task['last_error'])
+            return
+        heartbeat = asyncio.create_task(self._renew_lease(task, worker_id))
+        try:
+            logger.info(f"Worker {worker_id} running stage {stage} of job {job_id} (attempt {task['attempts']})")
+            await self.handlers[stage](job_id)
+        except Exception as e:
+            heartbeat.cancel()
+            retry = await asyncio.to_thread(self.queue.fail, task, worker_id, str(e))
+            if retry is None:
+                # Another worker has taken the task over and will record its outcome
+                logger.warning(f"Stage {stage} of job {job_id} failed after its lease was lost: {str(e)}")
+                return
+            logger.error(f"Stage {stage} of job {job_id} failed (attempt {task['attempts']}"
+                         f"{', will retry' if retry else ', giving up'}): {str(e)}")
+            if not retry and self.on_job_failed:
+                await self.on_job_failed(job_id, stage, str(e))
+            return
+        finally:
+            # Also stops the heartbeat when the worker is cancelled mid-stage
+            heartbeat.cancel()
+        try:
+            next_stage = await asyncio.to_thread(self.queue.complete, task, worker_id)
+        except LeaseLostError:
+            logger.warning(f"Stage {stage} of job {job_id} finished after its lease was lost, "
+                           f"leaving it to the new owner")
+            return
+        logger.info(f"Stage {stage} of job {job_id} completed"
+                    + (f", queued {next_stage}" if next_stage else ", pipeline finished"))
+
+    async def _renew_lease(self, task: Dict[str, Any], worker_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.extend_lease, task, worker_id):
+                logger.warning(f"Lost lease on stage {task['stage']} of job {task['job_id']}")
+                return
+
+
+_job_queue: Optional[JobQueueService] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueueService:
+    """Return the process-wide job queue configured from the environment"""
+    global _job_queue
+    if _job_queue is None:
+        with _job_queue_lock:
+            if _job_queue is None:
+                _job_queue = JobQueueService(
+                    db_path=Path(os.getenv("JOB_QUEUE_PATH", str(Path("storage") / "queue" / "jobs.sqlite3"))),
+                    visibility_timeout=float(os.getenv("JOB_QUEUE_VISIBILITY_TIMEOUT", "300")),
+                    max_attempts=int(os.getenv("JOB_QUEUE_MAX_ATTEMPTS", "3")),
+                    retry_base_delay=float(os.getenv("JOB_QUEUE_RETRY_BASE_DELAY", "5"))
+                )
+    return _job_queue
@@ -1,7 +1,11 @@
+import os
+import time
 import uuid
+import zlib
+import heapq
 import asyncio
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from .storage_service import StorageService
 from models.tradeline_models import ProcessingJob, ProcessingStatus
 import logging
@@ -12,48 +16,56 @@ class JobService:
     def __init__(self, storage_service: StorageService):
         self.storage_service = storage_service
         self.active_jobs: Dict[str, Dict[str, Any]] = {}
-        self._job_lock = asyncio.Lock()
+        # Per-job locks, sharded so unrelated jobs never wait on each other
+        self._job_locks = [asyncio.Lock() for _ in range(int(os.getenv("JOB_LOCK_SHARDS", "64")))]
+        # Completed jobs stay visible in active_jobs this long, then the reaper removes them
+        self.completed_job_retention = float(os.getenv("COMPLETED_JOB_RETENTION_SECONDS", "5"))
+        self._eviction_heap: List[Tuple[float, str]] = []  # (evict_at monotonic time, job_id)
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._reaper_wakeup = asyncio.Event()
+    
+    def _job_lock(self, job_id: str) -> asyncio.Lock:
+        return self._job_locks[zlib.crc32(job_id.encode()) % len(self._job_locks)]
 
     async def create_processing_job(self, user_id: Optional[uuid.UUID], filename: str, 
                                    file_size: int) -> str:
         """Create a new processing job with coordination support"""
-        async with self._job_lock:
-            try:
-                job_id = str(uuid.uuid4())
-                
-                job_data = {
-                    'job_id': job_id,
-                    'user_id': str(user_id) if user_id else None,
-                    'status': ProcessingStatus.PENDING.value,
-                    'filename': filename,
-                    'file_size': file_size,
-                    'created_at': datetime.now().isoformat(),
-                    'completed_at': None,
-                    'error_message': None,
-                    'document_ai_result': None,
-                    'llm_result': None,
-                    'final_tradelines': None,
-                    'services_used': [],
-                    'processing_phases': {},
-                    'coordination_metadata': {}
-                }
-                
-                # Track active job
-                self.active_jobs[job_id] = {
-                    'status': ProcessingStatus.PENDING.value,
-                    'started_at': datetime.now(),
-                    'services_coordinated': [],
-                    'current_phase': 'initialization'
-                }
-                
-                await self.storage_service.store_job_data(job_id, job_data)
-                
-                logger.info(f"🎯 Created coordinated processing job {job_id} for file {filename}")
-                return job_id
-                
-            except Exception as e:
-                logger.error(f"❌ Failed to create processing job: {e}")
-                raise
+        try:
+            job_id = str(uuid.uuid4())
+            
+            job_data = {
+                'job_id': job_id,
+                'user_id': str(user_id) if user_id else None,
+                'status': ProcessingStatus.PENDING.value,
+                'filename': filename,
+                'file_size': file_size,
+                'created_at': datetime.now().isoformat(),
+                'completed_at': None,
+                'error_message': None,
+                'document_ai_result': None,
+                'llm_result': None,
+                'final_tradelines': None,
+                'services_used': [],
+                'processing_phases': {},
+                'coordination_metadata': {}
+            }
+            
+            # Track active job
+            self.active_jobs[job_id] = {
+                'status': ProcessingStatus.PENDING.value,
+                'started_at': datetime.now(),
+                'services_coordinated': [],
+                'current_phase': 'initialization'
+            }
+            
+            await self.storage_service.store_job_data(job_id, job_data)
+            
+            logger.info(f"🎯 Created coordinated processing job {job_id} for file {filename}")
+            return job_id
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to create processing job: {e}")
+            raise
 
     async def get_job_status(self, job_id: str) -> Optional[ProcessingJob]:
         """Get current job status"""
@@ -79,10 +91,16 @@ class JobService:
             logger.error(f"Failed to update job status for {job_id}: {e}")
             raise
 
+    async def update_job_error(self, job_id: str, error_message: str) -> None:
+        """Record a job's error message"""
+        await self.storage_service.update_job_data(
+            job_id, lambda job_data: job_data.update(error_message=error_message)
+        )
+
     async def update_job_coordination(self, job_id: str, service_name: str, 
                                     phase: str, metadata: Dict[str, Any] = None):
         """Update job coordination information"""
-        async with self._job_lock:
+        async with self._job_lock(job_id):
             try:
                 if job_id in self.active_jobs:
                     job_info = self.active_jobs[job_id]
@@ -91,9 +109,8 @@ class JobService:
                     if service_name not in job_info['services_coordinated']:
                         job_info['services_coordinated'].append(service_name)
                     
-                    # Update stored job data
-                    job_data = await self.storage_service.get_job_data(job_id)
-                    if job_data:
+                    # Update stored job data in place
+                    def record_phase(job_data: Dict[str, Any]) -> None:
                         if service_name not in job_data.get('services_used', []):
                             job_data.setdefault('services_used', []).append(service_name)
                         
@@ -102,9 +119,8 @@ class JobService:
                             'timestamp': datetime.now().isoformat(),
                             'metadata': metadata or {}
                         }
-                        
-                        await self.storage_service.store_job_data(job_id, job_data)
-                        
+                    
+                    if await self.storage_service.update_job_data(job_id, record_phase):
                         logger.info(f"🔄 Job {job_id} coordination updated: {service_name} -> {phase}")
                 
             except Exception as e:
@@ -112,42 +128,64 @@ class JobService:
 
     async def complete_job_coordination(self, job_id: str, final_result: Any):
         """Complete job processing with coordination cleanup"""
-        async with self._job_lock:
+        async with self._job_lock(job_id):
             try:
                 if job_id in self.active_jobs:
                     job_info = self.active_jobs[job_id]
                     job_info['status'] = ProcessingStatus.COMPLETED.value
                     
                     # Update final job data
-                    job_data = await self.storage_service.get_job_data(job_id)
-                    if job_data:
-                        job_data['status'] = ProcessingStatus.COMPLETED.value
-                        job_data['completed_at'] = datetime.now().isoformat()
-                        job_data['final_tradelines'] = final_result
-                        
-                        await self.storage_service.store_job_data(job_id, job_data)
+                    await self.storage_service.update_job_data(job_id, lambda job_data: job_data.update(
+                        status=ProcessingStatus.COMPLETED.value,
+                        completed_at=datetime.now().isoformat(),
+                        final_tradelines=final_result
+                    ))
                     
-                    # Remove from active jobs after a delay
-                    await asyncio.sleep(5)
-                    if job_id in self.active_jobs:
-                        del self.active_jobs[job_id]
+                    # Removed from active jobs later by the reaper; completion returns immediately
+                    self._schedule_eviction(job_id)
                     
                     logger.info(f"✅ Job {job_id} coordination completed")
                 
             except Exception as e:
                 logger.error(f"❌ Failed to complete job coordination: {e}")
 
+    def _schedule_eviction(self, job_id: str) -> None:
+        """Queue a completed job for removal from active_jobs after the retention period"""
+        evict_at = time.monotonic() + self.completed_job_retention
+        is_earliest = not self._eviction_heap or evict_at < self._eviction_heap[0][0]
+        heapq.heappush(self._eviction_heap, (evict_at, job_id))
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_completed_jobs())
+        elif is_earliest:
+            self._reaper_wakeup.set()
+
+    async def _reap_completed_jobs(self) -> None:
+        """Evict completed jobs as their deadlines pass; exits once nothing is scheduled"""
+        while self._eviction_heap:
+            delay = self._eviction_heap[0][0] - time.monotonic()
+            if delay > 0:
+                self._reaper_wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._reaper_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, job_id = heapq.heappop(self._eviction_heap)
+            job_info = self.active_jobs.get(job_id)
+            if job_info and job_info['status'] == ProcessingStatus.COMPLETED.value:
+                del self.active_jobs[job_id]
+                logger.debug(f"Evicted completed job {job_id} from active jobs")
+
     async def get_active_jobs_summary(self) -> Dict[str, Any]:
         """Get summary of active coordinated jobs"""
-        async with self._job_lock:
-            return {
-                'active_count': len(self.active_jobs),
-                'jobs': {
-                    job_id: {
-                        'status': info['status'],
-                        'current_phase': info['current_phase'],
-                        'services_coordinated': info['services_coordinated'],
-                        'duration_seconds': (datetime.now() - info['started_at']).total_seconds()
-                    } for job_id, info in self.active_jobs.items()
-                }
+        return {
+            'active_count': len(self.active_jobs),
+            'jobs': {
+                job_id: {
+                    'status': info['status'],
+                    'current_phase': info['current_phase'],
+                    'services_coordinated': info['services_coordinated'],
+                    'duration_seconds': (datetime.now() - info['started_at']).total_seconds()
+                } for job_id, info in self.active_jobs.items()
             }
+        }
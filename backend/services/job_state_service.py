@@ -0,0 +1,141 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobStateStore:
+    """
+    Job records in SQLite (WAL) with atomic per-job updates
+
+    Each record is one row, so updating a job rewrites only that row instead of a
+    whole JSON file. update() runs its read-modify-write inside BEGIN IMMEDIATE, which
+    keeps it atomic across threads and processes. Within a process, updates to the same
+    job are also serialized by one of a fixed set of sharded locks, so jobs in different
+    shards never wait on each other. Reads never block behind writers.
+
+    Each operation borrows a connection from a pool of idle ones and returns it when
+    done, so the pool only grows to the peak number of concurrent operations and
+    short-lived worker threads don't each leave a connection open. close() closes them.
+    """
+
+    def __init__(self, db_path: Path, lock_shards: int = 64):
+        self.db_path = Path(db_path)
+        self._idle: List[sqlite3.Connection] = []
+        self._idle_lock = threading.Lock()
+        self._closed = False
+        self._shard_locks = [threading.Lock() for _ in range(lock_shards)]
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at)")
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow an idle connection, or open one, for the duration of one operation"""
+        with self._idle_lock:
+            if self._closed:
+                raise RuntimeError(f"Job state store {self.db_path} is closed")
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            yield conn
+        finally:
+            with self._idle_lock:
+                if not self._closed:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self) -> None:
+        """Close the idle connections; connections in use are closed when returned"""
+        with self._idle_lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _shard_lock(self, job_id: str) -> threading.Lock:
+        return self._shard_locks[zlib.crc32(job_id.encode()) % len(self._shard_locks)]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job record, or None if it does not exist"""
+        with self._connection() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, job_id: str, data: Dict[str, Any]) -> None:
+        """Create or replace a job record"""
+        with self._shard_lock(job_id), self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, data, updated_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(data, default=str), time.time())
+            )
+
+    def update(self, job_id: str, mutate: Callable[[Dict[str, Any]], None]) -> Optional[Dict[str, Any]]:
+        """
+        Atomically apply mutate(record) to a job; returns the updated record
+
+        Returns None (and calls nothing) if the job does not exist.
+        """
+        with self._shard_lock(job_id), self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row is None:
+                    conn.execute("ROLLBACK")
+                    return None
+                data = json.loads(row[0])
+                mutate(data)
+                conn.execute("UPDATE jobs SET data = ?, updated_at = ? WHERE job_id = ?",
+                             (json.dumps(data, default=str), time.time(), job_id))
+                conn.execute("COMMIT")
+                return data
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete_older_than(self, cutoff: float) -> int:
+        """Delete jobs not updated since cutoff (a Unix timestamp); returns the number deleted"""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,)).rowcount
+
+
+_job_state_stores: Dict[str, JobStateStore] = {}
+_job_state_stores_lock = threading.Lock()
+
+
+def get_job_state_store(db_path: Path) -> JobStateStore:
+    """Return the shared store for a database path (one per storage directory)"""
+    key = str(Path(db_path).resolve())
+    with _job_state_stores_lock:
+        if key not in _job_state_stores:
+            _job_state_stores[key] = JobStateStore(db_path)
+        return _job_state_stores[key]
+
+
+def close_job_state_stores() -> None:
+    """Close every shared store's connections (application shutdown hook)"""
+    with _job_state_stores_lock:
+        stores = list(_job_state_stores.values())
+        _job_state_stores.clear()
+    for store in stores:
+        store.close()
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fraction of the caps an over-full cache is evicted down to
+EVICTION_LOW_WATER = 0.9
+
+
+class LLMResponseCacheService:
+    """
+    Persistent SQLite cache of LLM responses
+
+    Entries are keyed by a SHA-256 over the model name, sampling parameters
+    (temperature, top_p, max_tokens) and the system and user prompts. Only
+    deterministic requests (temperature 0) are cached unless cache_all_temperatures is
+    set. Entries expire after ttl_seconds; the least recently used entries are evicted
+    once the cache exceeds max_entries or max_bytes, down to 90% of both. Writes keep
+    a running estimate of the cache size, so the eviction sweep runs only when a cap
+    may have been passed or every sweep_interval seconds. The database runs in WAL
+    mode so several worker processes can share it; all SQLite calls run in a worker
+    thread.
+
+    Responses hold personal data extracted from credit reports and are stored in
+    plaintext, so the database file is readable by its owner only and entries are kept
+    for 7 days by default (LLM_CACHE_TTL_SECONDS).
+    """
+
+    def __init__(self, db_path: Path = Path("storage") / "cache" / "llm_responses.sqlite3",
+                 ttl_seconds: int = 7 * 24 * 3600,
+                 max_entries: int = 50000,
+                 max_bytes: int = 512 * 1024 ** 2,
+                 cache_all_temperatures: bool = False,
+                 enabled: bool = True,
+                 sweep_interval: float = 3600):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_all_temperatures = cache_all_temperatures
+        self.enabled = enabled
+        self.sweep_interval = sweep_interval
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'bypassed': 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._size_estimate: Optional[Tuple[int, int]] = None  # (entries, bytes); None until the first sweep
+        self._last_sweep = 0.0
+        if self.enabled:
+            self._connect()
+
+    def _connect(self) -> None:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, timeout=30)
+        os.chmod(self.db_path, 0o600)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                model_name TEXT NOT NULL,
+                temperature REAL,
+                top_p REAL,
+                response TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_accessed "
+                           "ON llm_responses (last_accessed)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model_name: str, temperature: float, top_p: float, max_tokens: int,
+                 system_prompt: str, prompt: str) -> str:
+        """Hash everything that determines the provider's response"""
+        payload = json.dumps({
+            'model': model_name,
+            'temperature': temperature,
+            'top_p': top_p,
+            'max_tokens': max_tokens,
+            'system': system_prompt,
+            'user': prompt
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def is_cacheable(self, temperature: float, bypass: bool = False) -> bool:
+        """Whether a request with these settings may be served from or written to the cache"""
+        if not self.enabled or bypass:
+            with self._lock:
+                self.stats['bypassed'] += 1
+            return False
+        return self.cache_all_temperatures or not temperature
+
+    async def get(self, cache_key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss or expired entry"""
+        try:
+            return await asyncio.to_thread(self._get_sync, cache_key)
+        except Exception as e:
+            logger.error(f"Failed to read LLM response cache: {str(e)}")
+            return None
+
+    def _get_sync(self, cache_key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_responses WHERE cache_key = ?", (cache_key,))
+                self._conn.commit()
+                self.stats['evictions'] += 1
+                row = None
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET last_accessed = ? WHERE cache_key = ?",
+                               (now, cache_key))
+            self._conn.commit()
+            self.stats['hits'] += 1
+        logger.info(f"LLM response cache hit ({cache_key[:12]})")
+        return row[0]
+
+    async def put(self, cache_key: str, model_name: str, temperature: float, top_p: float,
+                  response: str) -> None:
+        """Store a response and enforce the size caps"""
+        try:
+            await asyncio.to_thread(self._put_sync, cache_key, model_name, temperature, top_p, response)
+        except Exception as e:
+            logger.error(f"Failed to write LLM response cache: {str(e)}")
+
+    def _put_sync(self, cache_key: str, model_name: str, temperature: float, top_p: float,
+                  response: str) -> None:
+        now = time.time()
+        size_bytes = len(response.encode())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(cache_key, model_name, temperature, top_p, response, size_bytes, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, model_name, temperature, top_p, response, size_bytes, now, now)
+            )
+            self.stats['writes'] += 1
+            if self._size_estimate is not None:
+                # Replacing an entry overcounts, which at worst brings the next sweep forward
+                self._size_estimate = (self._size_estimate[0] + 1, self._size_estimate[1] + size_bytes)
+            if self._sweep_due(now):
+                self._evict_if_needed(now)
+            self._conn.commit()
+
+    def _sweep_due(self, now: float) -> bool:
+        """Whether the cache may be over a cap, or the periodic expiry sweep is due"""
+        if self._size_estimate is None or now - self._last_sweep >= self.sweep_interval:
+            return True
+        count, total_bytes = self._size_estimate
+        return count > self.max_entries or total_bytes > self.max_bytes
+
+    def _evict_if_needed(self, now: float) -> None:
+        """Drop expired entries; over a cap, drop least recently used ones down to EVICTION_LOW_WATER of both caps"""
+        expired = self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?",
+                                     (now - self.ttl_seconds,)).rowcount
+        count, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM llm_responses"
+        ).fetchone()
+        evicted = 0
+        if count > self.max_entries or total_bytes > self.max_bytes:
+            # Evict below the caps so the next sweep is many writes away
+            max_entries = int(self.max_entries * EVICTION_LOW_WATER)
+            max_bytes = int(self.max_bytes * EVICTION_LOW_WATER)
+            rows = self._conn.execute(
+                "SELECT cache_key, size_bytes FROM llm_responses ORDER BY last_accessed"
+            ).fetchall()
+            stale_keys = []
+            for cache_key, size_bytes in rows:
+                if count <= max_entries and total_bytes <= max_bytes:
+                    break
+                stale_keys.append((cache_key,))
+                count -= 1
+                total_bytes -= size_bytes
+            self._conn.executemany("DELETE FROM llm_responses WHERE cache_key = ?", stale_keys)
+            evicted = len(stale_keys)
+        if expired or evicted:
+            logger.info(f"Evicted {expired} expired and {evicted} least recently used LLM cache entries")
+        self.stats['evictions'] += expired + evicted
+        self._size_estimate = (count, total_bytes)
+        self._last_sweep = now
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache hit/miss/write/eviction counters"""
+        with self._lock:
+            return self.stats.copy()
+
+
+_llm_response_cache: Optional[LLMResponseCacheService] = None
+
+
+def get_llm_response_cache() -> LLMResponseCacheService:
+    """Return the process-wide LLM response cache configured from the environment"""
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        _llm_response_cache = LLMResponseCacheService(
+            db_path=Path(os.getenv("LLM_CACHE_PATH", str(Path("storage") / "cache" / "llm_responses.sqlite3"))),
+            ttl_seconds=int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000")),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 ** 2))),
+            cache_all_temperatures=os.getenv("LLM_CACHE_ALL_TEMPERATURES", "false").lower() == "true",
+            enabled=os.getenv("LLM_CACHE_DISABLED", "false").lower() != "true"
+        )
+    return _llm_response_cache
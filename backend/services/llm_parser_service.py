@@ -1,6 +1,7 @@
+import os
 import json
 import asyncio
-from typing import Dict, List, Optional, Any
+from typing import AsyncIterator, Dict, List, Optional, Any
 from datetime import datetime, date
 from decimal import Decimal
 import logging
@@ -11,8 +12,12 @@ from models.tradeline_models import Tradeline
 from models.llm_models import NormalizationResult
 from config.llm_config import LLMConfig
 from utils.llm_helpers import TokenCounter, ResponseValidator
+from utils.rate_limiter import get_llm_rate_limiter
+from utils.json_stream import IncrementalJSONParser, parse_streamed_items
 from .prompt_templates import PromptTemplates
 from .enhanced_extraction_service import EnhancedExtractionService
+from .llm_cache_service import get_llm_response_cache
+from .progress_service import get_progress_hub
 from ..enhanced_bureau_detection import EnhancedBureauDetector
 
 try:
@@ -28,21 +33,36 @@ class ProcessingContext:
     document_type: str
     confidence_threshold: float = 0.7
     max_retries: int = 3
+    bypass_cache: bool = False  # Always call the provider, e.g. when reprocessing on request
 
 class LLMParserService:
     """Service for parsing and normalizing document data using LLM"""
     
-    def __init__(self, config: LLMConfig):
+    def __init__(self, config: LLMConfig, supabase_client: Optional[Any] = None):
         self.config = config
+        # Shared supabase Client; defaults to the process-wide pooled client
+        self.supabase_client = supabase_client
+        self._enhanced_tradeline_service = None
         if AsyncOpenAI and config and hasattr(config, 'openai_api_key'):
             self.client = AsyncOpenAI(api_key=config.openai_api_key) # type: ignore
         else:
             self.client = None
-        self.token_counter = TokenCounter()
+        self.token_counter = TokenCounter(config.model_name) if config else TokenCounter()
         self.response_validator = ResponseValidator()
         self.prompt_templates = PromptTemplates()
         self.enhanced_extraction = EnhancedExtractionService()
         self.bureau_detector = EnhancedBureauDetector()
+        self.rate_limiter = get_llm_rate_limiter()
+        self.response_cache = get_llm_response_cache()
+        self.progress_hub = get_progress_hub()
+        # Tradelines packed into one normalization request; 1 = one request per tradeline
+        self.normalization_batch_size = int(os.getenv("LLM_NORMALIZATION_BATCH_SIZE", "20"))
+        self.batch_completion_tokens = 4000
+        self.completion_tokens_per_tradeline = 200  # Rough size of one normalized tradeline in the response
+        # Regex tradelines scoring below this are re-extracted by the LLM
+        self.escalation_threshold = float(os.getenv("LLM_ESCALATION_THRESHOLD", "0.5"))
+        # Tradelines saved per bulk write in the persist stage
+        self.persist_batch_size = int(os.getenv("TRADELINE_PERSIST_BATCH_SIZE", "100"))
         
     async def normalize_tradeline_data(
         self, 
@@ -64,25 +84,21 @@ class LLMParserService:
         try:
             logger.info(f"Starting LLM normalization for job {context.job_id}")
             
-            # Step 1: Extract structured data from raw text
-            structured_data = await self._extract_structured_data(
-                raw_text, table_data, context
-            )
-            
-            # Step 2: Normalize tradeline information
-            normalized_tradelines = await self._normalize_tradelines(
-                structured_data, context
-            )
-            
-            # Step 3: Extract consumer information
-            consumer_info = await self._extract_consumer_info(
-                raw_text, context
-            )
-            
-            # Step 4: Validate and generate confidence scores
-            validation_results = await self._validate_and_score(
-                normalized_tradelines, consumer_info, context
-            )
+            # Steps 1-4 as a dependency graph: consumer info extraction runs alongside
+            # structured extraction and tradeline normalization; validation waits for both
+            stage_results = await self._run_stage_graph({
+                "structured_data": ((), lambda: self._extract_structured_data(raw_text, table_data, context)),
+                "tradelines": (("structured_data",), lambda structured_data: self._normalize_tradelines(
+                    structured_data, context
+                )),
+                "consumer_info": ((), lambda: self._extract_consumer_info(raw_text, context)),
+                "validation": (("tradelines", "consumer_info"), lambda tradelines, consumer_info: self._validate_and_score(
+                    tradelines, consumer_info, context
+                )),
+            }, job_id=context.job_id)
+            normalized_tradelines = stage_results["tradelines"]
+            consumer_info = stage_results["consumer_info"]
+            validation_results = stage_results["validation"]
             
             # Step 5: Create final normalized result
             result = NormalizationResult(
@@ -106,6 +122,38 @@ class LLMParserService:
             logger.error(f"Error in LLM normalization for job {context.job_id}: {str(e)}")
             raise
     
+    async def _run_stage_graph(self, stages: Dict[str, tuple], job_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run async stages concurrently, each starting as soon as its dependencies finish
+        
+        Args:
+            stages: name -> (dependency names, factory taking the dependency results and
+                    returning a coroutine), listed so dependencies come first
+            job_id: If given, an 'llm_step_completed' progress event is published per stage
+            
+        Returns:
+            Stage name -> result
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+        
+        async def run_stage(name: str) -> Any:
+            dependencies, factory = stages[name]
+            dependency_results = await asyncio.gather(*(tasks[dependency] for dependency in dependencies))
+            result = await factory(*dependency_results)
+            if job_id:
+                self.progress_hub.publish(job_id, 'llm_step_completed', llm_step=name)
+            return result
+        
+        for name in stages:
+            tasks[name] = asyncio.ensure_future(run_stage(name))
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        return dict(zip(tasks.keys(), results))
+    
     async def _extract_structured_data(
         self, 
         raw_text: str, 
@@ -118,61 +166,103 @@ class LLMParserService:
         detected_bureau, confidence, evidence = self.bureau_detector.detect_credit_bureau(raw_text)
         logger.info(f"Bureau detected: {detected_bureau} (confidence: {confidence:.2f}) for job {context.job_id}")
         
-        # Step 2: Use enhanced extraction service for better tradeline detection
-        enhanced_tradelines = self.enhanced_extraction.extract_enhanced_tradelines(raw_text, detected_bureau)
-        logger.info(f"Enhanced extraction found {len(enhanced_tradelines)} tradelines for job {context.job_id}")
-        
-        # Step 3: If enhanced extraction found good results, use them
-        if enhanced_tradelines and len(enhanced_tradelines) > 0:
-            # Filter out low-confidence tradelines
-            high_confidence_tradelines = [
-                tl for tl in enhanced_tradelines 
-                if tl.get('confidence_score', 0) >= 0.3
-            ]
-            
-            if high_confidence_tradelines:
-                logger.info(f"Using {len(high_confidence_tradelines)} high-confidence tradelines from enhanced extraction")
-                return {
-                    "consumer_info": {},  # Will be extracted separately
-                    "tradelines": high_confidence_tradelines,
-                    "inquiries": [],
-                    "public_records": [],
-                    "extraction_method": "enhanced",
-                    "detected_bureau": detected_bureau,
-                    "bureau_confidence": confidence
-                }
+        # Step 2: Extract every section with regex; only low-confidence sections go to the LLM
+        routes = await self.enhanced_extraction.route_sections_parallel(
+            raw_text, detected_bureau, escalation_threshold=self.escalation_threshold
+        )
+        if not routes:
+            # Nothing recognizable: let the LLM read the whole document, section-sized piece by piece
+            logger.info(f"No tradeline sections recognized, escalating full text for job {context.job_id}")
+            routes = [{'index': index, 'section': section, 'tradeline': None, 'escalate': True}
+                      for index, section in enumerate(self.enhanced_extraction.segment_text(raw_text, detected_bureau))]
         
-        # Step 4: Fallback to LLM extraction with enhanced prompt
-        logger.info(f"Falling back to LLM extraction for job {context.job_id}")
-        enhanced_prompt = self.enhanced_extraction.get_enhanced_extraction_prompt(raw_text, detected_bureau)
+        # Step 3: Escalate low-confidence sections to the LLM in token-budgeted batches
+        escalated_routes = [route for route in routes if route['escalate']]
+        llm_tradelines_by_section: Dict[int, List[Dict[str, Any]]] = {}
+        if escalated_routes:
+            batch_results = await asyncio.gather(*[
+                self._extract_section_batch(batch, detected_bureau, context)
+                for batch in self._plan_section_batches(escalated_routes, detected_bureau)
+            ])
+            for batch_result in batch_results:
+                for index, section_tradelines in batch_result.items():
+                    llm_tradelines_by_section.setdefault(index, []).extend(section_tradelines)
         
-        response = await self._make_llm_request(
-            prompt=enhanced_prompt,
-            context=context,
-            operation="enhanced_llm_extraction"
+        # Step 4: Merge in document order, keeping the regex result where the LLM found nothing
+        tradelines = []
+        for route in routes:
+            section_tradelines = llm_tradelines_by_section.get(route['index']) if route['escalate'] else None
+            if section_tradelines:
+                tradelines.extend(section_tradelines)
+            elif route['tradeline']:
+                tradelines.append(route['tradeline'])
+        
+        logger.info(f"Hybrid extraction found {len(tradelines)} tradelines for job {context.job_id} "
+                   f"({len(routes) - len(escalated_routes)} sections by regex, {len(escalated_routes)} escalated)")
+        return {
+            "consumer_info": {},  # Will be extracted separately
+            "tradelines": tradelines,
+            "inquiries": [],
+            "public_records": [],
+            "extraction_method": "hybrid" if escalated_routes else "enhanced",
+            "escalated_sections": len(escalated_routes),
+            "detected_bureau": detected_bureau,
+            "bureau_confidence": confidence
+        }
+    
+    def _plan_section_batches(self, routes: List[Dict[str, Any]], detected_bureau: str) -> List[List[tuple]]:
+        """
+        Pack escalated sections into (index, text) batches that fit the token budget
+        
+        Whole sections spill into further batches rather than being truncated; only a
+        section larger than a whole request is split on line boundaries.
+        """
+        overhead_tokens = self.token_counter.count_packing_tokens(
+            self.enhanced_extraction.get_section_extraction_prompt([], detected_bureau)
+        )
+        return self.token_counter.pack_sections(
+            [(route['index'], route['section']) for route in routes],
+            budget=self.config.max_tokens - self.batch_completion_tokens - overhead_tokens,
+            max_sections_per_pack=max(1, self.batch_completion_tokens // self.completion_tokens_per_tradeline)
         )
+    
+    def _pack_text_sections(self, text: str, budget: int, detected_bureau: str = "Unknown") -> List[str]:
+        """Split report text at section boundaries and pack whole sections into budget-sized texts"""
+        sections = self.enhanced_extraction.segment_text(text, detected_bureau)
+        packs = self.token_counter.pack_sections(list(enumerate(sections)), budget)
+        return ['\n\n'.join(section for _, section in pack) for pack in packs]
+    
+    async def _extract_section_batch(
+        self, 
+        batch: List[tuple], 
+        detected_bureau: str, 
+        context: ProcessingContext
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Extract tradelines from a batch of escalated sections; returns section index -> tradelines
         
+        Tradelines are validated as they stream in; those received before a failure are kept.
+        """
+        section_indexes = {index for index, _ in batch}
+        tradelines_by_section: Dict[int, List[Dict[str, Any]]] = {}
         try:
-            structured_data = json.loads(response)
-            
-            # Add metadata
-            structured_data["extraction_method"] = "llm_enhanced"
-            structured_data["detected_bureau"] = detected_bureau
-            structured_data["bureau_confidence"] = confidence
-            
-            return structured_data
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {str(e)}")
-            # Attempt to clean and re-parse
-            cleaned_response = self._clean_json_response(response)
-            parsed_data = json.loads(cleaned_response)
-            
-            # Add metadata to cleaned response
-            parsed_data["extraction_method"] = "llm_enhanced_cleaned"
-            parsed_data["detected_bureau"] = detected_bureau
-            parsed_data["bureau_confidence"] = confidence
+            async for entry in self._stream_llm_items(
+                prompt=self.enhanced_extraction.get_section_extraction_prompt(batch, detected_bureau),
+                context=context,
+                operation=f"section_extraction_{batch[0][0]}_{batch[-1][0]}",
+                max_tokens=self.batch_completion_tokens
+            ):
+                if entry.get("section_index") not in section_indexes or not entry.get("creditor_name"):
+                    continue
+                entry.setdefault("confidence_score", 0.5)
+                validated = self.enhanced_extraction._validate_and_enhance_tradelines([entry])
+                if validated:
+                    validated[0]['extraction_method'] = 'llm_section_extraction'
+                    tradelines_by_section.setdefault(entry.pop("section_index"), []).append(validated[0])
             
-            return parsed_data
+        except Exception as e:
+            logger.error(f"Error extracting escalated sections {batch[0][0]}-{batch[-1][0]}: {str(e)}")
+        return tradelines_by_section
     
     async def _normalize_tradelines(
         self, 
@@ -181,38 +271,181 @@ class LLMParserService:
     ) -> List[Tradeline]:
         """Normalize tradeline data into standard format"""
         
-        tradelines = []
         raw_tradelines = structured_data.get("tradelines", [])
+        normalized_count = 0
+        self.progress_hub.publish(context.job_id, 'normalization_started', stage='llm',
+                                  tradelines_total=len(raw_tradelines), tradelines_normalized=0)
+        
+        async def normalize_and_report(normalization, count: int) -> Any:
+            nonlocal normalized_count
+            result = await normalization
+            normalized_count += count
+            self.progress_hub.publish(context.job_id, 'tradelines_normalized', stage='llm',
+                                      stage_progress=normalized_count / len(raw_tradelines),
+                                      tradelines_normalized=normalized_count)
+            return result
+        
+        # Requests run concurrently; the shared rate limiter paces them
+        if self.normalization_batch_size <= 1:
+            return list(await asyncio.gather(*[
+                normalize_and_report(self._normalize_single_tradeline(idx, raw_tradeline, context), 1)
+                for idx, raw_tradeline in enumerate(raw_tradelines)
+            ]))
         
+        batch_results = await asyncio.gather(*[
+            normalize_and_report(self._normalize_tradeline_batch(batch, context), len(batch))
+            for batch in self._plan_normalization_batches(raw_tradelines, context)
+        ])
+        return [tradeline for batch_tradelines in batch_results for tradeline in batch_tradelines]
+    
+    async def _normalize_single_tradeline(
+        self, 
+        idx: int, 
+        raw_tradeline: Dict[str, Any], 
+        context: ProcessingContext
+    ) -> Tradeline:
+        """Normalize one tradeline with its own LLM request, falling back to the raw data"""
+        try:
+            # Create normalization prompt for individual tradeline
+            prompt = self.prompt_templates.get_tradeline_normalization_prompt(
+                raw_tradeline=raw_tradeline,
+                context=context
+            )
+            
+            response = await self._make_llm_request(
+                prompt=prompt,
+                context=context,
+                operation=f"tradeline_normalization_{idx}"
+            )
+            
+            # Parse and validate tradeline
+            normalized_data = json.loads(response)
+            return self._create_tradeline_from_normalized_data(
+                normalized_data, raw_tradeline
+            )
+            
+        except Exception as e:
+            logger.error(f"Error normalizing tradeline {idx}: {str(e)}")
+            # Create a basic tradeline with available data
+            return self._create_fallback_tradeline(raw_tradeline)
+    
+    def _plan_normalization_batches(
+        self, 
+        raw_tradelines: List[Dict[str, Any]], 
+        context: ProcessingContext
+    ) -> List[List[tuple]]:
+        """
+        Pack (index, raw_tradeline) pairs into batches that fit the token budget
+        
+        A batch is closed when the next tradeline would push the prompt past the model's
+        input budget, its expected response past batch_completion_tokens, or the batch
+        past normalization_batch_size items.
+        """
+        prompt_budget = self.config.max_tokens - self.batch_completion_tokens
+        max_items = min(self.normalization_batch_size,
+                        max(1, self.batch_completion_tokens // self.completion_tokens_per_tradeline))
+        overhead_tokens = self.token_counter.count_packing_tokens(self._get_batch_normalization_prompt([], context))
+        
+        batches = []
+        batch, batch_tokens = [], overhead_tokens
         for idx, raw_tradeline in enumerate(raw_tradelines):
-            try:
-                # Create normalization prompt for individual tradeline
-                prompt = self.prompt_templates.get_tradeline_normalization_prompt(
-                    raw_tradeline=raw_tradeline,
-                    context=context
-                )
-                
-                response = await self._make_llm_request(
-                    prompt=prompt,
-                    context=context,
-                    operation=f"tradeline_normalization_{idx}"
-                )
-                
-                # Parse and validate tradeline
-                normalized_data = json.loads(response)
-                tradeline = self._create_tradeline_from_normalized_data(
-                    normalized_data, raw_tradeline
-                )
-                
-                tradelines.append(tradeline)
-                
-            except Exception as e:
-                logger.error(f"Error normalizing tradeline {idx}: {str(e)}")
-                # Create a basic tradeline with available data
-                fallback_tradeline = self._create_fallback_tradeline(raw_tradeline)
-                tradelines.append(fallback_tradeline)
+            item_tokens = self.token_counter.count_packing_tokens(
+                json.dumps({"index": idx, "tradeline": raw_tradeline}, default=str)
+            )
+            if batch and (len(batch) >= max_items or batch_tokens + item_tokens > prompt_budget):
+                batches.append(batch)
+                batch, batch_tokens = [], overhead_tokens
+            batch.append((idx, raw_tradeline))
+            batch_tokens += item_tokens
+        if batch:
+            batches.append(batch)
+        
+        logger.info(f"Packed {len(raw_tradelines)} tradelines into {len(batches)} normalization "
+                   f"request(s) for job {context.job_id}")
+        return batches
+    
+    def _get_batch_normalization_prompt(self, batch: List[tuple], context: ProcessingContext) -> str:
+        """Build one prompt that normalizes every tradeline in the batch"""
+        items = "\n".join(
+            json.dumps({"index": idx, "tradeline": raw_tradeline}, default=str)
+            for idx, raw_tradeline in batch
+        )
+        return f"""Normalize each of the following tradelines from a {context.document_type} credit report.
+
+Return ONLY a JSON object of the form {{"tradelines": [...]}} with exactly one entry per input
+tradeline, echoing its "index". Each entry must have these fields:
+- index: the input index (integer)
+- creditor_name: standardized creditor name
+- account_number: account number as shown (masked digits allowed)
+- account_type: one of Credit Card, Auto Loan, Mortgage, Student Loan, Personal Loan, Collection, Other
+- balance: number or null
+- credit_limit: number or null
+- payment_status: current payment status
+- date_opened: YYYY-MM-DD or null
+- date_closed: YYYY-MM-DD or null
+- payment_history: list of payment history entries
+- confidence_score: number between 0 and 1
+
+Tradelines (one JSON object per line):
+{items}"""
+    
+    async def _normalize_tradeline_batch(
+        self, 
+        batch: List[tuple], 
+        context: ProcessingContext
+    ) -> List[Tradeline]:
+        """
+        Normalize a batch of tradelines with a single streamed LLM request
         
-        return tradelines
+        Entries are matched back to their inputs by index and resolved as soon as they
+        stream in. Any tradeline whose entry is missing or fails schema validation is
+        retried with its own request.
+        """
+        raw_by_index = dict(batch)
+        resolved: Dict[int, asyncio.Future] = {}
+        first_idx, last_idx = batch[0][0], batch[-1][0]
+        try:
+            async for entry in self._stream_llm_items(
+                prompt=self._get_batch_normalization_prompt(batch, context),
+                context=context,
+                operation=f"tradeline_normalization_batch_{first_idx}_{last_idx}",
+                max_tokens=self.batch_completion_tokens
+            ):
+                idx = entry.get("index")
+                if idx in raw_by_index and idx not in resolved:
+                    resolved[idx] = asyncio.ensure_future(
+                        self._resolve_normalized_entry(idx, raw_by_index[idx], entry, context)
+                    )
+                    
+        except Exception as e:
+            logger.error(f"Error normalizing tradeline batch {first_idx}-{last_idx}: {str(e)}")
+        
+        for idx, raw_tradeline in batch:
+            if idx not in resolved:
+                resolved[idx] = asyncio.ensure_future(
+                    self._resolve_normalized_entry(idx, raw_tradeline, None, context)
+                )
+        return list(await asyncio.gather(*[resolved[idx] for idx, _ in batch]))
+    
+    async def _resolve_normalized_entry(
+        self, 
+        idx: int, 
+        raw_tradeline: Dict[str, Any], 
+        normalized_data: Optional[Dict[str, Any]], 
+        context: ProcessingContext
+    ) -> Tradeline:
+        """Build a tradeline from a batch entry, falling back to a single request if it is unusable"""
+        if normalized_data is not None:
+            is_valid, errors = self.response_validator.validate_tradeline_data(normalized_data)
+            if is_valid:
+                try:
+                    return self._create_tradeline_from_normalized_data(normalized_data, raw_tradeline)
+                except Exception as e:
+                    errors = [str(e)]
+            logger.warning(f"Batched normalization of tradeline {idx} failed validation: {errors}")
+        else:
+            logger.warning(f"Batched normalization returned no entry for tradeline {idx}")
+        return await self._normalize_single_tradeline(idx, raw_tradeline, context)
     
     async def _extract_consumer_info(
         self, 
@@ -221,15 +454,24 @@ class LLMParserService:
     ) -> ConsumerInfo:
         """Extract consumer information from document"""
         
+        # Personal information sits at the top of a report: send the leading whole
+        # sections that fit instead of a middle-truncated copy of the full text
+        overhead_tokens = self.token_counter.count_packing_tokens(
+            self.prompt_templates.get_consumer_info_prompt(raw_text="", context=context)
+        )
+        leading_text = self._pack_text_sections(
+            raw_text, self.config.max_tokens - self.batch_completion_tokens - overhead_tokens
+        )[:1]
         prompt = self.prompt_templates.get_consumer_info_prompt(
-            raw_text=raw_text,
+            raw_text=leading_text[0] if leading_text else raw_text,
             context=context
         )
         
         response = await self._make_llm_request(
             prompt=prompt,
             context=context,
-            operation="consumer_info_extraction"
+            operation="consumer_info_extraction",
+            max_tokens=self.batch_completion_tokens
         )
         
         try:
@@ -284,40 +526,49 @@ class LLMParserService:
         
         for attempt in range(context.max_retries):
             try:
-                # Count tokens before making request
-                token_count = self.token_counter.count_tokens(prompt)
+                # Count tokens and truncate the prompt if too long, in a single encode pass
+                prompt, token_count = self.token_counter.fit_prompt(
+                    prompt, 
+                    self.config.max_tokens - max_tokens
+                )
                 
-                if token_count > self.config.max_tokens - max_tokens:
-                    # Truncate prompt if too long
-                    prompt = self.token_counter.truncate_prompt(
-                        prompt, 
-                        self.config.max_tokens - max_tokens
+                # Serve repeated deterministic requests from the persistent cache
+                use_cache = self.response_cache.is_cacheable(self.config.temperature, context.bypass_cache)
+                if use_cache:
+                    cache_key = self.response_cache.make_key(
+                        self.config.model_name, self.config.temperature, self.config.top_p,
+                        max_tokens, self.config.system_prompt, prompt
                     )
+                    cached_content = await self.response_cache.get(cache_key)
+                    if cached_content is not None:
+                        logger.info(f"LLM response served from cache for operation: {operation}")
+                        return cached_content
                 
-                response = await self.client.chat.completions.create(
-                    model=self.config.model_name,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": self.config.system_prompt
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    max_tokens=max_tokens,
-                    temperature=self.config.temperature,
-                    top_p=self.config.top_p
-                )
+                # Reserve rate-limit budget for the prompt plus the largest possible completion
+                reserved_tokens = await self.rate_limiter.acquire(token_count + max_tokens)
+                try:
+                    response = await self._create_chat_completion(prompt, max_tokens)
+                except Exception:
+                    # A failed request still counts against RPM but returns its token reservation
+                    self.rate_limiter.settle(reserved_tokens, token_count)
+                    raise
                 
                 content = response.choices[0].message.content
                 
                 # Track token usage
                 self.token_counter.add_tokens(
                     prompt_tokens=response.usage.prompt_tokens,
-                    completion_tokens=response.usage.completion_tokens
+                    completion_tokens=response.usage.completion_tokens,
+                    estimated_prompt_tokens=token_count + self.token_counter.count_tokens(self.config.system_prompt)
                 )
+                self.rate_limiter.settle(reserved_tokens, response.usage.total_tokens)
+                
+                # Only cache parseable responses so a malformed answer is not replayed
+                if use_cache and self.response_validator.validate_json_response(content or "")[0]:
+                    await self.response_cache.put(
+                        cache_key, self.config.model_name, self.config.temperature,
+                        self.config.top_p, content
+                    )
                 
                 logger.info(f"LLM request successful for operation: {operation}")
                 return content
@@ -328,6 +579,109 @@ class LLMParserService:
                     raise
                 await asyncio.sleep(2 ** attempt)  # Exponential backoff
     
+    async def _stream_llm_items(
+        self, 
+        prompt: str, 
+        context: ProcessingContext, 
+        operation: str,
+        max_tokens: int = 4000,
+        item_key: str = "tradelines"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a completion and yield each object of its item_key array as soon as it closes
+        
+        Shares prompt fitting, response caching and rate limiting with _make_llm_request.
+        A failed attempt is only retried if nothing has been yielded yet, so consumers
+        never see an item twice.
+        """
+        yielded = 0
+        for attempt in range(context.max_retries):
+            try:
+                prompt, token_count = self.token_counter.fit_prompt(
+                    prompt, 
+                    self.config.max_tokens - max_tokens
+                )
+                
+                use_cache = self.response_cache.is_cacheable(self.config.temperature, context.bypass_cache)
+                if use_cache:
+                    cache_key = self.response_cache.make_key(
+                        self.config.model_name, self.config.temperature, self.config.top_p,
+                        max_tokens, self.config.system_prompt, prompt
+                    )
+                    cached_content = await self.response_cache.get(cache_key)
+                    if cached_content is not None:
+                        logger.info(f"LLM response served from cache for operation: {operation}")
+                        for item in parse_streamed_items(cached_content, item_key):
+                            yield item
+                        return
+                
+                reserved_tokens = await self.rate_limiter.acquire(token_count + max_tokens)
+                parser = IncrementalJSONParser(item_key)
+                content_parts = []
+                usage = None
+                try:
+                    stream = await self._create_chat_completion(prompt, max_tokens, stream=True)
+                    async for chunk in stream:
+                        if getattr(chunk, 'usage', None):
+                            usage = chunk.usage
+                        if not chunk.choices or not chunk.choices[0].delta.content:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        content_parts.append(delta)
+                        for item in parser.feed(delta):
+                            yielded += 1
+                            yield item
+                except Exception:
+                    self.rate_limiter.settle(reserved_tokens, token_count)
+                    raise
+                
+                content = ''.join(content_parts)
+                if usage:
+                    self.token_counter.add_tokens(
+                        prompt_tokens=usage.prompt_tokens,
+                        completion_tokens=usage.completion_tokens,
+                        estimated_prompt_tokens=token_count + self.token_counter.count_tokens(self.config.system_prompt)
+                    )
+                    self.rate_limiter.settle(reserved_tokens, usage.total_tokens)
+                else:
+                    self.rate_limiter.settle(reserved_tokens, token_count + self.token_counter.count_tokens(content))
+                
+                if use_cache and parser.finished and self.response_validator.validate_json_response(content)[0]:
+                    await self.response_cache.put(
+                        cache_key, self.config.model_name, self.config.temperature,
+                        self.config.top_p, content
+                    )
+                
+                logger.info(f"LLM stream completed for operation: {operation} ({yielded} items)")
+                return
+                
+            except Exception as e:
+                logger.error(f"LLM stream failed (attempt {attempt + 1}): {str(e)}")
+                if yielded or attempt == context.max_retries - 1:
+                    raise
+                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+    
+    async def _create_chat_completion(self, prompt: str, max_tokens: int, stream: bool = False) -> Any:
+        """Send one chat completion request to the provider (an async chunk stream if stream=True)"""
+        stream_kwargs = {"stream": True, "stream_options": {"include_usage": True}} if stream else {}
+        return await self.client.chat.completions.create(
+            model=self.config.model_name,
+            messages=[
+                {
+                    "role": "system",
+                    "content": self.config.system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            max_tokens=max_tokens,
+            temperature=self.config.temperature,
+            top_p=self.config.top_p,
+            **stream_kwargs
+        )
+    
     def _create_tradeline_from_normalized_data(
         self, 
         normalized_data: Dict[str, Any], 
@@ -393,17 +747,7 @@ class LLMParserService:
     
     def _clean_json_response(self, response: str) -> str:
         """Clean LLM response to extract valid JSON"""
-        # Remove code blocks
-        response = response.replace("```json", "").replace("```", "")
-        
-        # Find JSON object boundaries
-        start_idx = response.find("{")
-        end_idx = response.rfind("}") + 1
-        
-        if start_idx >= 0 and end_idx > start_idx:
-            return response[start_idx:end_idx]
-        
-        return response
+        return self.response_validator.clean_json_response(response)
     
     def _create_validation_result(self, validation_data: Dict[str, Any]) -> Any:
         """Create validation result from LLM response"""
@@ -424,6 +768,15 @@ class LLMParserService:
         Args:
             job_id: The job ID to process
         """
+        normalization_result = await self.normalize_document_job(job_id)
+        
+        # Trigger next stage (bureau detection and enhanced processing)
+        await self._trigger_enhanced_processing(job_id, normalization_result)
+        
+        logger.info(f"LLM processing completed for job {job_id}")
+    
+    async def normalize_document_job(self, job_id: str) -> NormalizationResult:
+        """Normalize a job's stored Document AI output with the LLM and store the results"""
         try:
             logger.info(f"Starting LLM processing for job {job_id}")
             
@@ -436,6 +789,8 @@ class LLMParserService:
             if not llm_input_data:
                 raise ValueError(f"No LLM input data found for job {job_id}")
             
+            self.progress_hub.publish(job_id, 'stage_started', stage='llm')
+            
             # Create processing context
             context = ProcessingContext(
                 job_id=job_id,
@@ -453,25 +808,29 @@ class LLMParserService:
             
             # Store LLM processing results
             await self._store_llm_results(storage, job_id, normalization_result)
-            
-            # Trigger next stage (bureau detection and enhanced processing)
-            await self._trigger_enhanced_processing(job_id, normalization_result)
-            
-            logger.info(f"LLM processing completed for job {job_id}")
+            self.progress_hub.publish(job_id, 'stage_completed', stage='llm', stage_progress=1.0,
+                                      tradelines_normalized=len(normalization_result.tradelines))
+            return normalization_result
             
         except Exception as e:
             logger.error(f"LLM processing failed for job {job_id}: {str(e)}")
             raise
     
+    async def persist_job_results(self, job_id: str, raise_errors: bool = False) -> None:
+        """Run enhanced processing on a job's stored LLM results (see _persist_tradelines)"""
+        from ..services.storage_service import StorageService
+        llm_results = await StorageService().get_llm_results(job_id)
+        if not llm_results:
+            raise ValueError(f"No LLM results found for job {job_id}")
+        await self._persist_tradelines(job_id, llm_results.get('tradelines', []), raise_errors)
+    
     async def _get_llm_input_data(self, storage: 'StorageService', job_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve LLM input data from storage"""
         try:
             # Try to get LLM input data prepared by document processor
-            input_path = storage.base_path / "llm_input" / f"{job_id}.json"
-            if input_path.exists():
-                import json
-                with open(input_path, 'r') as f:
-                    return json.load(f)
+            llm_input_data = await storage.get_llm_input(job_id)
+            if llm_input_data:
+                return llm_input_data
             
             # Fallback: Get directly from Document AI results
             ai_results = await storage.get_document_ai_results(job_id)
@@ -503,58 +862,85 @@ class LLMParserService:
                 'validation_results': result.validation_results
             }
             
-            results_path = storage.base_path / "processed" / f"{job_id}_llm_results.json"
-            import json
-            with open(results_path, 'w') as f:
-                json.dump(results_data, f, indent=2, default=str)
-                
-            logger.info(f"Stored LLM results for job {job_id}")
+            await storage.store_llm_results(job_id, results_data)
             
         except Exception as e:
             logger.error(f"Error storing LLM results for job {job_id}: {str(e)}")
             raise
     
-    async def _trigger_enhanced_processing(self, job_id: str, normalization_result: NormalizationResult) -> None:
-        """Trigger enhanced processing (bureau detection + validation + deduplication)"""
-        try:
+    def _get_enhanced_tradeline_service(self):
+        """Build the enhanced tradeline service once, on the shared Supabase client"""
+        if self._enhanced_tradeline_service is None:
             # Import here to avoid circular imports
             from ..services.enhanced_tradeline_service import EnhancedTradelineService
+            from .supabase_client_service import get_supabase_client
             
-            # Get Supabase client from environment
-            import os
-            from supabase import create_client
-            
-            supabase_url = os.getenv("SUPABASE_URL")
-            supabase_key = os.getenv("SUPABASE_ANON_KEY")
-            
-            if not supabase_url or not supabase_key:
+            supabase_client = self.supabase_client or get_supabase_client()
+            if supabase_client is None:
+                return None
+            self._enhanced_tradeline_service = EnhancedTradelineService(supabase_client)
+        return self._enhanced_tradeline_service
+    
+    async def _trigger_enhanced_processing(self, job_id: str, normalization_result: NormalizationResult) -> None:
+        """Trigger enhanced processing (bureau detection + validation + deduplication)"""
+        await self._persist_tradelines(job_id, normalization_result.tradelines)
+    
+    async def _persist_tradelines(self, job_id: str, tradelines: List[Any], raise_errors: bool = False) -> None:
+        """
+        Save tradelines through the enhanced service (validation + deduplication + enrichment)
+        
+        Errors are logged and swallowed unless raise_errors is set, as it is for the queued
+        persist stage, which then fails and is retried if any tradeline could not be saved.
+        """
+        try:
+            enhanced_service = self._get_enhanced_tradeline_service()
+            if enhanced_service is None:
                 logger.warning(f"Supabase credentials not available for enhanced processing of job {job_id}")
                 return
             
-            # Initialize Supabase client and enhanced service
-            supabase_client = create_client(supabase_url, supabase_key)
-            enhanced_service = EnhancedTradelineService(supabase_client)
+            # Tradelines belong to this job's user; normalizations reused from the result
+            # cache may come from another user's upload and carry that job's row ids
+            from ..services.storage_service import StorageService
+            job_data = await StorageService().get_job_data(job_id) or {}
+            user_id = job_data.get('user_id')
+            tradeline_dicts = []
+            for tradeline in tradelines:
+                # Convert tradeline to dict if needed
+                tradeline_dict = tradeline.__dict__ if hasattr(tradeline, '__dict__') else tradeline
+                tradeline_dict = {key: value for key, value in tradeline_dict.items() if key != 'id'}
+                if user_id:
+                    tradeline_dict['user_id'] = user_id
+                tradeline_dicts.append(tradeline_dict)
+
             
-            # Process each tradeline through enhanced service
+            # Save in batches: one bulk insert per batch, with progress reported after each
             processed_count = 0
-            for tradeline in normalization_result.tradelines:
+            failed_count = 0
+            self.progress_hub.publish(job_id, 'stage_started', stage='persist',
+                                      tradelines_saved=0, tradelines_to_save=len(tradelines))
+            for start in range(0, len(tradeline_dicts), self.persist_batch_size):
+                batch = tradeline_dicts[start:start + self.persist_batch_size]
                 try:
-                    # Convert tradeline to dict if needed
-                    tradeline_dict = tradeline.__dict__ if hasattr(tradeline, '__dict__') else tradeline
-                    
                     # Process through enhanced service (includes deduplication, validation, etc.)
-                    result = await enhanced_service.process_tradeline(tradeline_dict)
-                    
-                    if result:
-                        processed_count += 1
-                        logger.debug(f"Successfully processed tradeline: {tradeline_dict.get('creditor_name', 'Unknown')}")
+                    results = await enhanced_service.process_tradelines(batch)
+                    saved = sum(1 for result in results if result)
+                    processed_count += saved
+                    failed_count += len(batch) - saved
                     
-                except Exception as tradeline_error:
-                    logger.error(f"Error processing individual tradeline in job {job_id}: {str(tradeline_error)}")
-                    continue
-            
-            logger.info(f"Enhanced processing completed for job {job_id}: {processed_count}/{len(normalization_result.tradelines)} tradelines processed")
+                except Exception as batch_error:
+                    failed_count += len(batch)
+                    logger.error(f"Error saving {len(batch)} tradelines in job {job_id}: {str(batch_error)}")
+                finally:
+                    self.progress_hub.publish(job_id, 'tradeline_processed', stage='persist',
+                                              stage_progress=(start + len(batch)) / len(tradelines),
+                                              tradelines_saved=processed_count)
+            
+            logger.info(f"Enhanced processing completed for job {job_id}: {processed_count}/{len(tradelines)} tradelines processed")
+            if failed_count and raise_errors:
+                raise RuntimeError(f"{failed_count}/{len(tradelines)} tradelines could not be saved")
             
         except Exception as e:
             logger.error(f"Error triggering enhanced processing for job {job_id}: {str(e)}")
+            if raise_errors:
+                raise
             # Don't raise - this is optional enhancement
\ No newline at end of file
@@ -1,17 +1,110 @@
+import asyncio
 import logging
-import subprocess
 import tempfile
+import io
 import os
-from typing import Tuple, Optional
+import sys
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Tuple, Optional, List
 from pathlib import Path
 
+try:
+    from PyPDF2 import PdfReader
+    PYPDF2_AVAILABLE = True
+except ImportError:
+    PYPDF2_AVAILABLE = False
+
+try:
+    import pikepdf
+    PIKEPDF_AVAILABLE = True
+except ImportError:
+    PIKEPDF_AVAILABLE = False
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+
+class HostSlotLimiter:
+    """
+    Host-wide concurrency budget for OCR subprocesses
+    
+    Each slot is a lock file under the system temp directory held with flock, so every
+    worker process on the host shares the same budget. Falls back to a per-process
+    semaphore where flock is unavailable.
+    """
+    
+    def __init__(self, max_slots: int, name: str = "credit_clarity_ocr_slots", poll_interval: float = 0.2):
+        self.max_slots = max(1, max_slots)
+        self.poll_interval = poll_interval
+        self.slot_dir = Path(tempfile.gettempdir()) / name
+        # asyncio primitives belong to one event loop, so each loop gets its own semaphore
+        self._local_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        if FCNTL_AVAILABLE:
+            self.slot_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _local_semaphore(self) -> asyncio.Semaphore:
+        """Per-process slot semaphore for the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._local_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._local_semaphores[loop] = asyncio.Semaphore(self.max_slots)
+            return semaphore
+    
+    def _try_acquire(self) -> Optional[int]:
+        for slot in range(self.max_slots):
+            fd = os.open(self.slot_dir / f"slot-{slot}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError:
+                os.close(fd)
+        return None
+    
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one OCR slot for the duration of the block"""
+        async with self._local_semaphore():
+            if not FCNTL_AVAILABLE:
+                yield
+                return
+            fd = self._try_acquire()
+            while fd is None:
+                await asyncio.sleep(self.poll_interval)
+                fd = self._try_acquire()
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+
 class OCRService:
     """Service for adding OCR text layer to PDFs using OCRmyPDF and Tesseract"""
     
-    def __init__(self):
+    _host_slots: Optional[HostSlotLimiter] = None
+    
+    def __init__(self, min_text_chars: int = 50, pages_per_slice: int = 8):
         self.tesseract_languages = ["eng"]  # Default to English, can be expanded
+        self.min_text_chars = min_text_chars  # Pages with less extractable text are treated as image-only
+        self.pages_per_slice = pages_per_slice  # Image-only pages per parallel OCRmyPDF run
+        self._ocrmypdf_available: Optional[bool] = None
+    
+    @property
+    def host_slots(self) -> HostSlotLimiter:
+        """Host-wide OCR budget (OCR_HOST_CONCURRENCY, default: CPU count), shared by all instances"""
+        if OCRService._host_slots is None:
+            OCRService._host_slots = HostSlotLimiter(int(os.getenv("OCR_HOST_CONCURRENCY", os.cpu_count() or 1)))
+        return OCRService._host_slots
         
     async def add_ocr_layer(self, pdf_content: bytes, filename: str = "document.pdf") -> Tuple[bytes, bool]:
         """
@@ -24,33 +117,34 @@ class OCRService:
         Returns:
             Tuple of (processed_pdf_bytes, success_flag)
         """
-        temp_input = None
-        temp_output = None
-        
         try:
             logger.info(f"Starting OCR processing for {filename}")
             
-            # Create temporary files
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_input:
-                temp_input.write(pdf_content)
-                temp_input_path = temp_input.name
-                
-            with tempfile.NamedTemporaryFile(suffix="_ocr.pdf", delete=False) as temp_output:
-                temp_output_path = temp_output.name
+            # Find pages that already have a text layer; only image-only pages need OCR
+            text_native_pages = await asyncio.to_thread(self.classify_pages, pdf_content)
+            image_only_pages = [i + 1 for i, is_text in enumerate(text_native_pages) if not is_text]
+            if text_native_pages and not image_only_pages:
+                logger.info(f"All {len(text_native_pages)} pages of {filename} have a text layer, skipping OCR")
+                return pdf_content, True
+            if image_only_pages:
+                logger.info(f"OCR needed for {len(image_only_pages)}/{len(text_native_pages)} pages "
+                           f"of {filename}: {self._to_page_ranges(image_only_pages)}")
             
             # Check if OCRmyPDF is available
-            if not self._check_ocrmypdf_available():
+            if not await self._check_ocrmypdf_available():
                 logger.warning("OCRmyPDF not available, returning original PDF")
                 return pdf_content, False
                 
-            # Run OCRmyPDF
-            success = await self._run_ocrmypdf(temp_input_path, temp_output_path)
-            
-            if success:
-                # Read the OCR'd PDF
-                with open(temp_output_path, 'rb') as f:
-                    ocr_pdf_content = f.read()
-                    
+            slices = self._plan_slices(image_only_pages)
+            if PIKEPDF_AVAILABLE and len(slices) > 1:
+                # OCR page-range slices in parallel and merge them back into one PDF
+                ocr_pdf_content = await self._ocr_slices_parallel(pdf_content, slices)
+            else:
+                # Single OCRmyPDF run; text-native pages are copied through unchanged
+                page_ranges = self._to_page_ranges(image_only_pages) if image_only_pages else None
+                ocr_pdf_content = await self._ocr_single_run(pdf_content, page_ranges)
+            
+            if ocr_pdf_content is not None:
                 logger.info(f"OCR processing completed successfully for {filename}")
                 return ocr_pdf_content, True
             else:
@@ -61,83 +155,205 @@ class OCRService:
             logger.error(f"OCR processing error for {filename}: {str(e)}")
             return pdf_content, False
             
+    async def _ocr_single_run(self, pdf_content: bytes, page_ranges: Optional[str]) -> Optional[bytes]:
+        """Run OCRmyPDF once over the whole file, optionally limited to page ranges"""
+        temp_input_path = None
+        temp_output_path = None
+        try:
+            # Create temporary files
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_input:
+                temp_input.write(pdf_content)
+                temp_input_path = temp_input.name
+            
+            with tempfile.NamedTemporaryFile(suffix="_ocr.pdf", delete=False) as temp_output:
+                temp_output_path = temp_output.name
+            
+            if not await self._run_ocrmypdf(temp_input_path, temp_output_path, page_ranges):
+                return None
+            
+            # Read the OCR'd PDF
+            with open(temp_output_path, 'rb') as f:
+                return f.read()
+        
         finally:
             # Clean up temporary files
             self._cleanup_temp_files([temp_input_path, temp_output_path])
     
-    def _check_ocrmypdf_available(self) -> bool:
-        """Check if OCRmyPDF is installed and available"""
-        try:
-            import sys
-            # Try using Python module approach first
-            result = subprocess.run(
-                [sys.executable, "-m", "ocrmypdf", "--version"], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
+    async def _ocr_slices_parallel(self, pdf_content: bytes, slices: List[List[int]]) -> Optional[bytes]:
+        """OCR each page slice in its own OCRmyPDF process and splice the results back"""
+        with tempfile.TemporaryDirectory(prefix="ocr_slices_") as work_dir:
+            slice_paths = await asyncio.to_thread(self._write_slices, pdf_content, slices, work_dir)
+            
+            logger.info(f"Running OCRmyPDF on {len(slices)} slices in parallel "
+                       f"(host budget: {self.host_slots.max_slots})")
+            results = await asyncio.gather(*[
+                self._run_ocrmypdf(input_path, output_path, jobs=1)
+                for input_path, output_path in slice_paths
+            ])
+            if not all(results):
+                logger.warning(f"{results.count(False)}/{len(slices)} OCR slices failed")
+                return None
+            
+            return await asyncio.to_thread(
+                self._merge_slices, pdf_content, slices, [output_path for _, output_path in slice_paths]
             )
-            if result.returncode == 0:
-                return True
+    
+    def _write_slices(self, pdf_content: bytes, slices: List[List[int]], work_dir: str) -> List[Tuple[str, str]]:
+        """Write each slice of 1-based pages to its own PDF; returns (input, output) paths"""
+        slice_paths = []
+        with pikepdf.open(io.BytesIO(pdf_content)) as source_pdf:
+            for index, pages in enumerate(slices):
+                slice_pdf = pikepdf.new()
+                for page_num in pages:
+                    slice_pdf.pages.append(source_pdf.pages[page_num - 1])
+                input_path = os.path.join(work_dir, f"slice_{index}.pdf")
+                slice_pdf.save(input_path)
+                slice_paths.append((input_path, os.path.join(work_dir, f"slice_{index}_ocr.pdf")))
+        return slice_paths
+    
+    def _merge_slices(self, pdf_content: bytes, slices: List[List[int]], ocr_paths: List[str]) -> bytes:
+        """Replace image-only pages of the original PDF with their OCR'd versions"""
+        ocr_pdfs = [pikepdf.open(path) for path in ocr_paths]
+        try:
+            replacements = {
+                page_num: ocr_pdf.pages[offset]
+                for pages, ocr_pdf in zip(slices, ocr_pdfs)
+                for offset, page_num in enumerate(pages)
+            }
+            with pikepdf.open(io.BytesIO(pdf_content)) as source_pdf:
+                merged_pdf = pikepdf.new()
+                for page_num, page in enumerate(source_pdf.pages, 1):
+                    merged_pdf.pages.append(replacements.get(page_num, page))
+                merged_buffer = io.BytesIO()
+                merged_pdf.save(merged_buffer)
+                return merged_buffer.getvalue()
+        finally:
+            for ocr_pdf in ocr_pdfs:
+                ocr_pdf.close()
+    
+    def _plan_slices(self, image_only_pages: List[int]) -> List[List[int]]:
+        """Group image-only pages into slices of at most pages_per_slice pages"""
+        return [image_only_pages[i:i + self.pages_per_slice]
+                for i in range(0, len(image_only_pages), self.pages_per_slice)]
+    
+    def classify_pages(self, pdf_content: bytes) -> List[bool]:
+        """
+        Classify each page as text-native (True) or image-only (False)
+        
+        Uses the existing text layer via PyPDF2, or font resources via pikepdf when
+        PyPDF2 is unavailable. Returns an empty list if the PDF can't be inspected.
+        """
+        try:
+            if PYPDF2_AVAILABLE:
+                reader = PdfReader(io.BytesIO(pdf_content))
+                return [len((page.extract_text() or "").strip()) >= self.min_text_chars
+                        for page in reader.pages]
+            if PIKEPDF_AVAILABLE:
+                with pikepdf.open(io.BytesIO(pdf_content)) as pdf:
+                    return [bool(page.resources.get("/Font")) for page in pdf.pages]
+        except Exception as e:
+            logger.warning(f"Could not inspect PDF text layer, OCR will run on all pages: {str(e)}")
+        return []
+    
+    @staticmethod
+    def _to_page_ranges(pages: List[int]) -> str:
+        """Collapse 1-based page numbers into an OCRmyPDF --pages spec, e.g. [1, 2, 3, 7] -> '1-3,7'"""
+        ranges = []
+        start = previous = None
+        for page in pages:
+            if start is None:
+                start = previous = page
+            elif page == previous + 1:
+                previous = page
+            else:
+                ranges.append(f"{start}-{previous}" if previous > start else str(start))
+                start = previous = page
+        if start is not None:
+            ranges.append(f"{start}-{previous}" if previous > start else str(start))
+        return ",".join(ranges)
+    
+    async def _run_command(self, cmd: List[str], timeout: float) -> Tuple[int, str, str]:
+        """Run a subprocess without blocking the event loop; returns (returncode, stdout, stderr)"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
                 
-            # Fallback to binary approach
-            result = subprocess.run(
-                ["ocrmypdf", "--version"], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            return False
+    async def _check_ocrmypdf_available(self) -> bool:
+        """Check if OCRmyPDF is installed and available (cached after the first check)"""
+        if self._ocrmypdf_available is not None:
+            return self._ocrmypdf_available
+    
+        available = False
+        # Try using Python module approach first, then fall back to the binary
+        for cmd in ([sys.executable, "-m", "ocrmypdf", "--version"], ["ocrmypdf", "--version"]):
+            try:
+                returncode, _, _ = await self._run_command(cmd, timeout=10)
+                if returncode == 0:
+                    available = True
+                    break
+            except (asyncio.TimeoutError, FileNotFoundError):
+                continue
+        
+        self._ocrmypdf_available = available
+        return available
     
-    async def _run_ocrmypdf(self, input_path: str, output_path: str) -> bool:
+    async def _run_ocrmypdf(self, input_path: str, output_path: str, pages: Optional[str] = None,
+                            jobs: Optional[int] = None) -> bool:
         """
         Run OCRmyPDF command with optimized settings for credit reports
         
         Args:
             input_path: Path to input PDF
             output_path: Path to output OCR'd PDF
+            pages: Optional page spec (e.g. "1-3,7") limiting OCR to those pages
+            jobs: Optional number of OCRmyPDF worker threads for this run
             
         Returns:
             Success flag
         """
         try:
-            import sys
             # OCRmyPDF command with optimized settings for financial documents
             cmd = [
                 sys.executable, "-m", "ocrmypdf",
                 "--language", "+".join(self.tesseract_languages),
                 "--deskew",  # Correct document skew
                 "--clean",   # Clean up image artifacts
-                "--force-ocr",  # OCR even if text is already present
+                "--force-ocr",  # OCR selected pages even if they carry a stray text layer
                 "--optimize", "1",  # Light optimization
                 "--jpeg-quality", "85",  # Good quality for images
                 "--png-quality", "85",   # Good quality for images
                 "--timeout", "300",  # 5 minute timeout
-                "--skip-text",  # Skip if text already exists (faster)
-                input_path,
-                output_path
             ]
+            if pages:
+                # Only OCR image-only pages; text-native pages are passed through untouched
+                cmd += ["--pages", pages]
+            if jobs:
+                cmd += ["--jobs", str(jobs)]
+            cmd += [input_path, output_path]
             
-            logger.info(f"Running OCRmyPDF: {' '.join(cmd)}")
+            # Wait for a host-wide OCR slot, then run without blocking the event loop
+            async with self.host_slots.slot():
+                logger.info(f"Running OCRmyPDF: {' '.join(cmd)}")
+                returncode, _, stderr = await self._run_command(cmd, timeout=300)  # 5 minute timeout
             
-            # Run the command
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
-            
-            if result.returncode == 0:
+            if returncode == 0:
                 logger.info("OCRmyPDF completed successfully")
                 return True
             else:
-                logger.warning(f"OCRmyPDF failed with return code {result.returncode}")
-                logger.warning(f"STDERR: {result.stderr}")
+                logger.warning(f"OCRmyPDF failed with return code {returncode}")
+                logger.warning(f"STDERR: {stderr}")
                 return False
                 
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             logger.error("OCRmyPDF timed out after 5 minutes")
             return False
         except Exception as e:
@@ -167,14 +383,8 @@ class OCRService:
     async def get_ocr_capabilities(self) -> dict:
         """Get information about OCR capabilities and available languages"""
         try:
-            import sys
             # Check OCRmyPDF version using Python module
-            ocrmypdf_result = subprocess.run(
-                [sys.executable, "-m", "ocrmypdf", "--version"], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
+            ocrmypdf_result = await self._run_command([sys.executable, "-m", "ocrmypdf", "--version"], timeout=10)
             
             # For Tesseract, we'll try multiple approaches
             tesseract_result = None
@@ -182,40 +392,30 @@ class OCRService:
             
             # Try direct tesseract command first
             try:
-                tesseract_result = subprocess.run(
-                    ["tesseract", "--version"], 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=10
-                )
-                langs_result = subprocess.run(
-                    ["tesseract", "--list-langs"], 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=10
-                )
+                tesseract_result = await self._run_command(["tesseract", "--version"], timeout=10)
+                langs_result = await self._run_command(["tesseract", "--list-langs"], timeout=10)
             except FileNotFoundError:
                 # If direct command fails, tesseract might be bundled with OCRmyPDF
                 pass
             
             available_languages = []
-            if langs_result and langs_result.returncode == 0:
-                lines = langs_result.stdout.strip().split('\n')
+            if langs_result and langs_result[0] == 0:
+                lines = langs_result[1].strip().split('\n')
                 # Skip header line and get language codes
                 available_languages = [line.strip() for line in lines[1:] if line.strip()]
             
             # If we can't get Tesseract info directly, but OCRmyPDF works, assume basic functionality
-            tesseract_available = bool(tesseract_result and tesseract_result.returncode == 0)
-            if not tesseract_available and ocrmypdf_result.returncode == 0:
+            tesseract_available = bool(tesseract_result and tesseract_result[0] == 0)
+            if not tesseract_available and ocrmypdf_result[0] == 0:
                 # OCRmyPDF is available, so it likely has Tesseract bundled
                 tesseract_available = True
                 available_languages = ["eng"]  # Default to English
             
             return {
-                "ocrmypdf_available": ocrmypdf_result.returncode == 0,
-                "ocrmypdf_version": ocrmypdf_result.stdout.strip() if ocrmypdf_result.returncode == 0 else None,
+                "ocrmypdf_available": ocrmypdf_result[0] == 0,
+                "ocrmypdf_version": ocrmypdf_result[1].strip() if ocrmypdf_result[0] == 0 else None,
                 "tesseract_available": tesseract_available,
-                "tesseract_version": tesseract_result.stderr.strip() if tesseract_result and tesseract_result.returncode == 0 else "bundled with OCRmyPDF",
+                "tesseract_version": tesseract_result[2].strip() if tesseract_result and tesseract_result[0] == 0 else "bundled with OCRmyPDF",
                 "available_languages": available_languages,
                 "current_languages": self.tesseract_languages
             }
@@ -226,4 +426,4 @@ class OCRService:
                 "ocrmypdf_available": False,
                 "tesseract_available": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
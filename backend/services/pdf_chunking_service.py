@@ -1,7 +1,8 @@
+import asyncio
 import logging
 import tempfile
 import os
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Iterator, Optional
 from pathlib import Path
 import io
 
@@ -19,11 +20,115 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
+class PDFPageSource:
+    """
+    A PDF opened once and shared by all chunk views
+    
+    The PDF is parsed straight from the caller's bytes (BytesIO shares the buffer rather
+    than copying it) and only the requested pages are written out on demand.
+    """
+    
+    def __init__(self, pdf_content: bytes, library: str):
+        self.pdf_content = pdf_content
+        self.library = library
+        self._document = None
+        self._closed = False
+    
+    @property
+    def document(self):
+        if self._closed:
+            raise ValueError("PDF source is closed")
+        if self._document is None:
+            if self.library == "pikepdf":
+                self._document = pikepdf.open(io.BytesIO(self.pdf_content))
+            else:
+                self._document = PdfReader(io.BytesIO(self.pdf_content))
+        return self._document
+    
+    @property
+    def page_count(self) -> int:
+        return len(self.document.pages)
+    
+    def page_texts(self) -> Optional[List[str]]:
+        """Extract the text layer of every page, or None if no text extractor is available"""
+        if not PYPDF2_AVAILABLE:
+            return None
+        reader = self.document if self.library == "pypdf2" else PdfReader(io.BytesIO(self.pdf_content))
+        return [page.extract_text() or "" for page in reader.pages]
+    
+    def write_pages(self, start: int, end: int) -> bytes:
+        """Serialize 1-based inclusive pages start..end into a standalone PDF"""
+        if self._closed:
+            # Chunk views can outlive their source; reopen the PDF for this one write
+            with PDFPageSource(self.pdf_content, self.library) as source:
+                return source.write_pages(start, end)
+        chunk_buffer = io.BytesIO()
+        if self.library == "pikepdf":
+            chunk_pdf = pikepdf.new()
+            chunk_pdf.pages.extend(self.document.pages[start - 1:end])
+            chunk_pdf.save(chunk_buffer)
+            chunk_pdf.close()
+        else:
+            writer = PdfWriter()
+            for page_num in range(start - 1, end):
+                writer.add_page(self.document.pages[page_num])
+            writer.write(chunk_buffer)
+        return chunk_buffer.getvalue()
+    
+    def close(self) -> None:
+        if self._document is not None and self.library == "pikepdf":
+            self._document.close()
+        self._document = None
+        self._closed = True
+    
+    def __enter__(self) -> 'PDFPageSource':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PDFChunk(dict):
+    """
+    Page-range view over a PDFPageSource
+    
+    Behaves like the chunk dictionaries consumers already use (page_range, total_pages,
+    ...), but chunk['chunk_data'] is serialized from the source on each access instead
+    of being stored, so metadata stays small and JSON-serializable.
+    """
+    
+    def __init__(self, source: PDFPageSource, chunk_id: int, start: int, end: int,
+                 filename: str, is_single_chunk: bool = False, chunks_total: int = 1):
+        super().__init__(
+            chunk_id=chunk_id,
+            chunks_total=chunks_total,
+            page_range={"start": start, "end": end},
+            total_pages=end - start + 1,
+            is_single_chunk=is_single_chunk,
+            original_filename=filename,
+            library_used=source.library
+        )
+        self.source = source
+    
+    def __missing__(self, key: str) -> bytes:
+        if key != "chunk_data":
+            raise KeyError(key)
+        if self["is_single_chunk"]:
+            # The whole document: hand back the original bytes without re-serializing
+            return self.source.pdf_content
+        logger.debug(f"Serializing chunk {self['chunk_id']} with pages "
+                     f"{self['page_range']['start']}-{self['page_range']['end']}")
+        return self.source.write_pages(self["page_range"]["start"], self["page_range"]["end"])
+
 class PDFChunkingService:
     """Service for splitting PDFs into smaller chunks for processing"""
     
-    def __init__(self, max_pages_per_chunk: int = 30):
+    def __init__(self, max_pages_per_chunk: int = 30, max_tokens_per_chunk: Optional[int] = None,
+                 token_counter=None):
         self.max_pages_per_chunk = max_pages_per_chunk
+        self.max_tokens_per_chunk = max_tokens_per_chunk  # None = split by page count only
+        self.token_counter = token_counter  # utils.llm_helpers.TokenCounter; ~4 chars/token if None
         self.preferred_library = self._determine_best_library()
         
     def _determine_best_library(self) -> str:
@@ -37,10 +142,136 @@ class PDFChunkingService:
         else:
             raise ImportError("No suitable PDF library available (pikepdf or PyPDF2 required)")
     
-    async def split_pdf(self, pdf_content: bytes, filename: str = "document.pdf") -> List[Dict[str, Any]]:
+    def open_source(self, pdf_content: bytes) -> 'PDFPageSource':
+        """Open a PDF once so chunks can be served as page-range views over it"""
+        return PDFPageSource(pdf_content, self.preferred_library)
+    
+    def _estimate_tokens(self, text: str) -> int:
+        if self.token_counter is not None:
+            return self.token_counter.count_tokens(text)
+        return len(text) // 4  # Same fallback estimate TokenCounter uses
+    
+    def _page_tokens(self, source: PDFPageSource) -> Optional[List[int]]:
+        """Estimated tokens per page, or None when planning by page count only"""
+        if not self.max_tokens_per_chunk or source.page_count <= self.max_pages_per_chunk:
+            # A document that fits one chunk is never split, so skip the text extraction
+            return None
+        try:
+            page_texts = source.page_texts()
+        except Exception as e:
+            logger.warning(f"Could not extract page text for chunk planning, splitting by page count: {str(e)}")
+            return None
+        if page_texts is None:
+            return None
+        return [self._estimate_tokens(text) for text in page_texts]
+    
+    def _pack_pages(self, page_tokens: List[int], token_limit: int) -> List[Tuple[int, int]]:
+        """Greedily pack consecutive pages under the page cap and token_limit (1-based ranges)"""
+        ranges = []
+        start, chunk_tokens = 1, 0
+        for page_num, tokens in enumerate(page_tokens, 1):
+            pages_in_chunk = page_num - start
+            if pages_in_chunk and (pages_in_chunk >= self.max_pages_per_chunk or chunk_tokens + tokens > token_limit):
+                ranges.append((start, page_num - 1))
+                start, chunk_tokens = page_num, 0
+            chunk_tokens += tokens
+        if page_tokens:
+            ranges.append((start, len(page_tokens)))
+        return ranges
+    
+    def _plan_page_ranges(self, total_pages: int, page_tokens: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+        """
+        Plan 1-based inclusive page ranges
+        
+        Without page token estimates, pages are split into runs of max_pages_per_chunk.
+        With them, the plan uses the fewest chunks that respect both max_pages_per_chunk
+        and max_tokens_per_chunk (a single page over budget gets its own chunk), then
+        rebalances that many chunks so the densest one is as small as possible.
+        """
+        if not page_tokens:
+            return [(start, min(start + self.max_pages_per_chunk - 1, total_pages))
+                    for start in range(1, total_pages + 1, self.max_pages_per_chunk)]
+        
+        ranges = self._pack_pages(page_tokens, self.max_tokens_per_chunk)
+        
+        # Binary search the smallest token limit that still needs no more chunks
+        low, high = max(page_tokens), self.max_tokens_per_chunk
+        while low < high:
+            middle = (low + high) // 2
+            if len(self._pack_pages(page_tokens, middle)) <= len(ranges):
+                high = middle
+            else:
+                low = middle + 1
+        if low < self.max_tokens_per_chunk:
+            ranges = self._pack_pages(page_tokens, low)
+        return ranges
+    
+    def plan_chunks(self, source: PDFPageSource) -> List[Dict[str, Any]]:
+        """Plan chunk page ranges for an open PDF, with estimated tokens when available"""
+        total_pages = source.page_count
+        page_tokens = self._page_tokens(source)
+        plan = []
+        for start, end in self._plan_page_ranges(total_pages, page_tokens):
+            planned = {"page_range": {"start": start, "end": end}, "pages_in_chunk": end - start + 1}
+            if page_tokens:
+                planned["estimated_tokens"] = sum(page_tokens[start - 1:end])
+            plan.append(planned)
+        return plan
+    
+    def iter_chunks(self, pdf_content: bytes, filename: str = "document.pdf") -> Iterator['PDFChunk']:
+        """
+        Yield chunks one at a time as page-range views over a single open PDF
+        
+        Chunk bytes are only serialized when a consumer reads chunk['chunk_data'], so
+        each chunk can be released as soon as it has been processed. The source PDF is
+        closed once the iterator is exhausted. Chunks are planned on the first next(),
+        so run that off the event loop. If planning fails, the whole PDF is yielded as
+        a single chunk, as in split_pdf.
+        """
+        source = self.open_source(pdf_content)
+        try:
+            try:
+                chunks = self._chunks_for_source(source, filename)
+            except Exception as e:
+                logger.error(f"Error splitting PDF {filename}: {str(e)}")
+                chunks = [self._whole_document_chunk(pdf_content, filename, e)]
+            logger.info(f"Planned {len(chunks)} chunk(s) for {filename}")
+            yield from chunks
+        finally:
+            source.close()
+    
+    def _chunks_for_source(self, source: 'PDFPageSource', filename: str) -> List['PDFChunk']:
+        total_pages = source.page_count
+        if total_pages <= self.max_pages_per_chunk:
+            # No need to split
+            return [PDFChunk(source, 0, 1, total_pages, filename, is_single_chunk=True)]
+        plan = self.plan_chunks(source)
+        if len(plan) <= 1:
+            return [PDFChunk(source, 0, 1, total_pages, filename, is_single_chunk=True)]
+        return self.chunks_from_plan(source, plan, filename)
+    
+    def chunks_from_plan(self, source: 'PDFPageSource', plan: List[Dict[str, Any]],
+                         filename: str) -> List['PDFChunk']:
+        """Rebuild chunk views from a stored plan (plan_chunks output or chunk metadata)"""
+        chunks = []
+        for chunk_id, planned in enumerate(plan):
+            chunk = PDFChunk(source, planned.get("chunk_id", chunk_id), planned["page_range"]["start"],
+                             planned["page_range"]["end"], filename,
+                             is_single_chunk=planned.get("is_single_chunk", False), chunks_total=len(plan))
+            if "estimated_tokens" in planned:
+                chunk["estimated_tokens"] = planned["estimated_tokens"]
+            chunks.append(chunk)
+        return chunks
+    
+    async def split_pdf(self, pdf_content: bytes, filename: str = "document.pdf") -> List['PDFChunk']:
         """
         Split PDF into chunks of ≤max_pages_per_chunk pages
         
+        Chunks are lightweight page-range views; their bytes are serialized lazily on
+        chunk['chunk_data'] and not retained. The PDF is closed once the chunks are
+        planned, so each access reopens it for that one write. Use iter_chunks to keep
+        one open copy while the chunks are consumed.
+        
         Args:
             pdf_content: PDF file bytes
             filename: Original filename for logging
@@ -51,132 +282,37 @@ class PDFChunkingService:
         try:
             logger.info(f"Starting PDF chunking for {filename}")
             
-            # Get total page count first
-            total_pages = self._get_page_count(pdf_content)
-            logger.info(f"PDF has {total_pages} pages, splitting into chunks of ≤{self.max_pages_per_chunk} pages")
-            
-            if total_pages <= self.max_pages_per_chunk:
-                # No need to split
-                return [{
-                    "chunk_id": 0,
-                    "chunk_data": pdf_content,
-                    "page_range": {"start": 1, "end": total_pages},
-                    "total_pages": total_pages,
-                    "is_single_chunk": True,
-                    "original_filename": filename
-                }]
-            
-            # Split into chunks
-            if self.preferred_library == "pikepdf":
-                chunks = await self._split_with_pikepdf(pdf_content, filename, total_pages)
-            else:
-                chunks = await self._split_with_pypdf2(pdf_content, filename, total_pages)
-                
-            logger.info(f"Successfully split {filename} into {len(chunks)} chunks")
+            with self.open_source(pdf_content) as source:
+                # Page text extraction for token-based planning is CPU-bound; keep it off the loop
+                chunks = await asyncio.to_thread(self._chunks_for_source, source, filename)
+                total_pages = source.page_count
+            logger.info(f"PDF has {total_pages} pages, split {filename} into {len(chunks)} "
+                       f"chunk(s) of ≤{self.max_pages_per_chunk} pages"
+                       + (f" and ≤{self.max_tokens_per_chunk} tokens" if self.max_tokens_per_chunk else ""))
             return chunks
             
         except Exception as e:
             logger.error(f"Error splitting PDF {filename}: {str(e)}")
             # Return original PDF as single chunk on error
-            return [{
-                "chunk_id": 0,
-                "chunk_data": pdf_content,
-                "page_range": {"start": 1, "end": self._get_page_count(pdf_content)},
-                "total_pages": self._get_page_count(pdf_content),
-                "is_single_chunk": True,
-                "original_filename": filename,
-                "error": str(e)
-            }]
+            return [self._whole_document_chunk(pdf_content, filename, e)]
+    
+    def _whole_document_chunk(self, pdf_content: bytes, filename: str, error: Exception) -> 'PDFChunk':
+        """Fallback single chunk holding the original bytes, for PDFs that could not be split"""
+        total_pages = self._get_page_count(pdf_content)
+        chunk = PDFChunk(PDFPageSource(pdf_content, self.preferred_library), 0, 1, total_pages,
+                         filename, is_single_chunk=True)
+        chunk["error"] = str(error)
+        return chunk
     
     def _get_page_count(self, pdf_content: bytes) -> int:
         """Get total number of pages in PDF"""
         try:
-            if self.preferred_library == "pikepdf" and PIKEPDF_AVAILABLE:
-                with pikepdf.open(io.BytesIO(pdf_content)) as pdf:
-                    return len(pdf.pages)
-            else:
-                reader = PdfReader(io.BytesIO(pdf_content))
-                return len(reader.pages)
+            with self.open_source(pdf_content) as source:
+                return source.page_count
         except Exception as e:
             logger.error(f"Error getting page count: {str(e)}")
             return 1  # Default to 1 page on error
     
-    async def _split_with_pikepdf(self, pdf_content: bytes, filename: str, total_pages: int) -> List[Dict[str, Any]]:
-        """Split PDF using pikepdf (preferred method)"""
-        chunks = []
-        
-        with pikepdf.open(io.BytesIO(pdf_content)) as source_pdf:
-            chunk_id = 0
-            
-            for start_page in range(0, total_pages, self.max_pages_per_chunk):
-                end_page = min(start_page + self.max_pages_per_chunk - 1, total_pages - 1)
-                
-                # Create new PDF for this chunk
-                chunk_pdf = pikepdf.new()
-                
-                # Copy pages to chunk
-                for page_num in range(start_page, end_page + 1):
-                    chunk_pdf.pages.append(source_pdf.pages[page_num])
-                
-                # Convert to bytes
-                chunk_buffer = io.BytesIO()
-                chunk_pdf.save(chunk_buffer)
-                chunk_data = chunk_buffer.getvalue()
-                chunk_buffer.close()
-                
-                chunks.append({
-                    "chunk_id": chunk_id,
-                    "chunk_data": chunk_data,
-                    "page_range": {"start": start_page + 1, "end": end_page + 1},
-                    "total_pages": end_page - start_page + 1,
-                    "is_single_chunk": False,
-                    "original_filename": filename,
-                    "library_used": "pikepdf"
-                })
-                
-                chunk_id += 1
-                logger.debug(f"Created chunk {chunk_id} with pages {start_page + 1}-{end_page + 1}")
-        
-        return chunks
-    
-    async def _split_with_pypdf2(self, pdf_content: bytes, filename: str, total_pages: int) -> List[Dict[str, Any]]:
-        """Split PDF using PyPDF2 (fallback method)"""
-        chunks = []
-        
-        reader = PdfReader(io.BytesIO(pdf_content))
-        chunk_id = 0
-        
-        for start_page in range(0, total_pages, self.max_pages_per_chunk):
-            end_page = min(start_page + self.max_pages_per_chunk - 1, total_pages - 1)
-            
-            # Create new PDF writer for this chunk
-            writer = PdfWriter()
-            
-            # Add pages to chunk
-            for page_num in range(start_page, end_page + 1):
-                writer.add_page(reader.pages[page_num])
-            
-            # Convert to bytes
-            chunk_buffer = io.BytesIO()
-            writer.write(chunk_buffer)
-            chunk_data = chunk_buffer.getvalue()
-            chunk_buffer.close()
-            
-            chunks.append({
-                "chunk_id": chunk_id,
-                "chunk_data": chunk_data,
-                "page_range": {"start": start_page + 1, "end": end_page + 1},
-                "total_pages": end_page - start_page + 1,
-                "is_single_chunk": False,
-                "original_filename": filename,
-                "library_used": "pypdf2"
-            })
-            
-            chunk_id += 1
-            logger.debug(f"Created chunk {chunk_id} with pages {start_page + 1}-{end_page + 1}")
-        
-        return chunks
-    
     async def combine_chunk_results(self, chunk_results: List[Dict[str, Any]], 
                                   original_filename: str) -> Dict[str, Any]:
         """
@@ -281,22 +417,20 @@ class PDFChunkingService:
     def get_chunking_info(self, pdf_content: bytes) -> Dict[str, Any]:
         """Get information about how a PDF would be chunked"""
         try:
-            total_pages = self._get_page_count(pdf_content)
-            chunks_needed = (total_pages + self.max_pages_per_chunk - 1) // self.max_pages_per_chunk
+            with self.open_source(pdf_content) as source:
+                total_pages = source.page_count
+                plan = self.plan_chunks(source)
+            chunks_needed = len(plan)
             
             chunk_info = []
-            for i in range(chunks_needed):
-                start_page = i * self.max_pages_per_chunk + 1
-                end_page = min((i + 1) * self.max_pages_per_chunk, total_pages)
-                chunk_info.append({
-                    "chunk_id": i,
-                    "page_range": {"start": start_page, "end": end_page},
-                    "pages_in_chunk": end_page - start_page + 1
-                })
+            for i, planned in enumerate(plan):
+                chunk_info.append({"chunk_id": i, **planned})
             
             return {
                 "total_pages": total_pages,
                 "max_pages_per_chunk": self.max_pages_per_chunk,
+                "max_tokens_per_chunk": self.max_tokens_per_chunk,
+                "planning": "adaptive" if any("estimated_tokens" in c for c in plan) else "page_count",
                 "chunks_needed": chunks_needed,
                 "chunk_info": chunk_info,
                 "library_used": self.preferred_library
@@ -0,0 +1,147 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Overall progress range (percent) covered by each pipeline stage
+STAGE_PROGRESS = {
+    'ocr': (0, 10),
+    'chunk': (10, 15),
+    'document_ai': (15, 60),
+    'llm': (60, 90),
+    'persist': (90, 100),
+}
+TERMINAL_EVENTS = ('completed', 'failed')
+
+
+class ProgressHub:
+    """
+    In-memory fan-out of job progress events
+
+    Every event is merged into the job's latest state and each subscriber receives that
+    whole state, so a new subscriber is brought up to date by replaying the latest state
+    alone, and a slow subscriber can skip intermediate states without losing anything:
+    when its queue is full the oldest state is dropped. States of the most recently
+    updated max_jobs jobs are kept.
+    """
+
+    def __init__(self, max_jobs: int = 1000, queue_size: int = 100):
+        self.max_jobs = max_jobs
+        self.queue_size = queue_size
+        self._states: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, job_id: str, event: str, stage: Optional[str] = None,
+                stage_progress: float = 0.0, **fields: Any) -> Dict[str, Any]:
+        """
+        Record an event for a job and send the job's updated state to its subscribers
+
+        Args:
+            job_id: Job the event belongs to
+            event: Event name, e.g. 'stage_started', 'chunk_completed', 'completed'
+            stage: Pipeline stage the event belongs to; sets the overall progress
+            stage_progress: Fraction (0-1) of the stage that is done
+            fields: Extra state fields, e.g. chunks_completed=3
+
+        Returns:
+            The job's updated state
+        """
+        with self._lock:
+            state = self._states.pop(job_id, None) or {'job_id': job_id, 'seq': 0, 'progress': 0}
+            state.update(fields)
+            if stage in STAGE_PROGRESS:
+                start, end = STAGE_PROGRESS[stage]
+                state['stage'] = stage
+                state['progress'] = round(start + (end - start) * min(max(stage_progress, 0.0), 1.0))
+            if event == 'completed':
+                state['progress'] = 100
+            state['event'] = event
+            state['done'] = event in TERMINAL_EVENTS
+            state['seq'] += 1
+            state['updated_at'] = time.time()
+            self._states[job_id] = state
+            while len(self._states) > self.max_jobs:
+                self._states.popitem(last=False)
+            snapshot = dict(state)
+            subscribers = list(self._subscribers.get(job_id, []))
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, snapshot)
+            except RuntimeError:
+                pass  # Subscriber's event loop has closed
+        return snapshot
+
+    def _deliver(self, queue: asyncio.Queue, state: Dict[str, Any]) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(state)
+
+    def get_state(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Latest state of a job, or None if nothing has been published for it"""
+        with self._lock:
+            state = self._states.get(job_id)
+            return dict(state) if state else None
+
+    async def subscribe(self, job_id: str, keepalive: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Yield a job's latest state, then every update until the job completes or fails
+
+        With keepalive set, None is yielded whenever that many seconds pass without an
+        update, so callers can keep idle connections open.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(subscriber)
+            state = self._states.get(job_id)
+            if state:
+                queue.put_nowait(dict(state))
+        try:
+            last_seq = 0
+            while True:
+                try:
+                    state = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if state['seq'] <= last_seq:
+                    continue  # Already sent (replayed state and a concurrent publish)
+                last_seq = state['seq']
+                yield state
+                if state['done']:
+                    return
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(job_id, [])
+                if subscriber in subscribers:
+                    subscribers.remove(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(job_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tracked job and subscriber counts"""
+        with self._lock:
+            return {
+                'jobs': len(self._states),
+                'subscribers': sum(len(subscribers) for subscribers in self._subscribers.values())
+            }
+
+
+_progress_hub: Optional[ProgressHub] = None
+_progress_hub_lock = threading.Lock()
+
+
+def get_progress_hub() -> ProgressHub:
+    """Return the process-wide progress hub (PROGRESS_MAX_JOBS, default 1000)"""
+    global _progress_hub
+    with _progress_hub_lock:
+        if _progress_hub is None:
+            _progress_hub = ProgressHub(max_jobs=int(os.getenv("PROGRESS_MAX_JOBS", "1000")))
+        return _progress_hub
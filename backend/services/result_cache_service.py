@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever OCR, chunking, extraction or normalization output changes shape or quality
+PIPELINE_VERSION = os.getenv("PIPELINE_VERSION", "1")
+
+
+class ResultCacheService:
+    """
+    Content-addressed cache for pipeline stage outputs
+
+    Entries are keyed by the SHA-256 of the uploaded file plus the pipeline version and
+    live under {base_path}/{pipeline_version}/{file_hash}/. Each entry holds one file per
+    stage (e.g. ocr_pdf, chunk_results, llm_results). Entries expire after ttl_seconds
+    and the least recently used entries are evicted once the cache exceeds max_bytes.
+
+    File I/O runs in worker threads. The cache directory is only walked for eviction
+    when the running size estimate passes max_bytes or sweep_interval seconds have
+    passed since the last sweep, not on every write.
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, base_path: Path = Path("storage") / "cache",
+                 pipeline_version: str = PIPELINE_VERSION,
+                 ttl_seconds: int = 7 * 24 * 3600,
+                 max_bytes: int = 2 * 1024 ** 3,
+                 sweep_interval: int = 3600):
+        self.base_path = Path(base_path)
+        self.pipeline_version = pipeline_version
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.base_path.mkdir(parents=True, exist_ok=True)
+        self._stats_lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._size_estimate: Optional[int] = None  # Unknown until the first sweep
+        self._last_sweep = 0.0
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _entry_dir(self, file_hash: str) -> Path:
+        return self.base_path / self.pipeline_version / file_hash
+
+    def _is_expired(self, entry_dir: Path) -> bool:
+        meta_path = entry_dir / self.META_FILE
+        try:
+            with open(meta_path, 'r') as f:
+                created_at = json.load(f).get('created_at', 0)
+        except (OSError, ValueError):
+            return True
+        return time.time() - created_at > self.ttl_seconds
+
+    def _stage_path(self, file_hash: str, stage: str, suffix: str) -> Optional[Path]:
+        """Return the stage file for a live entry, refreshing its LRU timestamp"""
+        if not file_hash:
+            return None
+        entry_dir = self._entry_dir(file_hash)
+        stage_path = entry_dir / f"{stage}{suffix}"
+        if not stage_path.exists():
+            self._count('misses')
+            return None
+        if self._is_expired(entry_dir):
+            logger.info(f"Cache entry {file_hash[:12]} expired, removing")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            self._count('misses')
+            return None
+        os.utime(entry_dir)  # mark as recently used
+        self._count('hits')
+        logger.info(f"Cache hit for {stage} ({file_hash[:12]}, pipeline v{self.pipeline_version})")
+        return stage_path
+
+    def _write_stage(self, file_hash: str, stage: str, suffix: str, data: bytes) -> None:
+        entry_dir = self._entry_dir(file_hash)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        meta_path = entry_dir / self.META_FILE
+        if not meta_path.exists():
+            with open(meta_path, 'w') as f:
+                json.dump({'file_hash': file_hash, 'pipeline_version': self.pipeline_version,
+                           'created_at': time.time()}, f)
+
+        # Write to a temp file and rename so concurrent readers never see partial data
+        stage_path = entry_dir / f"{stage}{suffix}"
+        temp_path = entry_dir / f".{stage}{suffix}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, stage_path)
+        os.utime(entry_dir)
+        with self._stats_lock:
+            if self._size_estimate is not None:
+                self._size_estimate += len(data)
+            sweep_due = (self._size_estimate is None or self._size_estimate > self.max_bytes
+                         or time.time() - self._last_sweep > self.sweep_interval)
+        if sweep_due:
+            self._evict_if_needed()
+
+    def _read_stage(self, file_hash: str, stage: str, suffix: str) -> Optional[bytes]:
+        stage_path = self._stage_path(file_hash, stage, suffix)
+        if not stage_path:
+            return None
+        with open(stage_path, 'rb') as f:
+            return f.read()
+
+    async def get_bytes(self, file_hash: str, stage: str) -> Optional[bytes]:
+        """Retrieve a cached binary stage output (e.g. the OCR'd PDF)"""
+        try:
+            return await asyncio.to_thread(self._read_stage, file_hash, stage, ".bin")
+        except Exception as e:
+            logger.error(f"Failed to read cached {stage} for {file_hash}: {str(e)}")
+            return None
+
+    async def put_bytes(self, file_hash: str, stage: str, data: bytes) -> None:
+        """Cache a binary stage output"""
+        try:
+            if file_hash:
+                await asyncio.to_thread(self._write_stage, file_hash, stage, ".bin", data)
+        except Exception as e:
+            logger.error(f"Failed to cache {stage} for {file_hash}: {str(e)}")
+
+    async def get_json(self, file_hash: str, stage: str) -> Optional[Any]:
+        """Retrieve a cached JSON stage output"""
+        def read() -> Optional[Any]:
+            data = self._read_stage(file_hash, stage, ".json")
+            return json.loads(data) if data is not None else None
+
+        try:
+            return await asyncio.to_thread(read)
+        except Exception as e:
+            logger.error(f"Failed to read cached {stage} for {file_hash}: {str(e)}")
+            return None
+
+    async def put_json(self, file_hash: str, stage: str, data: Any) -> None:
+        """Cache a JSON-serializable stage output"""
+        try:
+            if file_hash:
+                await asyncio.to_thread(
+                    lambda: self._write_stage(file_hash, stage, ".json", json.dumps(data, default=str).encode())
+                )
+        except Exception as e:
+            logger.error(f"Failed to cache {stage} for {file_hash}: {str(e)}")
+
+    def _list_entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        for version_dir in self.base_path.iterdir():
+            if not version_dir.is_dir():
+                continue
+            for entry_dir in version_dir.iterdir():
+                if not entry_dir.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in entry_dir.iterdir() if f.is_file())
+                entries.append({'path': entry_dir, 'size': size, 'last_used': entry_dir.stat().st_mtime})
+        return entries
+
+    def _evict_if_needed(self) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        if not self._sweep_lock.acquire(blocking=False):
+            return  # Another write is already sweeping
+        try:
+            self._sweep()
+        finally:
+            self._sweep_lock.release()
+
+    def _sweep(self) -> None:
+        entries = self._list_entries()
+        live = []
+        for entry in entries:
+            if self._is_expired(entry['path']):
+                shutil.rmtree(entry['path'], ignore_errors=True)
+                self._count('evictions')
+            else:
+                live.append(entry)
+
+        total_size = sum(entry['size'] for entry in live)
+        for entry in sorted(live, key=lambda e: e['last_used']):
+            if total_size <= self.max_bytes:
+                break
+            logger.info(f"Evicting cache entry {entry['path'].name[:12]} ({entry['size']} bytes)")
+            shutil.rmtree(entry['path'], ignore_errors=True)
+            total_size -= entry['size']
+            self._count('evictions')
+
+        with self._stats_lock:
+            self._size_estimate = total_size
+            self._last_sweep = time.time()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache hit/miss/eviction counters"""
+        with self._stats_lock:
+            return self.stats.copy()
@@ -0,0 +1,129 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSED_SUFFIX = ".zst"
+_warned_no_zstandard = False
+
+
+class FileStorageBackend:
+    """
+    Local file I/O for StorageService, run off the event loop
+
+    Writes go to a temp file in the target directory which is then renamed over the
+    target, so readers and crashes never see a partially written file. JSON is written
+    compactly with orjson when it is installed (falling back to the json module), and
+    documents written with compress=True are zstd-compressed into "<name>.zst" when
+    zstandard is installed. Reads accept both forms, so files written before
+    compression was enabled (or with it disabled) stay readable.
+    """
+
+    def __init__(self, compression: bool = True, compression_level: int = 3, fsync: bool = True):
+        global _warned_no_zstandard
+        if compression and zstandard is None and not _warned_no_zstandard:
+            logger.warning("zstandard not installed, storing results uncompressed")
+            _warned_no_zstandard = True
+        self.compression = compression and zstandard is not None
+        self.compression_level = compression_level
+        self.fsync = fsync
+
+    # Serialization
+
+    def dumps(self, data: Any) -> bytes:
+        """Serialize to compact JSON bytes"""
+        if orjson is not None:
+            return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, default=str, separators=(',', ':')).encode()
+
+    def loads(self, data: bytes) -> Any:
+        """Parse JSON bytes"""
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+
+    # Synchronous file operations (run in a worker thread by the async methods)
+
+    def write_bytes_sync(self, path: Path, data: bytes) -> None:
+        """Atomically replace path with data"""
+        path = Path(path)
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+    def read_bytes_sync(self, path: Path) -> Optional[bytes]:
+        """Contents of path, or None if it does not exist"""
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write_json_sync(self, path: Path, data: Any, compress: bool = False) -> Path:
+        """Serialize data to path (path + ".zst" if compressed); returns the file written"""
+        path = Path(path)
+        compressed_path = path.with_name(path.name + COMPRESSED_SUFFIX)
+        payload = self.dumps(data)
+        if compress and self.compression:
+            payload = zstandard.ZstdCompressor(level=self.compression_level).compress(payload)
+            target, stale = compressed_path, path
+        else:
+            target, stale = path, compressed_path
+        self.write_bytes_sync(target, payload)
+        # Drop the other form so readers never pick up an older version
+        stale.unlink(missing_ok=True)
+        return target
+
+    def read_json_sync(self, path: Path) -> Optional[Any]:
+        """Load a document written by write_json_sync, or None if it does not exist"""
+        path = Path(path)
+        compressed = self.read_bytes_sync(path.with_name(path.name + COMPRESSED_SUFFIX))
+        if compressed is not None:
+            if zstandard is None:
+                raise RuntimeError(f"{path.name}{COMPRESSED_SUFFIX} is zstd-compressed but zstandard is not installed")
+            return self.loads(zstandard.ZstdDecompressor().decompress(compressed))
+        data = self.read_bytes_sync(path)
+        return self.loads(data) if data is not None else None
+
+    def exists_sync(self, path: Path) -> bool:
+        """Whether a document exists at path, compressed or not"""
+        path = Path(path)
+        return path.exists() or path.with_name(path.name + COMPRESSED_SUFFIX).exists()
+
+    # Async API
+
+    async def write_bytes(self, path: Path, data: bytes) -> None:
+        await asyncio.to_thread(self.write_bytes_sync, path, data)
+
+    async def read_bytes(self, path: Path) -> Optional[bytes]:
+        return await asyncio.to_thread(self.read_bytes_sync, path)
+
+    async def write_json(self, path: Path, data: Any, compress: bool = False) -> Path:
+        return await asyncio.to_thread(self.write_json_sync, path, data, compress)
+
+    async def read_json(self, path: Path) -> Optional[Any]:
+        return await asyncio.to_thread(self.read_json_sync, path)
+
+    async def exists(self, path: Path) -> bool:
+        return await asyncio.to_thread(self.exists_sync, path)
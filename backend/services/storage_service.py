@@ -1,13 +1,15 @@
 import os
-import json
 import uuid
 import hashlib
-import aiofiles
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any
 from datetime import datetime, timedelta
+import asyncio
 import logging
 
+from .job_state_service import get_job_state_store
+from .storage_backend import FileStorageBackend
+
 try:
     from ..models.tradeline_models import ProcessingStatus
 except ImportError:
@@ -16,12 +18,25 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 class StorageService:
-    """Service for handling file and data storage operations"""
+    """
+    Service for handling file and data storage operations
+    
+    File I/O runs in worker threads through FileStorageBackend and every file is
+    written atomically. Document AI results, chunk results and LLM input are stored as
+    compact JSON, zstd-compressed when STORAGE_COMPRESSION is on (the default) and
+    zstandard is installed.
+    """
     
-    def __init__(self, storage_path: str = "storage"):
+    def __init__(self, storage_path: str = "storage", backend: FileStorageBackend = None):
         self.storage_path = storage_path
         self.base_path = Path(storage_path)
         self.ensure_storage_directories()
+        self.job_store = get_job_state_store(self.base_path / "jobs" / "jobs.sqlite3")
+        self.backend = backend or FileStorageBackend(
+            compression=os.getenv("STORAGE_COMPRESSION", "1") == "1",
+            compression_level=int(os.getenv("STORAGE_COMPRESSION_LEVEL", "3")),
+            fsync=os.getenv("STORAGE_FSYNC", "1") == "1"
+        )
     
     def ensure_storage_directories(self):
         """Create necessary storage directories"""
@@ -44,8 +59,7 @@ class StorageService:
             metadata_path = self.base_path / "uploads" / f"{job_id}.json"
 
             # Write file content
-            with open(file_path, 'wb') as f:
-                f.write(file_content)
+            await self.backend.write_bytes(file_path, file_content)
 
             storage_metadata = {
                 "job_id": job_id,
@@ -55,8 +69,7 @@ class StorageService:
                 **metadata
             }
 
-            with open(metadata_path, 'w') as f:
-                json.dump(storage_metadata, f, indent=2)
+            await self.backend.write_json(metadata_path, storage_metadata)
 
             logger.info(f"Stored file for job {job_id}")
             return str(file_path)
@@ -71,11 +84,10 @@ class StorageService:
             file_path = self.base_path / "uploads" / f"{job_id}.bin"
             metadata_path = self.base_path / "uploads" / f"{job_id}.json"
 
-            with open(file_path, 'rb') as f:
-                content = f.read()
-
-            with open(metadata_path, 'r') as f:
-                metadata = json.load(f)
+            content = await self.backend.read_bytes(file_path)
+            metadata = await self.backend.read_json(metadata_path)
+            if content is None or metadata is None:
+                raise FileNotFoundError(f"Uploaded file for job {job_id} not found")
 
             return {
                 "content": content,
@@ -93,8 +105,7 @@ class StorageService:
         """Store Document AI processing results"""
         try:
             results_path = self.base_path / "ai_results" / f"{job_id}.json"
-            with open(results_path, 'w') as f:
-                json.dump(ai_results, f, indent=2)
+            await self.backend.write_json(results_path, ai_results, compress=True)
             logger.info(f"Stored AI results for job {job_id}")
         except Exception as e:
             logger.error(f"Failed to store AI results for job {job_id}: {str(e)}")
@@ -104,10 +115,7 @@ class StorageService:
         """Retrieve Document AI processing results"""
         try:
             results_path = self.base_path / "ai_results" / f"{job_id}.json"
-            if not results_path.exists():
-                return None
-            with open(results_path, 'r') as f:
-                return json.load(f)
+            return await self.backend.read_json(results_path)
         except Exception as e:
             logger.error(f"Failed to retrieve AI results for job {job_id}: {str(e)}")
             return None
@@ -119,8 +127,7 @@ class StorageService:
             metadata_path = self.base_path / "ocr_pdfs" / f"{job_id}_ocr.json"
             
             # Write OCR'd PDF content
-            with open(ocr_path, 'wb') as f:
-                f.write(ocr_pdf_content)
+            await self.backend.write_bytes(ocr_path, ocr_pdf_content)
             
             # Store metadata
             ocr_metadata = {
@@ -131,8 +138,7 @@ class StorageService:
                 "ocr_type": "ocrmypdf_tesseract"
             }
             
-            with open(metadata_path, 'w') as f:
-                json.dump(ocr_metadata, f, indent=2)
+            await self.backend.write_json(metadata_path, ocr_metadata)
             
             logger.info(f"Stored OCR PDF for job {job_id}")
             return str(ocr_path)
@@ -147,16 +153,11 @@ class StorageService:
             ocr_path = self.base_path / "ocr_pdfs" / f"{job_id}_ocr.pdf"
             metadata_path = self.base_path / "ocr_pdfs" / f"{job_id}_ocr.json"
             
-            if not ocr_path.exists():
+            content = await self.backend.read_bytes(ocr_path)
+            if content is None:
                 return None
                 
-            with open(ocr_path, 'rb') as f:
-                content = f.read()
-                
-            metadata = {}
-            if metadata_path.exists():
-                with open(metadata_path, 'r') as f:
-                    metadata = json.load(f)
+            metadata = await self.backend.read_json(metadata_path) or {}
             
             return {
                 "content": content,
@@ -180,8 +181,7 @@ class StorageService:
                 'job_id': job_id
             }
             
-            with open(chunk_results_path, 'w') as f:
-                json.dump(chunk_result_with_meta, f, indent=2)
+            await self.backend.write_json(chunk_results_path, chunk_result_with_meta, compress=True)
                 
             logger.info(f"Stored chunk {chunk_id} AI results for job {job_id}")
             
@@ -193,12 +193,7 @@ class StorageService:
         """Retrieve AI processing results for a specific chunk"""
         try:
             chunk_results_path = self.base_path / "chunk_results" / f"{job_id}_chunk_{chunk_id}.json"
-            
-            if not chunk_results_path.exists():
-                return None
-                
-            with open(chunk_results_path, 'r') as f:
-                return json.load(f)
+            return await self.backend.read_json(chunk_results_path)
                 
         except Exception as e:
             logger.error(f"Failed to retrieve chunk {chunk_id} AI results for job {job_id}: {str(e)}")
@@ -207,22 +202,22 @@ class StorageService:
     async def get_all_chunk_results(self, job_id: str) -> list[Dict[str, Any]]:
         """Retrieve all chunk results for a job"""
         try:
-            chunk_results = []
             chunk_results_dir = self.base_path / "chunk_results"
             
-            if not chunk_results_dir.exists():
-                return chunk_results
-                
-            # Find all chunk result files for this job
-            chunk_files = list(chunk_results_dir.glob(f"{job_id}_chunk_*.json"))
-            
-            # Sort by chunk ID
-            chunk_files.sort(key=lambda x: int(x.stem.split('_chunk_')[1]))
+            def list_chunk_ids() -> list[int]:
+                if not chunk_results_dir.exists():
+                    return []
+                # Chunk result files for this job, compressed (.json.zst) or not
+                return sorted({int(chunk_file.name.split('_chunk_')[1].split('.')[0])
+                               for chunk_file in chunk_results_dir.glob(f"{job_id}_chunk_*.json*")})
             
-            for chunk_file in chunk_files:
-                with open(chunk_file, 'r') as f:
-                    chunk_result = json.load(f)
-                    chunk_results.append(chunk_result)
+            chunk_ids = await asyncio.to_thread(list_chunk_ids)
+            chunk_results = [
+                chunk_result for chunk_result in await asyncio.gather(*[
+                    self.get_chunk_ai_results(job_id, chunk_id) for chunk_id in chunk_ids
+                ])
+                if chunk_result is not None
+            ]
             
             logger.info(f"Retrieved {len(chunk_results)} chunk results for job {job_id}")
             return chunk_results
@@ -234,10 +229,8 @@ class StorageService:
     async def store_job_data(self, job_id: str, job_data: Dict[Any, Any]) -> None:
         """Store job processing data"""
         try:
-            job_path = self.base_path / "jobs" / f"{job_id}.json"
             serializable_data = self._make_serializable(job_data)
-            async with aiofiles.open(job_path, 'w') as f:
-                await f.write(json.dumps(serializable_data, indent=2))
+            await asyncio.to_thread(self.job_store.put, job_id, serializable_data)
             logger.info(f"Stored job data for {job_id}")
         except Exception as e:
             logger.error(f"Failed to store job data for {job_id}: {e}")
@@ -246,31 +239,51 @@ class StorageService:
     async def get_job_data(self, job_id: str) -> Optional[Dict[Any, Any]]:
         """Retrieve job processing data"""
         try:
-            job_path = self.base_path / "jobs" / f"{job_id}.json"
-            if not job_path.exists():
-                return None
-            async with aiofiles.open(job_path, 'r') as f:
-                content = await f.read()
-                return json.loads(content)
+            job_data = await asyncio.to_thread(self.job_store.get, job_id)
+            if job_data is not None:
+                return job_data
+            
+            # Jobs created before the job store was introduced
+            return await self.backend.read_json(self.base_path / "jobs" / f"{job_id}.json")
         except Exception as e:
             logger.error(f"Failed to retrieve job data for {job_id}: {e}")
             return None
 
-    async def update_job_status(self, job_id: str, status: ProcessingStatus, error_message: Optional[str] = None) -> None:
-        """Update job status"""
+    async def update_job_data(self, job_id: str,
+                              mutate: Callable[[Dict[Any, Any]], None]) -> Optional[Dict[Any, Any]]:
+        """
+        Atomically apply mutate(job_data) to a stored job; returns the updated data
+        
+        Only this job's record is locked, so updates to different jobs never wait on
+        each other. Returns None if the job does not exist.
+        """
+        def apply(job_data: Dict[Any, Any]) -> None:
+            mutate(job_data)
+            job_data.update(self._make_serializable(job_data))
+
         try:
-            job_data = await self.get_job_data(job_id)
-            if not job_data:
-                logger.warning(f"Job {job_id} not found for status update")
-                return
+            job_data = await asyncio.to_thread(self.job_store.update, job_id, apply)
+            if job_data is None and await self.backend.exists(self.base_path / "jobs" / f"{job_id}.json"):
+                # Migrate a job created before the job store, then retry
+                await self.store_job_data(job_id, await self.get_job_data(job_id))
+                job_data = await asyncio.to_thread(self.job_store.update, job_id, apply)
+            return job_data
+        except Exception as e:
+            logger.error(f"Failed to update job data for {job_id}: {e}")
+            raise
 
+    async def update_job_status(self, job_id: str, status: ProcessingStatus, error_message: Optional[str] = None) -> None:
+        """Update job status"""
+        def apply_status(job_data: Dict[Any, Any]) -> None:
             job_data["status"] = status.value
             if error_message:
                 job_data["error_message"] = error_message
             if status == ProcessingStatus.COMPLETED:
                 job_data["completed_at"] = datetime.now().isoformat()
 
-            await self.store_job_data(job_id, job_data)
+        try:
+            if await self.update_job_data(job_id, apply_status) is None:
+                logger.warning(f"Job {job_id} not found for status update")
 
         except Exception as e:
             logger.error(f"Failed to update job status for {job_id}: {e}")
@@ -281,35 +294,66 @@ class StorageService:
         try:
             input_path = self.base_path / "llm_input" / f"{job_id}.json"
             llm_input["prepared_at"] = datetime.now().isoformat()
-            with open(input_path, 'w') as f:
-                json.dump(llm_input, f, indent=2)
+            await self.backend.write_json(input_path, llm_input, compress=True)
             logger.info(f"Stored LLM input for job {job_id}")
         except Exception as e:
             logger.error(f"Failed to store LLM input for job {job_id}: {str(e)}")
             raise
 
+    async def get_llm_input(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve prepared input data for LLM processing"""
+        try:
+            input_path = self.base_path / "llm_input" / f"{job_id}.json"
+            return await self.backend.read_json(input_path)
+        except Exception as e:
+            logger.error(f"Failed to retrieve LLM input for job {job_id}: {str(e)}")
+            return None
+
+    async def store_llm_results(self, job_id: str, results_data: Dict[str, Any]) -> None:
+        """Store LLM normalization results"""
+        try:
+            results_path = self.base_path / "processed" / f"{job_id}_llm_results.json"
+            await self.backend.write_json(results_path, results_data)
+            logger.info(f"Stored LLM results for job {job_id}")
+        except Exception as e:
+            logger.error(f"Failed to store LLM results for job {job_id}: {str(e)}")
+            raise
+
+    async def get_llm_results(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve LLM normalization results"""
+        try:
+            results_path = self.base_path / "processed" / f"{job_id}_llm_results.json"
+            return await self.backend.read_json(results_path)
+        except Exception as e:
+            logger.error(f"Failed to retrieve LLM results for job {job_id}: {str(e)}")
+            return None
+
     async def cleanup_old_files(self, retention_days: int = 7) -> None:
         """Clean up old files and job data"""
         try:
             cutoff_date = datetime.now() - timedelta(days=retention_days)
-
-            # Cleanup uploads
-            upload_dir = self.base_path / "uploads"
-            for file_path in upload_dir.iterdir():
-                if file_path.stat().st_mtime < cutoff_date.timestamp():
-                    file_path.unlink()
-                    logger.info(f"Cleaned up old file: {file_path}")
+            await asyncio.to_thread(self._cleanup_old_files, cutoff_date.timestamp())
 
             # Cleanup job data
-            jobs_dir = self.base_path / "jobs"
-            for file_path in jobs_dir.iterdir():
-                if file_path.stat().st_mtime < cutoff_date.timestamp():
-                    file_path.unlink()
-                    logger.info(f"Cleaned up old job data: {file_path}")
+            deleted = await asyncio.to_thread(self.job_store.delete_older_than, cutoff_date.timestamp())
+            if deleted:
+                logger.info(f"Cleaned up {deleted} old job records")
 
         except Exception as e:
             logger.error(f"Failed to cleanup old files: {e}")
 
+    def _cleanup_old_files(self, cutoff: float) -> None:
+        """Delete uploads, legacy job files and leftover temp files not modified since cutoff"""
+        old_files = [
+            *(self.base_path / "uploads").iterdir(),
+            *(self.base_path / "jobs").glob("*.json"),
+            *self.base_path.glob("*/.*.tmp")  # Left behind by writes interrupted by a crash
+        ]
+        for file_path in old_files:
+            if file_path.stat().st_mtime < cutoff:
+                file_path.unlink()
+                logger.info(f"Cleaned up old file: {file_path}")
+
     def _make_serializable(self, obj):
         """Convert non-serializable objects to serializable format"""
         if isinstance(obj, dict):
@@ -0,0 +1,128 @@
+import os
+import logging
+import threading
+from typing import Optional, Dict, Tuple
+
+import httpx
+from supabase import Client, create_client
+
+try:
+    from supabase import ClientOptions
+except ImportError:
+    ClientOptions = None
+
+logger = logging.getLogger(__name__)
+
+
+class SupabaseClientPool:
+    """
+    Process-lifetime Supabase clients backed by one pooled HTTP connection pool
+
+    Clients are created once per (url, key) and reused by every job, so PostgREST
+    requests run over warm keep-alive HTTP/2 connections instead of paying connection
+    setup and a TLS handshake per job. The application owns the pool and closes it on
+    shutdown; services receive clients from it instead of calling create_client.
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 60.0, timeout: float = 30.0, http2: bool = True):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.http2 = http2
+        self._http_client: Optional[httpx.Client] = None
+        self._clients: Dict[Tuple[str, str], Client] = {}
+        self._lock = threading.Lock()
+
+    def _get_http_client(self) -> httpx.Client:
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+                follow_redirects=True
+            )
+        return self._http_client
+
+    def get_client(self, supabase_url: Optional[str] = None,
+                   supabase_key: Optional[str] = None) -> Optional[Client]:
+        """Return the shared client for these credentials (default: SUPABASE_URL/SUPABASE_ANON_KEY)"""
+        supabase_url = supabase_url or os.getenv("SUPABASE_URL")
+        supabase_key = supabase_key or os.getenv("SUPABASE_ANON_KEY")
+        if not supabase_url or not supabase_key:
+            return None
+
+        credentials = (supabase_url, supabase_key)
+        client = self._clients.get(credentials)
+        if client is not None:
+            return client
+
+        with self._lock:
+            if credentials not in self._clients:
+                self._clients[credentials] = self._create_client(supabase_url, supabase_key)
+                logger.info(f"Created pooled Supabase client for {supabase_url}")
+            return self._clients[credentials]
+
+    def _create_client(self, supabase_url: str, supabase_key: str) -> Client:
+        if ClientOptions is not None:
+            try:
+                options = ClientOptions(
+                    httpx_client=self._get_http_client(),
+                    postgrest_client_timeout=self.timeout
+                )
+                return create_client(supabase_url, supabase_key, options=options)
+            except TypeError as e:
+                # Older supabase releases cannot take an external HTTP client; their
+                # per-client session still keeps connections alive across jobs
+                logger.warning(f"Supabase client does not accept a shared HTTP client: {str(e)}")
+        return create_client(supabase_url, supabase_key)
+
+    def close(self) -> None:
+        """Close pooled connections; call once on application shutdown"""
+        with self._lock:
+            for client in self._clients.values():
+                try:
+                    client.postgrest.session.close()
+                except Exception as e:
+                    logger.error(f"Error closing Supabase client: {str(e)}")
+            self._clients.clear()
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+
+
+_supabase_pool: Optional[SupabaseClientPool] = None
+_supabase_pool_lock = threading.Lock()
+
+
+def get_supabase_pool() -> SupabaseClientPool:
+    """Return the process-wide Supabase client pool configured from the environment"""
+    global _supabase_pool
+    if _supabase_pool is None:
+        with _supabase_pool_lock:
+            if _supabase_pool is None:
+                _supabase_pool = SupabaseClientPool(
+                    max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+                    max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", "10")),
+                    keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60")),
+                    timeout=float(os.getenv("SUPABASE_TIMEOUT", "30")),
+                    http2=os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+                )
+    return _supabase_pool
+
+
+def get_supabase_client() -> Optional[Client]:
+    """Shared Supabase client for the default credentials, or None if they are not configured"""
+    return get_supabase_pool().get_client()
+
+
+def close_supabase_pool() -> None:
+    """Close the process-wide pool (application shutdown hook)"""
+    global _supabase_pool
+    with _supabase_pool_lock:
+        if _supabase_pool is not None:
+            _supabase_pool.close()
+            _supabase_pool = None
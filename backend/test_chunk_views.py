@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test lazy page-range chunk views in PDFChunkingService
+"""
+
+import asyncio
+import io
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from types import SimpleNamespace
+
+from services.chunk_processing_service import ChunkProcessingService
+from services.pdf_chunking_service import PDFChunkingService
+
+PDF_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "TransUnion-06-10-2025.pdf")
+
+
+def page_count(pdf_bytes: bytes) -> int:
+    from PyPDF2 import PdfReader
+    return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+async def test_chunk_views(pdf_content: bytes):
+    """Views expose the old chunk keys and serialize the right pages on demand"""
+    print("🧪 Testing chunk views...")
+    service = PDFChunkingService(max_pages_per_chunk=5)
+    chunks = await service.split_pdf(pdf_content, "report.pdf")
+    info = service.get_chunking_info(pdf_content)
+    assert len(chunks) == info["chunks_needed"]
+    for chunk, planned in zip(chunks, info["chunk_info"]):
+        assert chunk["page_range"] == planned["page_range"]
+        assert "chunk_data" not in chunk  # not materialized
+        json.dumps(chunk)  # metadata stays serializable
+        assert page_count(chunk["chunk_data"]) == chunk["total_pages"]
+    assert chunks[0].source._closed, "split_pdf should not leave the source PDF open"
+    print(f"  ✅ {len(chunks)} chunks match the plan, source closed after planning")
+
+    single = await PDFChunkingService(max_pages_per_chunk=1000).split_pdf(pdf_content)
+    assert single[0]["chunk_data"] is pdf_content
+    print("  ✅ Single chunk reuses the original bytes")
+
+
+def test_adaptive_plan(pdf_content: bytes):
+    """Token-aware plans use no more chunks than page-count plans and stay within budget"""
+    print("\n🧪 Testing adaptive chunk plans...")
+    fixed = PDFChunkingService(max_pages_per_chunk=15).get_chunking_info(pdf_content)
+    adaptive = PDFChunkingService(max_pages_per_chunk=15, max_tokens_per_chunk=100000).get_chunking_info(pdf_content)
+    assert adaptive["planning"] == "adaptive"
+    assert adaptive["chunks_needed"] <= fixed["chunks_needed"]
+    tokens = [c["estimated_tokens"] for c in adaptive["chunk_info"]]
+    assert max(tokens) <= 100000
+    print(f"  Fixed pages:    {[c['pages_in_chunk'] for c in fixed['chunk_info']]}")
+    print(f"  Adaptive pages: {[c['pages_in_chunk'] for c in adaptive['chunk_info']]} tokens {tokens}")
+
+    service = PDFChunkingService(max_pages_per_chunk=4, max_tokens_per_chunk=10)
+    assert service._plan_page_ranges(9, [1, 50, 1, 1, 1, 1, 1, 1, 1]) == [(1, 1), (2, 2), (3, 6), (7, 9)]
+    print("  ✅ Oversized pages isolated, page cap respected")
+
+    service = PDFChunkingService(max_pages_per_chunk=1000, max_tokens_per_chunk=10)
+    with service.open_source(pdf_content) as source:
+        source.page_texts = lambda: 1 / 0  # must not be called
+        assert len(service.plan_chunks(source)) == 1
+    print("  ✅ Single-chunk documents skip token planning")
+
+
+def test_iterator_memory(pdf_content: bytes):
+    """Consuming chunks one by one keeps at most one serialized chunk alive"""
+    print("\n🧪 Testing iterator memory...")
+    service = PDFChunkingService(max_pages_per_chunk=5)
+    tracemalloc.start()
+    total_bytes = 0
+    for chunk in service.iter_chunks(pdf_content):
+        total_bytes += len(chunk["chunk_data"])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  Serialized {total_bytes} bytes total, traced peak {peak} bytes "
+          f"(source PDF {len(pdf_content)} bytes)")
+
+
+class CountingDocumentAI:
+    """Stand-in Document AI processor that records how many serialized chunks are held at once"""
+
+    def __init__(self):
+        self.held = 0
+        self.max_held = 0
+        self.pages = []
+
+    async def process_document(self, file_content: bytes, file_name: str) -> SimpleNamespace:
+        self.held += 1
+        self.max_held = max(self.max_held, self.held)
+        await asyncio.sleep(0.01)
+        self.pages.append(page_count(file_content))
+        self.held -= 1
+        return SimpleNamespace(job_id="", document_type=SimpleNamespace(value="pdf"), tables=[], text_blocks=[],
+                               raw_text="", total_pages=self.pages[-1], metadata={}, processing_time=0.0,
+                               confidence_score=0.9)
+
+
+class NullStorage:
+    async def store_chunk_ai_results(self, job_id, chunk_id, chunk_result):
+        pass
+
+
+async def test_lazy_processing(pdf_content: bytes):
+    """The Document AI fan-out pulls iter_chunks lazily and the source closes after the last chunk"""
+    print("\n🧪 Testing lazy chunk processing...")
+    chunking = PDFChunkingService(max_pages_per_chunk=5)
+    sources = []
+    open_source = chunking.open_source
+    chunking.open_source = lambda content: sources.append(open_source(content)) or sources[-1]
+    document_ai = CountingDocumentAI()
+    results = await ChunkProcessingService(document_ai, NullStorage(), max_concurrent_chunks=2).process_chunks(
+        "job-1", "report.pdf", chunking.iter_chunks(pdf_content, "report.pdf"))
+    assert [r['chunk_id'] for r in results] == list(range(len(results)))
+    assert sum(document_ai.pages) == page_count(pdf_content)
+    assert document_ai.max_held <= 2
+    assert sources[0]._closed, "iter_chunks should close the source once exhausted"
+    print(f"  ✅ {len(results)} chunks, at most {document_ai.max_held} serialized chunks held, source closed")
+
+
+if __name__ == "__main__":
+    if not os.path.exists(PDF_PATH):
+        print(f"❌ PDF not found: {PDF_PATH}")
+        sys.exit(1)
+    with open(PDF_PATH, "rb") as f:
+        content = f.read()
+    asyncio.run(test_chunk_views(content))
+    test_adaptive_plan(content)
+    test_iterator_memory(content)
+    asyncio.run(test_lazy_processing(content))
+    print("\n✅ Test completed!")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test concurrent Document AI chunk processing with a local stand-in processor
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from types import SimpleNamespace
+
+from models.tradeline_models import DocumentType, ExtractedText
+from services.chunk_processing_service import ChunkProcessingService
+
+CHUNK_LATENCY = 0.5
+CHUNK_COUNT = 4
+
+
+class LatencyDocumentAI:
+    """Stand-in Document AI processor that sleeps to simulate a remote round trip"""
+
+    def __init__(self, latency: float, failing_chunks: tuple = ()):
+        self.latency = latency
+        self.failing_chunks = failing_chunks
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def process_document(self, file_content: bytes, file_name: str) -> SimpleNamespace:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if any(file_name.endswith(f"_chunk_{i + 1}") for i in self.failing_chunks):
+                raise RuntimeError(f"Injected failure for {file_name}")
+            text = file_content.decode()
+            return SimpleNamespace(
+                job_id="",
+                document_type=DocumentType.PDF,
+                total_pages=1,
+                tables=[],
+                text_blocks=[ExtractedText(content=text, page_number=1, confidence=0.9)],
+                raw_text=text,
+                metadata={"file_name": file_name},
+                processing_time=self.latency,
+                confidence_score=0.9
+            )
+        finally:
+            self.in_flight -= 1
+
+
+class MemoryStorage:
+    """Stand-in storage that keeps chunk results in memory"""
+
+    def __init__(self):
+        self.chunks = {}
+
+    async def store_chunk_ai_results(self, job_id, chunk_id, chunk_result):
+        self.chunks[chunk_id] = chunk_result
+
+
+def make_chunks(count: int) -> list:
+    return [{
+        "chunk_id": i,
+        "chunk_data": f"chunk {i} text".encode(),
+        "page_range": {"start": i + 1, "end": i + 1},
+        "total_pages": 1,
+    } for i in range(count)]
+
+
+async def run_chunks(max_concurrent_chunks: int, failing_chunks: tuple = ()):
+    document_ai = LatencyDocumentAI(CHUNK_LATENCY, failing_chunks)
+    service = ChunkProcessingService(document_ai, MemoryStorage(), max_concurrent_chunks=max_concurrent_chunks)
+    start = time.perf_counter()
+    results = await service.process_chunks("test-job", "report.pdf", make_chunks(CHUNK_COUNT))
+    return results, time.perf_counter() - start, document_ai.max_in_flight
+
+
+async def test_concurrent_chunks():
+    print("🧪 Testing concurrent chunk processing...")
+
+    sequential_results, sequential_time, _ = await run_chunks(max_concurrent_chunks=1)
+    concurrent_results, concurrent_time, max_in_flight = await run_chunks(max_concurrent_chunks=CHUNK_COUNT)
+
+    print(f"  Sequential: {sequential_time:.2f}s")
+    print(f"  Concurrent: {concurrent_time:.2f}s (max in flight: {max_in_flight})")
+    print(f"  Speedup:    {sequential_time / concurrent_time:.2f}x")
+
+    assert [r['chunk_id'] for r in concurrent_results] == list(range(CHUNK_COUNT)), "Chunk order not preserved"
+    assert [r['raw_text'] for r in concurrent_results] == [r['raw_text'] for r in sequential_results]
+    assert concurrent_time < sequential_time / 2, "Concurrent dispatch should beat sequential"
+
+    _, _, bounded_in_flight = await run_chunks(max_concurrent_chunks=2)
+    assert bounded_in_flight <= 2, f"Per-job limit exceeded: {bounded_in_flight}"
+    print("  ✅ Ordering preserved and per-job limit respected")
+
+
+async def test_chunk_failure_tolerance():
+    print("\n🧪 Testing per-chunk failure tolerance...")
+    results, _, _ = await run_chunks(max_concurrent_chunks=CHUNK_COUNT, failing_chunks=(1,))
+    assert [r['chunk_id'] for r in results] == [0, 2, 3], f"Unexpected chunks: {[r['chunk_id'] for r in results]}"
+    print("  ✅ Failed chunk skipped, remaining chunks kept in order")
+
+
+async def test_global_limit_across_jobs():
+    print("\n🧪 Testing the process-wide limit across jobs...")
+    document_ai = LatencyDocumentAI(CHUNK_LATENCY / 5)
+    services = [ChunkProcessingService(document_ai, MemoryStorage(), max_concurrent_chunks=CHUNK_COUNT)
+                for _ in range(3)]
+    await asyncio.gather(*[
+        service.process_chunks(f"job-{n}", "report.pdf", make_chunks(CHUNK_COUNT))
+        for n, service in enumerate(services)
+    ])
+    assert document_ai.max_in_flight <= 2, f"Global limit exceeded: {document_ai.max_in_flight}"
+    print(f"  ✅ {len(services)} jobs shared the limit (max in flight: {document_ai.max_in_flight})")
+
+
+async def main():
+    await test_concurrent_chunks()
+    await test_chunk_failure_tolerance()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    # Each event loop gets its own process-wide semaphore, read from the environment
+    os.environ["DOCUMENT_AI_MAX_CONCURRENCY"] = "2"
+    asyncio.run(test_global_limit_across_jobs())
+    print("\n✅ Test completed!")
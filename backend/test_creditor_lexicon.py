@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Test the creditor lexicon automaton
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.creditor_lexicon import CreditorLexicon, load_creditor_lexicon
+
+SAMPLE_TEXT = """
+TransUnion Credit Report
+CHASE BANK USA, N.A.
+Account Number: ****1234
+CAPITALONE
+Balance: $500.00
+Wells   Fargo Auto
+AFFORDABLE HOUSING LLC
+"""
+
+# Creditor patterns of the regex loop the lexicon replaced, kept as a benchmark baseline
+OLD_CREDITOR_PATTERNS = [
+    # Major Credit Cards - with variations
+    r'(CHASE|Chase|chase)(?:\s+(?:BANK|Bank|bank|CARD|Card|card))?',
+    r'(CAPITAL\s*ONE|Capital\s*One|capital\s*one)',
+    r'(AMERICAN\s*EXPRESS|American\s*Express|Amex|AMEX|amex)',
+    r'(BANK\s*OF\s*AMERICA|Bank\s*of\s*America|BOA|boa)',
+    r'(WELLS\s*FARGO|Wells\s*Fargo|wells\s*fargo)',
+    r'(CITI|Citi|citi|CITIBANK|Citibank|citibank)',
+    r'(DISCOVER|Discover|discover)',
+    r'(SYNCHRONY|Synchrony|synchrony)',
+    r'(BARCLAY|Barclays?|barclay)',
+    r'(US\s*BANK|US\s*Bank|us\s*bank)',
+    # Store Cards - enhanced patterns
+    r'(AMAZON|Amazon|amazon)(?:\s+(?:STORE|store|CARD|card))?',
+    r'(TARGET|Target|target)(?:\s+(?:CARD|card))?',
+    r'(HOME\s*DEPOT|Home\s*Depot|HOMEDEPOT)',
+    r'(LOWES?|Lowe\'s|LOWE\'S|lowes?)',
+    r'(WALMART|Walmart|walmart)',
+    r'(COSTCO|Costco|costco)',
+    r'(NORDSTROM|Nordstrom|nordstrom)',
+    r'(MACY\'S|Macy\'s|macys)',
+    r'(KOHL\'S|Kohl\'s|kohls)',
+    r'(BEST\s*BUY|Best\s*Buy|bestbuy)',
+    # Auto Loans - with financing variations
+    r'(FORD\s*(?:CREDIT|MOTOR\s*CREDIT)?|Ford\s*(?:Credit|Motor\s*Credit)?)',
+    r'(HONDA\s*(?:FINANCIAL|FINANCE)?|Honda\s*(?:Financial|Finance)?)',
+    r'(TOYOTA\s*(?:FINANCIAL|FINANCE)?|Toyota\s*(?:Financial|Finance)?)',
+    r'(NISSAN\s*(?:MOTOR|FINANCIAL)?|Nissan\s*(?:Motor|Financial)?)',
+    r'(GM\s*FINANCIAL|GM\s*Financial|gm\s*financial)',
+    r'(CHRYSLER\s*CAPITAL|Chrysler\s*Capital)',
+    r'(ALLY\s*(?:AUTO|FINANCIAL)?|Ally\s*(?:Auto|Financial)?)',
+    r'(SANTANDER|Santander|santander)',
+    # Student Loans - with variations
+    r'(NAVIENT|Navient|navient)',
+    r'(GREAT\s*LAKES|Great\s*Lakes|great\s*lakes)',
+    r'(NELNET|Nelnet|nelnet)',
+    r'(FEDLOAN|FedLoan|fedloan)',
+    r'(MOHELA|MOHELA|mohela)',
+    r'(DEPT\.?\s*OF\s*EDUCATION|Department\s*of\s*Education)',
+    r'(STUDENT\s*LOAN|Student\s*Loan)',
+    # Mortgage - with variations
+    r'(QUICKEN\s*LOANS|Quicken\s*Loans|ROCKET\s*MORTGAGE|Rocket\s*Mortgage)',
+    r'(FREEDOM\s*MORTGAGE|Freedom\s*Mortgage)',
+    r'(PENNYMAC|PennyMac|pennymac)',
+    r'(CALIBER|Caliber|caliber)',
+    r'(MORTGAGE|Mortgage|mortgage)',
+    # Credit Unions
+    r'(NAVY\s*FEDERAL|Navy\s*Federal)',
+    r'(USAA|usaa)',
+    r'(PENTAGON\s*FCU|Pentagon\s*FCU)',
+    r'(CREDIT\s*UNION|Credit\s*Union)',
+    # Fintech and Others
+    r'(PAYPAL|PayPal|paypal)',
+    r'(AFFIRM|Affirm|affirm)',
+    r'(KLARNA|Klarna|klarna)',
+    r'(SOFI|SoFi|sofi)',
+    r'(UPSTART|Upstart|upstart)',
+    r'(LENDING\s*CLUB|Lending\s*Club)',
+    r'(PROSPER|Prosper|prosper)',
+    r'(AVANT|Avant|avant)',
+    r'(ONEMAIN|OneMain|onemain)',
+]
+REPORT_SECTION = """
+CHASE BANK USA, N.A.
+Account Number: ****1234
+Current Balance: $1,250.00
+Payment Status: Current
+
+CITICARDS CBNA
+Account Number: ****4455
+Balance: $320.00
+
+DISCOVER FINANCIAL SVCS
+Account Number: ****6011
+Credit Limit: $3,000.00
+
+BARCLAYCARD US
+Account Number: ****7788
+Balance: $0.00
+
+NAVIENT SOLUTIONS
+Account Number: ****9900
+Original Loan: $12,000.00
+"""
+
+
+def old_extract_creditor_name(section: str):
+    """The regex loop _extract_creditor_name used before the lexicon"""
+    for pattern in OLD_CREDITOR_PATTERNS:
+        match = re.search(pattern, section, re.IGNORECASE)
+        if match:
+            return re.sub(r'\s+', ' ', match.group(0).strip()).title()
+    return None
+
+
+def test_mentions():
+    """Mentions carry canonical names and offsets"""
+    print("🧪 Testing creditor mentions...")
+    lexicon = load_creditor_lexicon()
+    mentions = lexicon.find_mentions(SAMPLE_TEXT)
+    canonical = [m.canonical_name for m in mentions]
+    print(f"  Found: {canonical}")
+    assert "CHASE" in canonical
+    assert "CAPITAL ONE" in canonical
+    assert "WELLS FARGO" in canonical
+    assert "FORD CREDIT" not in canonical
+    for mention in mentions:
+        assert " ".join(SAMPLE_TEXT[mention.start:mention.end].split()) == mention.matched_text
+    assert lexicon.best_match(SAMPLE_TEXT).matched_text == "CHASE BANK"
+    print("  ✅ Mentions and offsets correct")
+
+
+def test_prefixes_and_lines():
+    """Prefix aliases match the start of longer words; names never span a line break"""
+    print("\n🧪 Testing prefix aliases and line breaks...")
+    lexicon = load_creditor_lexicon()
+    assert lexicon.best_match("CITICARDS CBNA").canonical_name == "CITIBANK"
+    assert lexicon.best_match("BARCLAYCARD US").canonical_name == "BARCLAYS"
+    assert lexicon.best_match("XCITI CARDS") is None  # still needs a boundary before
+    assert lexicon.best_match("FORDHAM UNIVERSITY") is None  # ordinary aliases need both boundaries
+    assert [m.canonical_name for m in lexicon.find_mentions("CAPITAL\nONE BANK")] == []
+    assert lexicon.best_match("CAPITAL\tONE").canonical_name == "CAPITAL ONE"
+    print("  ✅ Prefixes match, line breaks end names")
+
+
+def test_benchmark_against_regex():
+    """The lexicon finds the same creditors as the old regex loop on report sections, faster"""
+    print("\n🧪 Benchmarking against the old regex loop...")
+    lexicon = load_creditor_lexicon()
+    sections = [section for section in (REPORT_SECTION * 200).split("\n\n") if section.strip()]
+
+    start = time.perf_counter()
+    old_names = [old_extract_creditor_name(section) for section in sections]
+    old_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_names = []
+    for section in sections:
+        mention = lexicon.best_match(section)
+        new_names.append(mention.matched_text.title() if mention else None)
+    new_elapsed = time.perf_counter() - start
+
+    assert new_names == old_names, [(a, b) for a, b in zip(old_names, new_names) if a != b][:5]
+    print(f"  {len(sections)} sections: regex {old_elapsed * 1000:.1f}ms, "
+          f"lexicon {new_elapsed * 1000:.1f}ms ({old_elapsed / new_elapsed:.1f}x)")
+
+    text = REPORT_SECTION * 200
+    creditor_pattern = '|'.join([f'(?:{pattern})' for pattern in OLD_CREDITOR_PATTERNS])
+    start = time.perf_counter()
+    old_split = re.compile(f'\n\\s*(?=(?:{creditor_pattern}))', flags=re.IGNORECASE)
+    old_pieces = old_split.split(text)[::old_split.groups + 1]  # drop the captured groups
+    old_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    new_pieces = lexicon.split_at_line_mentions(text)
+    new_elapsed = time.perf_counter() - start
+    print(f"  Section split: regex {old_elapsed * 1000:.1f}ms, lexicon {new_elapsed * 1000:.1f}ms "
+          f"({old_elapsed / new_elapsed:.1f}x)")
+    assert new_pieces == old_pieces
+    print("  ✅ Same creditors and sections found")
+
+
+def test_throughput_flat():
+    """Scan time should not grow with lexicon size"""
+    print("\n🧪 Testing throughput against lexicon size...")
+    text = SAMPLE_TEXT * 200
+    for size in (50, 500, 5000):
+        entries = [{"canonical": f"CREDITOR {i} HOLDINGS", "aliases": [f"CRED{i}"]} for i in range(size)]
+        lexicon = CreditorLexicon(entries + [{"canonical": "CHASE", "aliases": ["CHASE BANK"]}])
+        start = time.perf_counter()
+        lexicon.find_mentions(text)
+        print(f"  {size:>5} creditors: {time.perf_counter() - start:.4f}s")
+
+
+if __name__ == "__main__":
+    test_mentions()
+    test_prefixes_and_lines()
+    test_benchmark_against_regex()
+    test_throughput_flat()
+    print("\n✅ Test completed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test process-pool extraction against the serial path and recovery from a dead worker
+"""
+
+import asyncio
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services import enhanced_extraction_service
+from services.enhanced_extraction_service import (
+    EnhancedExtractionService, get_extraction_pool, shutdown_extraction_pool
+)
+
+SAMPLE_TEXT = """
+CHASE BANK USA, N.A.
+Account Number: ****{n}234
+Current Balance: $1,250.00
+Credit Limit: $5,000.00
+Date Opened: 01/15/2020
+Payment Status: Current
+
+CAPITAL ONE BANK USA, N.A.
+Account Number: ****{n}678
+Balance: $500.00
+High Credit: $2,500.00
+Payment Status: Current
+
+WELLS FARGO AUTO
+Account Number: ****{n}012
+Current Balance: $15,000.00
+Monthly Payment: $320.00
+"""
+UNRECOGNIZED_TEXT = """
+acme lending partners
+Account Number: ****9999
+Current Balance: $700.00
+Date Opened: 02/01/2019
+"""
+REPORT = "TransUnion Credit Report\n" + "".join(SAMPLE_TEXT.format(n=n) for n in range(10))
+
+
+def comparable(tradelines: list) -> list:
+    """Tradelines without their extraction timestamps"""
+    return [{key: value for key, value in tradeline.items() if key != 'extracted_at'} for tradeline in tradelines]
+
+
+async def test_parallel_matches_serial(service: EnhancedExtractionService):
+    """The pool returns the same tradelines, in the same order, as the serial path"""
+    print("🧪 Testing parallel extraction against serial extraction...")
+    for bureau in ("TransUnion", "Unknown"):
+        expected = comparable(service.extract_enhanced_tradelines(REPORT, bureau))
+        actual = comparable(await service.extract_enhanced_tradelines_parallel(REPORT, bureau, min_sections_per_batch=2))
+        assert actual == expected, f"{bureau}: {len(actual)} != {len(expected)} tradelines"
+        print(f"  ✅ {bureau}: {len(actual)} tradelines match")
+
+
+async def test_routing_stays_off_loop(service: EnhancedExtractionService):
+    """Field counts for sections without a creditor come back from the workers"""
+    print("\n🧪 Testing section routing...")
+    scan = service.field_scanner.scan
+    service.field_scanner.scan = lambda *args, **kwargs: 1 / 0  # must not run on the event loop
+    try:
+        routes = await service.route_sections_parallel(UNRECOGNIZED_TEXT + REPORT, "Unknown", min_sections_per_batch=2)
+    finally:
+        service.field_scanner.scan = scan
+    escalated = [route for route in routes if route['escalate'] and route['tradeline'] is None]
+    assert escalated and all(service._count_section_fields(route['section']) >= 2 for route in escalated)
+    print(f"  ✅ {len(routes)} routes, {len(escalated)} unrecognized sections escalated")
+
+
+async def test_recovers_from_dead_worker(service: EnhancedExtractionService):
+    """A killed worker breaks the pool; the next extraction replaces it and succeeds"""
+    print("\n🧪 Testing recovery from a dead worker...")
+    pool = get_extraction_pool()
+    os.kill(next(iter(pool._processes)), signal.SIGKILL)
+    await asyncio.sleep(0.2)
+    tradelines = await service.extract_enhanced_tradelines_parallel(REPORT, "TransUnion")
+    assert comparable(tradelines) == comparable(service.extract_enhanced_tradelines(REPORT, "TransUnion"))
+    assert enhanced_extraction_service._extraction_pool is not pool
+    assert enhanced_extraction_service._extraction_pool_size == int(os.environ["EXTRACTION_WORKERS"])
+    print(f"  ✅ Pool replaced, {len(tradelines)} tradelines extracted")
+
+
+async def main():
+    os.environ.setdefault("EXTRACTION_WORKERS", "2")
+    service = EnhancedExtractionService()
+    try:
+        await test_parallel_matches_serial(service)
+        await test_routing_stays_off_loop(service)
+        await test_recovers_from_dead_worker(service)
+    finally:
+        shutdown_extraction_pool()
+    assert enhanced_extraction_service._extraction_pool is None
+    assert enhanced_extraction_service._extraction_pool_size == 0
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Test the durable pipeline job queue and its worker pool
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.job_queue_service import JobQueueService, LeaseLostError, PipelineWorkerPool, PIPELINE_STAGES
+
+
+def make_queue(directory: str, **kwargs) -> JobQueueService:
+    return JobQueueService(db_path=Path(directory) / "jobs.sqlite3", **kwargs)
+
+
+def test_stage_chain(directory: str):
+    """Completing a stage queues the next one until the pipeline finishes"""
+    print("🧪 Testing stage chaining...")
+    queue = make_queue(directory)
+    queue.enqueue("job-1")
+    stages = []
+    while True:
+        task = queue.claim("worker-a")
+        if task is None:
+            break
+        stages.append(task['stage'])
+        queue.complete(task, "worker-a")
+    assert stages == PIPELINE_STAGES, stages
+    assert all(task['status'] == 'done' for task in queue.get_job_tasks("job-1"))
+    print(f"  ✅ Ran {' -> '.join(stages)}")
+
+
+def test_visibility_timeout(directory: str):
+    """A task whose worker stops renewing its lease is picked up by another worker"""
+    print("\n🧪 Testing visibility timeout...")
+    queue = make_queue(directory, visibility_timeout=0.1)
+    queue.enqueue("job-2")
+    crashed = queue.claim("worker-a")
+    assert queue.claim("worker-b") is None
+    time.sleep(0.15)
+    reclaimed = queue.claim("worker-b")
+    assert reclaimed['task_id'] == crashed['task_id'] and reclaimed['attempts'] == 2
+    # The original worker can no longer complete, renew or fail it
+    assert not queue.extend_lease(crashed, "worker-a")
+    assert queue.fail(crashed, "worker-a", "late error") is None
+    try:
+        queue.complete(crashed, "worker-a")
+        assert False, "complete should raise after the lease was lost"
+    except LeaseLostError:
+        pass
+    assert queue.get_job_tasks("job-2")[0]['status'] == 'running'
+    queue.complete(reclaimed, "worker-b")
+    assert queue.get_job_tasks("job-2")[1]['stage'] == 'chunk'
+    print("  ✅ Expired lease reclaimed")
+
+
+async def test_crash_loop(directory: str):
+    """A task whose worker dies on every attempt is failed once its attempts are used up"""
+    print("\n🧪 Testing crash loop...")
+    queue = make_queue(directory, visibility_timeout=0.05, max_attempts=2)
+    queue.enqueue("job-6")
+    assert queue.claim("worker-a")['attempts'] == 1
+    time.sleep(0.06)
+    assert queue.claim("worker-b")['attempts'] == 2
+    time.sleep(0.06)
+    exhausted = queue.claim("worker-c")
+    assert exhausted['exhausted'] and exhausted['job_id'] == "job-6"
+    assert queue.get_job_tasks("job-6")[0]['status'] == 'failed'
+    assert queue.claim("worker-c") is None
+
+    failed_jobs = []
+
+    async def on_job_failed(job_id, stage, error):
+        failed_jobs.append((job_id, stage, error))
+
+    async def never_called(job_id):
+        raise AssertionError("exhausted task must not run")
+
+    pool = PipelineWorkerPool(queue, {stage: never_called for stage in PIPELINE_STAGES},
+                              on_job_failed=on_job_failed)
+    await pool.run_task(exhausted, "worker-c")
+    assert failed_jobs == [("job-6", "ocr", exhausted['last_error'])]
+    print(f"  ✅ Failed after {exhausted['attempts']} attempts: {exhausted['last_error']}")
+
+
+def test_retry_and_resume(directory: str):
+    """Failures retry with backoff, then fail; resume restarts from the failed stage"""
+    print("\n🧪 Testing retries and resume...")
+    queue = make_queue(directory, max_attempts=2, retry_base_delay=0.05)
+    queue.enqueue("job-3", stage='llm')
+    task = queue.claim("worker-a")
+    assert queue.fail(task, "worker-a", "timeout")
+    assert queue.claim("worker-a") is None  # backing off
+    time.sleep(0.06)
+    task = queue.claim("worker-a")
+    assert not queue.fail(task, "worker-a", "timeout again")
+    assert queue.get_job_tasks("job-3")[0]['status'] == 'failed'
+
+    assert queue.resume_job("job-3") == 'ocr'  # no stage of job-3 has completed yet
+    task = queue.claim("worker-a")
+    queue.complete(task, "worker-a")
+    task = queue.claim("worker-a")
+    assert task['stage'] == 'chunk'
+    queue.fail(task, "worker-a", "x")
+    assert queue.resume_job("job-3") == 'chunk'
+    assert queue.claim("worker-a")['attempts'] == 1
+    print(f"  ✅ Stats: {queue.get_stats()}")
+
+
+async def test_worker_pool(directory: str):
+    """Workers run jobs concurrently through every stage and survive a failing handler"""
+    print("\n🧪 Testing worker pool...")
+    queue = make_queue(directory, retry_base_delay=0.01)
+    runs = []
+    flaky = {"job-b": 1}
+
+    def handler(stage):
+        async def run(job_id):
+            if stage == 'llm' and flaky.get(job_id):
+                flaky[job_id] -= 1
+                raise RuntimeError("rate limited")
+            await asyncio.sleep(0.05)
+            runs.append((job_id, stage))
+        return run
+
+    pool = PipelineWorkerPool(queue, {stage: handler(stage) for stage in PIPELINE_STAGES},
+                              concurrency=3, poll_interval=0.01)
+    for job_id in ["job-a", "job-b", "job-c"]:
+        queue.enqueue(job_id)
+    start = time.perf_counter()
+    await pool.start()
+    while len(runs) < 15 and time.perf_counter() - start < 5:
+        await asyncio.sleep(0.02)
+    elapsed = time.perf_counter() - start
+    await pool.stop()
+
+    for job_id in ["job-a", "job-b", "job-c"]:
+        assert [stage for job, stage in runs if job == job_id] == PIPELINE_STAGES
+    print(f"  3 jobs x {len(PIPELINE_STAGES)} stages in {elapsed:.2f}s with 3 workers")
+    assert elapsed < 15 * 0.05
+    print("  ✅ All stages ran in order, failed stage retried")
+
+
+async def test_lost_lease_and_cancel(directory: str):
+    """A stage that fails after losing its lease is left to the new owner; cancelling stops the heartbeat"""
+    print("\n🧪 Testing lost leases and cancellation...")
+    queue = make_queue(directory, visibility_timeout=0.06, max_attempts=2)
+    failed_jobs = []
+
+    async def on_job_failed(job_id, stage, error):
+        failed_jobs.append(job_id)
+
+    async def slow_failure(job_id):
+        await asyncio.sleep(0.1)
+        raise RuntimeError("too late")
+
+    pool = PipelineWorkerPool(queue, {stage: slow_failure for stage in PIPELINE_STAGES},
+                              on_job_failed=on_job_failed)
+    pool._renew_lease = lambda task, worker_id: asyncio.sleep(3600)  # worker stalls, lease expires
+    queue.enqueue("job-4")
+    task = queue.claim("worker-a")
+    run = asyncio.create_task(pool.run_task(task, "worker-a"))
+    await asyncio.sleep(0.08)
+    reclaimed = queue.claim("worker-b")
+    assert reclaimed['task_id'] == task['task_id']
+    await run
+    assert failed_jobs == [] and queue.get_job_tasks("job-4")[0]['status'] == 'running'
+    assert queue.fail(reclaimed, "worker-b", "done with job-4") is False
+
+    # A stage that succeeds after losing its lease does not queue the next stage
+    async def slow_success(job_id):
+        await asyncio.sleep(0.1)
+
+    pool.handlers = {stage: slow_success for stage in PIPELINE_STAGES}
+    queue.enqueue("job-7")
+    task = queue.claim("worker-a")
+    run = asyncio.create_task(pool.run_task(task, "worker-a"))
+    await asyncio.sleep(0.08)
+    assert queue.claim("worker-b")['task_id'] == task['task_id']
+    await run
+    assert [row['stage'] for row in queue.get_job_tasks("job-7")] == ['ocr']
+
+    heartbeats = []
+
+    async def renew_lease(task, worker_id):
+        heartbeats.append(asyncio.current_task())
+        await asyncio.sleep(3600)
+
+    pool._renew_lease = renew_lease
+    queue.enqueue("job-5")
+    run = asyncio.create_task(pool.run_task(queue.claim("worker-a"), "worker-a"))
+    await asyncio.sleep(0.02)
+    run.cancel()
+    await asyncio.gather(run, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert heartbeats and heartbeats[0].cancelled()
+    print("  ✅ Late outcomes ignored after a lost lease, heartbeat stopped on cancel")
+
+
+async def main():
+    for test in [test_stage_chain, test_visibility_timeout, test_retry_and_resume]:
+        with tempfile.TemporaryDirectory() as directory:
+            test(directory)
+    for test in [test_crash_loop, test_worker_pool, test_lost_lease_and_cancel]:
+        with tempfile.TemporaryDirectory() as directory:
+            await test(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
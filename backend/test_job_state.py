@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test the SQLite job state store and concurrent job coordination updates
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models.tradeline_models import ProcessingStatus
+from services.job_service import JobService
+from services.job_state_service import JobStateStore
+from services.storage_service import StorageService
+
+JOB_COUNT = 100
+UPDATES_PER_JOB = 10
+
+
+async def test_no_lost_updates(directory: str):
+    """Concurrent coordination updates across many jobs are all recorded"""
+    print("🧪 Testing concurrent coordination updates...")
+    storage = StorageService(directory)
+    jobs = JobService(storage)
+    job_ids = await asyncio.gather(*[
+        jobs.create_processing_job(None, f"report_{i}.pdf", 1024) for i in range(JOB_COUNT)
+    ])
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        jobs.update_job_coordination(job_id, f"service_{n}", f"phase_{n}", {"n": n})
+        for job_id in job_ids for n in range(UPDATES_PER_JOB)
+    ])
+    elapsed = time.perf_counter() - start
+    print(f"  {JOB_COUNT * UPDATES_PER_JOB} updates in {elapsed:.2f}s")
+
+    for job_id in job_ids:
+        job_data = await storage.get_job_data(job_id)
+        assert len(job_data['processing_phases']) == UPDATES_PER_JOB
+        assert sorted(job_data['services_used']) == sorted(f"service_{n}" for n in range(UPDATES_PER_JOB))
+    print("  ✅ No updates lost")
+
+
+async def test_status_and_errors(directory: str):
+    """Status and error updates modify only their own fields"""
+    print("\n🧪 Testing status updates...")
+    storage = StorageService(directory)
+    jobs = JobService(storage)
+    job_id = await jobs.create_processing_job(None, "report.pdf", 1024)
+    await asyncio.gather(
+        jobs.update_job_status(job_id, ProcessingStatus.FAILED),
+        jobs.update_job_error(job_id, "Document AI quota exceeded"),
+        jobs.update_job_coordination(job_id, "document_ai", "chunking")
+    )
+    job_data = await storage.get_job_data(job_id)
+    assert job_data['status'] == ProcessingStatus.FAILED.value
+    assert job_data['error_message'] == "Document AI quota exceeded"
+    assert 'chunking' in job_data['processing_phases']
+    assert await storage.update_job_data("missing-job", lambda job_data: None) is None
+    print("  ✅ Fields updated independently")
+
+
+async def test_completion_does_not_block(directory: str):
+    """Completing jobs returns immediately and completed jobs are reaped later"""
+    print("\n🧪 Testing job completion...")
+    storage = StorageService(directory)
+    jobs = JobService(storage)
+    jobs.completed_job_retention = 0.2
+    job_ids = [await jobs.create_processing_job(None, f"report_{i}.pdf", 1024) for i in range(20)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*[jobs.complete_job_coordination(job_id, []) for job_id in job_ids])
+    await jobs.create_processing_job(None, "next.pdf", 1024)
+    elapsed = time.perf_counter() - start
+    print(f"  20 completions and a new job in {elapsed:.3f}s")
+    assert elapsed < 0.2
+    assert (await jobs.get_active_jobs_summary())['active_count'] == 21
+
+    await asyncio.sleep(0.3)
+    summary = await jobs.get_active_jobs_summary()
+    assert summary['active_count'] == 1, summary
+    assert (await storage.get_job_data(job_ids[0]))['status'] == ProcessingStatus.COMPLETED.value
+    print("  ✅ Completed jobs evicted by the reaper")
+
+
+def test_connections_reused_and_closed(directory: str):
+    """Operations from short-lived threads share pooled connections, which close() closes"""
+    print("\n🧪 Testing connection pooling...")
+    store = JobStateStore(os.path.join(directory, "jobs.sqlite3"))
+    store.put("job-1", {"count": 0})
+    for _ in range(20):
+        thread = threading.Thread(target=store.update, args=("job-1", lambda job: job.update(count=job["count"] + 1)))
+        thread.start()
+        thread.join()
+    assert store.get("job-1")["count"] == 20
+    assert len(store._idle) == 1, "each thread should reuse the idle connection"
+    idle = store._idle[0]
+    store.close()
+    try:
+        idle.execute("SELECT 1")
+        assert False, "close() should close idle connections"
+    except sqlite3.ProgrammingError:
+        pass
+    print("  ✅ 20 threads used 1 connection, closed on close()")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        await test_no_lost_updates(directory)
+    with tempfile.TemporaryDirectory() as directory:
+        await test_status_and_errors(directory)
+    with tempfile.TemporaryDirectory() as directory:
+        await test_completion_does_not_block(directory)
+    with tempfile.TemporaryDirectory() as directory:
+        test_connections_reused_and_closed(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
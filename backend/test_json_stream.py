@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test the incremental JSON parser used for streamed LLM responses
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.json_stream import IncrementalJSONParser, parse_streamed_items
+from utils.llm_helpers import ResponseValidator
+
+TRADELINES = [
+    {"index": i, "creditor_name": f"CREDITOR {{{i}}} [\"A\\B\"]", "account_balance": f"${i * 100}.00"}
+    for i in range(25)
+]
+RESPONSE = "Here you go:\n```json\n" + json.dumps({
+    "summary": {"tradelines": [{"index": -1}]},  # nested key with the same name is ignored
+    "tradelines": TRADELINES
+}, indent=2) + "\n```\nDone."
+
+
+def feed_in_pieces(text: str, rng: random.Random) -> list:
+    parser = IncrementalJSONParser("tradelines")
+    items = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        items.extend(parser.feed(text[position:position + size]))
+        position += size
+    assert parser.finished
+    return items
+
+
+def test_random_chunking():
+    """Items come out identical however the response is split"""
+    print("🧪 Testing random chunk boundaries...")
+    rng = random.Random(17)
+    for _ in range(200):
+        assert feed_in_pieces(RESPONSE, rng) == TRADELINES
+    print(f"  ✅ {len(TRADELINES)} items recovered across 200 random splits")
+
+
+def test_items_emitted_early():
+    """Each item is emitted as soon as its closing brace arrives"""
+    print("\n🧪 Testing early emission...")
+    parser = IncrementalJSONParser("tradelines")
+    first_end = RESPONSE.index("}", RESPONSE.index("\"$0.00\"")) + 1
+    assert parser.feed(RESPONSE[:first_end - 1]) == []
+    assert parser.feed(RESPONSE[first_end - 1:first_end]) == [TRADELINES[0]]
+    print("  ✅ First item available before the rest of the response")
+
+
+def test_top_level_array_and_malformed():
+    """Top-level arrays are supported and malformed items are skipped"""
+    print("\n🧪 Testing arrays and malformed items...")
+    assert parse_streamed_items('[{"a": 1}, {"a": 2}]') == [{"a": 1}, {"a": 2}]
+    assert parse_streamed_items('{"tradelines": [{"a": 1}, {"a": }, {"a": 3}]}') == [{"a": 1}, {"a": 3}]
+    print("  ✅ Handled")
+
+
+def test_brackets_in_prose():
+    """Brackets in prose before the payload do not hide the items"""
+    print("\n🧪 Testing brackets in prose...")
+    responses = [
+        'Here are the results [2 items]:\n```json\n{"tradelines": [{"a": 1}, {"a": 2}]}\n```',
+        'Note: use {curly} data.\n{"tradelines": [{"a": 1}, {"a": 2}]}',
+        'See [1] and ["x"], then { "tradelines": [{"a": 1}, {"a": 2}] }',
+    ]
+    rng = random.Random(3)
+    for response in responses:
+        assert parse_streamed_items(response) == [{"a": 1}, {"a": 2}], response
+        for _ in range(50):
+            assert feed_in_pieces(response, rng) == [{"a": 1}, {"a": 2}], response
+    assert parse_streamed_items('Use { and } carefully: [{"a": 1}]') == [{"a": 1}]
+    print("  ✅ Prose skipped")
+
+
+def test_clean_json_response():
+    """The validator extracts the first JSON value from surrounding prose"""
+    print("\n🧪 Testing response cleaning...")
+    cleaned = ResponseValidator().clean_json_response(RESPONSE)
+    assert json.loads(cleaned)["tradelines"] == TRADELINES
+    print("  ✅ Cleaned")
+
+
+if __name__ == "__main__":
+    test_random_chunking()
+    test_items_emitted_early()
+    test_top_level_array_and_malformed()
+    test_brackets_in_prose()
+    test_clean_json_response()
+    print("\n✅ Test completed!")
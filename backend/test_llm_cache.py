@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the persistent LLM response cache
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.llm_cache_service import LLMResponseCacheService
+
+
+def make_cache(directory: str, **kwargs) -> LLMResponseCacheService:
+    return LLMResponseCacheService(db_path=Path(directory) / "llm.sqlite3", **kwargs)
+
+
+async def test_hit_and_miss(directory: str):
+    """Identical requests hit; any change to model, sampling or prompt misses"""
+    print("🧪 Testing cache keys...")
+    cache = make_cache(directory)
+    key = cache.make_key("gemini-2.5-flash", 0.0, 1.0, 4000, "system", "prompt")
+    assert await cache.get(key) is None
+    await cache.put(key, "gemini-2.5-flash", 0.0, 1.0, '{"ok": true}')
+    assert await cache.get(key) == '{"ok": true}'
+    for variant in [("other-model", 0.0, 1.0, 4000, "system", "prompt"),
+                    ("gemini-2.5-flash", 0.0, 0.9, 4000, "system", "prompt"),
+                    ("gemini-2.5-flash", 0.0, 1.0, 4000, "system", "prompt!")]:
+        assert cache.make_key(*variant) != key
+
+    # Survives a restart
+    reopened = make_cache(directory)
+    assert await reopened.get(key) == '{"ok": true}'
+    print(f"  ✅ Stats: {cache.get_stats()}")
+
+
+def test_cacheable():
+    """Only temperature-0 requests are cached by default, and bypass always skips"""
+    print("\n🧪 Testing cache policy...")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = make_cache(directory)
+        assert cache.is_cacheable(0.0)
+        assert not cache.is_cacheable(0.7)
+        assert not cache.is_cacheable(0.0, bypass=True)
+        assert make_cache(directory, cache_all_temperatures=True).is_cacheable(0.7)
+        assert not make_cache(directory, enabled=False).is_cacheable(0.0)
+    print("  ✅ Policy correct")
+
+
+async def test_eviction(directory: str):
+    """Expired and least recently used entries are evicted"""
+    print("\n🧪 Testing eviction...")
+    cache = make_cache(directory, max_entries=3, ttl_seconds=3600)
+    keys = [cache.make_key("m", 0.0, 1.0, 10, "s", f"prompt {i}") for i in range(5)]
+    for i, key in enumerate(keys[:3]):
+        await cache.put(key, "m", 0.0, 1.0, f"response {i}")
+        time.sleep(0.01)
+    await cache.get(keys[0])  # keys[0] is now most recently used
+    await cache.put(keys[3], "m", 0.0, 1.0, "response 3")
+    assert await cache.get(keys[1]) is None
+    assert await cache.get(keys[0]) == "response 0"
+
+    short_lived = make_cache(directory, ttl_seconds=0)
+    await short_lived.put(keys[4], "m", 0.0, 1.0, "response 4")
+    time.sleep(0.01)
+    assert await short_lived.get(keys[4]) is None
+    print(f"  ✅ Stats: {cache.get_stats()}")
+
+
+async def test_sweeps_only_when_due(directory: str):
+    """The eviction sweep runs on the first write, then only when a cap may have been passed"""
+    print("\n🧪 Testing eviction sweeps...")
+    cache = make_cache(directory, max_entries=10)
+    sweeps = []
+    original_evict = cache._evict_if_needed
+    cache._evict_if_needed = lambda now: sweeps.append(now) or original_evict(now)
+    keys = [cache.make_key("m", 0.0, 1.0, 10, "s", f"prompt {i}") for i in range(30)]
+    for key in keys[:10]:
+        await cache.put(key, "m", 0.0, 1.0, "response")
+    assert len(sweeps) == 1, sweeps
+    for key in keys[10:]:
+        await cache.put(key, "m", 0.0, 1.0, "response")
+    assert len(sweeps) == 11 and await cache.get(keys[0]) is None  # over the cap every 2nd write (low water 9)
+    assert oct(os.stat(cache.db_path).st_mode & 0o777) == oct(0o600)
+    print(f"  ✅ {len(sweeps)} sweeps for 30 writes, stats: {cache.get_stats()}")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        await test_hit_and_miss(directory)
+    test_cacheable()
+    for test in [test_eviction, test_sweeps_only_when_due]:
+        with tempfile.TemporaryDirectory() as directory:
+            await test(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
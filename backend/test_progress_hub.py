@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory job progress hub behind the progress event stream
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.progress_service import ProgressHub
+
+
+async def collect(hub: ProgressHub, job_id: str, **kwargs):
+    return [state async for state in hub.subscribe(job_id, **kwargs)]
+
+
+async def test_fan_out_and_replay():
+    """Late subscribers start from the latest state; all subscribers see every update"""
+    print("🧪 Testing fan-out and replay...")
+    hub = ProgressHub()
+    hub.publish("job-1", 'stage_started', stage='ocr')
+    hub.publish("job-1", 'stage_started', stage='document_ai', chunks_total=4, chunks_completed=0)
+
+    subscribers = [asyncio.ensure_future(collect(hub, "job-1")) for _ in range(3)]
+    await asyncio.sleep(0)
+    for done in range(1, 5):
+        hub.publish("job-1", 'chunk_completed', stage='document_ai', stage_progress=done / 4, chunks_completed=done)
+    hub.publish("job-1", 'completed')
+    received = await asyncio.wait_for(asyncio.gather(*subscribers), timeout=1)
+
+    for states in received:
+        assert [state['event'] for state in states] == ['stage_started'] + ['chunk_completed'] * 4 + ['completed']
+        assert states[0]['chunks_completed'] == 0 and states[0]['progress'] == 15
+        assert states[2]['progress'] == 38 and states[2]['chunks_completed'] == 2
+        assert states[-1]['progress'] == 100 and states[-1]['done']
+    print(f"  ✅ 3 subscribers got {len(received[0])} states each")
+
+    # A subscriber arriving after completion gets the final state and the stream ends
+    late = await asyncio.wait_for(collect(hub, "job-1"), timeout=1)
+    assert len(late) == 1 and late[0]['event'] == 'completed'
+    print("  ✅ Finished job replayed and closed")
+
+
+async def test_slow_subscriber():
+    """A subscriber that falls behind skips to the newest states instead of blocking publishers"""
+    print("\n🧪 Testing slow subscriber...")
+    hub = ProgressHub(queue_size=5)
+    stream = hub.subscribe("job-2")
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0)
+    for n in range(100):
+        hub.publish("job-2", 'tradelines_normalized', stage='llm', stage_progress=n / 100, tradelines_normalized=n)
+    await asyncio.sleep(0)
+    states = [await first]
+    hub.publish("job-2", 'failed', error="quota exceeded")
+    states += [state async for state in stream]
+    assert len(states) <= 7, len(states)
+    assert states[-2]['tradelines_normalized'] == 99
+    assert states[-1]['error'] == "quota exceeded" and states[-1]['tradelines_normalized'] == 99
+    assert hub.get_stats()['subscribers'] == 0
+    print(f"  ✅ Received {len(states)} of 101 states, ending with the latest")
+
+
+async def test_keepalive_and_threads():
+    """Idle streams yield keepalives; events published from other threads are delivered"""
+    print("\n🧪 Testing keepalive and cross-thread publish...")
+    hub = ProgressHub()
+    stream = hub.subscribe("job-3", keepalive=0.05)
+    assert await stream.__anext__() is None
+    worker = threading.Thread(target=lambda: [
+        hub.publish("job-3", 'stage_started', stage='persist'),
+        hub.publish("job-3", 'completed')
+    ])
+    worker.start()
+    states = [state async for state in stream if state is not None]
+    worker.join()
+    assert [state['event'] for state in states] == ['stage_started', 'completed']
+    assert hub.get_state("job-3")['progress'] == 100
+    assert hub.get_state("unknown") is None
+    print("  ✅ Keepalive sent and threaded events delivered")
+
+
+async def test_bounded_state():
+    """Only the most recently updated jobs keep their state"""
+    print("\n🧪 Testing state eviction...")
+    hub = ProgressHub(max_jobs=10)
+    for n in range(25):
+        hub.publish(f"job-{n}", 'stage_started', stage='ocr')
+    assert hub.get_stats()['jobs'] == 10
+    assert hub.get_state("job-0") is None and hub.get_state("job-24") is not None
+    print(f"  ✅ Stats: {hub.get_stats()}")
+
+
+async def main():
+    await test_fan_out_and_replay()
+    await test_slow_subscriber()
+    await test_keepalive_and_threads()
+    await test_bounded_state()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test the process-wide LLM rate limiter
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.rate_limiter import LLMRateLimiter
+
+
+async def test_token_budget():
+    """Requests beyond the token budget wait for the bucket to refill"""
+    print("🧪 Testing tokens-per-minute budget...")
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=6000)  # 100 tokens/s
+    await limiter.acquire(6000)
+    start = time.perf_counter()
+    await limiter.acquire(50)
+    waited = time.perf_counter() - start
+    print(f"  Waited {waited:.2f}s for 50 tokens")
+    assert 0.4 <= waited < 1.0
+    print("  ✅ Token budget enforced")
+
+
+async def test_settle_refund():
+    """Settling with actual usage returns unused reserved tokens"""
+    print("\n🧪 Testing reservation refund...")
+    limiter = LLMRateLimiter(requests_per_minute=1000, tokens_per_minute=6000)
+    reserved = await limiter.acquire(6000)
+    limiter.settle(reserved, actual_tokens=1000)
+    start = time.perf_counter()
+    await limiter.acquire(4000)
+    assert time.perf_counter() - start < 0.1
+    print("  ✅ Unused tokens returned to the bucket")
+
+
+async def test_request_budget():
+    """Concurrent callers are paced by requests per minute"""
+    print("\n🧪 Testing requests-per-minute budget...")
+    limiter = LLMRateLimiter(requests_per_minute=600, tokens_per_minute=10 ** 9)  # 10 requests/s
+    for _ in range(600):
+        await limiter.acquire(1)
+    start = time.perf_counter()
+    await asyncio.gather(*[limiter.acquire(1) for _ in range(5)])
+    waited = time.perf_counter() - start
+    print(f"  5 requests after burst took {waited:.2f}s, stats {limiter.get_stats()}")
+    assert 0.4 <= waited < 1.0
+    print("  ✅ Request budget enforced")
+
+
+async def main():
+    await test_token_budget()
+    await test_settle_refund()
+    await test_request_budget()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test the content-addressed result cache and its eviction sweeps
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.result_cache_service import ResultCacheService
+
+
+async def test_round_trip(directory: str):
+    """Stage outputs are read back and concurrent writes to one entry do not collide"""
+    print("🧪 Testing cache round trip...")
+    cache = ResultCacheService(directory)
+    await asyncio.gather(*[cache.put_json("a" * 64, 'llm_results', {'n': n}) for n in range(20)])
+    assert (await cache.get_json("a" * 64, 'llm_results'))['n'] in range(20)
+    await cache.put_bytes("a" * 64, 'ocr_pdf', b"%PDF")
+    assert await cache.get_bytes("a" * 64, 'ocr_pdf') == b"%PDF"
+    assert await cache.get_json("b" * 64, 'llm_results') is None
+    print(f"  ✅ Stats: {cache.get_stats()}")
+
+
+async def test_sweeps_only_when_due(directory: str):
+    """The cache directory is walked once, then only when the size estimate passes max_bytes"""
+    print("\n🧪 Testing eviction sweeps...")
+    cache = ResultCacheService(directory, max_bytes=10_000)
+    sweeps = []
+    original_sweep = cache._sweep
+    cache._sweep = lambda: sweeps.append(1) or original_sweep()
+
+    for n in range(5):
+        await cache.put_bytes(f"{n:064d}", 'ocr_pdf', b"x" * 1000)
+    assert len(sweeps) == 1, sweeps
+    for n in range(5, 15):
+        await cache.put_bytes(f"{n:064d}", 'ocr_pdf', b"x" * 1000)
+    assert 1 < len(sweeps) < 10, sweeps
+    assert await cache.get_bytes(f"{0:064d}", 'ocr_pdf') is None  # least recently used, evicted
+    assert await cache.get_bytes(f"{14:064d}", 'ocr_pdf') is not None
+    print(f"  ✅ {len(sweeps)} sweeps for 15 writes, stats: {cache.get_stats()}")
+
+
+async def main():
+    for test in [test_round_trip, test_sweeps_only_when_due]:
+        with tempfile.TemporaryDirectory() as directory:
+            await test(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
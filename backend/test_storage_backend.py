@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test atomic, compact and optionally compressed storage I/O
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.storage_backend import FileStorageBackend, zstandard
+from services.storage_service import StorageService
+
+AI_RESULTS = {
+    'job_id': 'job-1',
+    'tables': [{'rows': [['CHASE BANK', '$1,200', 'Open']] * 50}] * 20,
+    'text_content': {'raw_text': "ACCOUNT NAME CHASE BANK BALANCE $1,200 " * 500},
+}
+
+
+async def test_atomic_writes(directory: str):
+    """A failed write leaves the previous file intact and no temp files behind"""
+    print("🧪 Testing atomic writes...")
+    backend = FileStorageBackend(compression=False)
+    path = Path(directory) / "results.json"
+    await backend.write_json(path, {'version': 1})
+
+    # Fail the final rename, as if the process died before the write completed
+    original_replace = os.replace
+    os.replace = lambda *args: (_ for _ in ()).throw(OSError("disk full"))
+    try:
+        await backend.write_json(path, {'version': 2})
+        assert False, "write should have failed"
+    except OSError:
+        pass
+    finally:
+        os.replace = original_replace
+    assert await backend.read_json(path) == {'version': 1}
+    assert [p.name for p in Path(directory).iterdir()] == ["results.json"]
+    print("  ✅ Previous version kept, no temp files left")
+
+
+async def test_compact_and_compressed(directory: str):
+    """Results are written compactly, compressed when zstandard is available, and read back"""
+    print("\n🧪 Testing compact and compressed storage...")
+    storage = StorageService(directory)
+    await storage.store_document_ai_results('job-1', AI_RESULTS)
+    assert await storage.get_document_ai_results('job-1') == AI_RESULTS
+
+    stored = list((Path(directory) / "ai_results").iterdir())
+    pretty_size = len(json.dumps(AI_RESULTS, indent=2))
+    print(f"  {stored[0].name}: {stored[0].stat().st_size} bytes (indented JSON: {pretty_size} bytes)")
+    assert stored[0].stat().st_size < pretty_size
+    if zstandard is None:
+        print("  ⚠️ zstandard not installed, compression not exercised")
+    else:
+        assert stored[0].name.endswith(".json.zst")
+
+    # Files written uncompressed (or by older versions) are still read
+    legacy_path = Path(directory) / "llm_input" / "job-2.json"
+    legacy_path.write_text(json.dumps({'text': 'legacy'}, indent=2))
+    assert (await storage.get_llm_input('job-2'))['text'] == 'legacy'
+    await storage.store_llm_input('job-2', {'text': 'new'})
+    assert (await storage.get_llm_input('job-2'))['text'] == 'new'
+    assert len(list(legacy_path.parent.glob("job-2.json*"))) == 1
+    print("  ✅ Round trip and legacy files")
+
+
+async def test_chunk_results(directory: str):
+    """Chunk results are listed in chunk order whatever their file format"""
+    print("\n🧪 Testing chunk results...")
+    storage = StorageService(directory)
+    await asyncio.gather(*[
+        storage.store_chunk_ai_results('job-3', chunk_id, {'raw_text': f"chunk {chunk_id}"})
+        for chunk_id in [2, 0, 11, 1]
+    ])
+    uncompressed = StorageService(directory, backend=FileStorageBackend(compression=False))
+    await uncompressed.store_chunk_ai_results('job-3', 5, {'raw_text': "chunk 5"})
+    chunk_results = await storage.get_all_chunk_results('job-3')
+    assert [result['chunk_id'] for result in chunk_results] == [0, 1, 2, 5, 11]
+    assert await storage.get_chunk_ai_results('job-3', 7) is None
+    assert await storage.get_ocr_pdf('job-3') is None
+    print(f"  ✅ Retrieved {len(chunk_results)} chunks in order")
+
+
+async def main():
+    for test in [test_atomic_writes, test_compact_and_compressed, test_chunk_results]:
+        with tempfile.TemporaryDirectory() as directory:
+            await test(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    print("\n✅ Test completed!")
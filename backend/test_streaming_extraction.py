@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test page-by-page streaming extraction against whole-document extraction
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from enhanced_bureau_detection import EnhancedBureauDetector
+from models.tradeline_models import DocumentType, ExtractedText
+from services.chunk_processing_service import ChunkProcessingService, ChunkTradelineStream
+from services.enhanced_extraction_service import EnhancedExtractionService
+from services.progress_service import ProgressHub
+
+SAMPLE_TEXT = """
+CHASE BANK USA, N.A.
+Account Number: ****1234
+Current Balance: $1,250.00
+Credit Limit: $5,000.00
+Payment Status: Current
+
+CAPITAL ONE BANK USA, N.A.
+Account Number: ****5678
+Balance: $500.00
+High Credit: $2,500.00
+Payment Status: Current
+
+WELLS FARGO AUTO
+Account Number: ****9012
+Current Balance: $15,000.00
+Monthly Payment: $320.00
+"""
+
+
+def split_into_pages(text: str, lines_per_page: int) -> list:
+    """Cut text into fake pages so that sections straddle page boundaries"""
+    lines = text.split('\n')
+    return ['\n'.join(lines[i:i + lines_per_page]) for i in range(0, len(lines), lines_per_page)]
+
+
+def test_streaming_parity():
+    """Streaming must find the same tradelines as whole-document extraction"""
+    print("🧪 Testing streaming extraction parity...")
+    service = EnhancedExtractionService()
+    # Skip date/monetary validation so the comparison doesn't depend on dateutil
+    service._validate_and_enhance_tradelines = lambda tradelines: tradelines
+    text = SAMPLE_TEXT * 5
+
+    expected = [(t['creditor_name'], t['account_number']) for t in
+                service.extract_enhanced_tradelines(text, "TransUnion")]
+
+    for lines_per_page in (3, 7, 20):
+        pages = split_into_pages(text, lines_per_page)
+        actual = [(t['creditor_name'], t['account_number']) for t in
+                  service.iter_tradelines_from_pages(pages, "TransUnion")]
+        assert actual == expected, f"{lines_per_page} lines/page: {actual} != {expected}"
+        print(f"  ✅ {len(pages)} pages of {lines_per_page} lines: {len(actual)} tradelines match")
+
+
+class PagedDocumentAI:
+    """Stand-in Document AI processor: chunk bytes are pages joined by form feeds, later chunks are slower"""
+
+    def __init__(self):
+        self.finished_chunks = []
+
+    async def process_document(self, file_content: bytes, file_name: str) -> SimpleNamespace:
+        chunk = int(file_name.rsplit("_", 1)[1]) - 1
+        await asyncio.sleep(0.05 * chunk)
+        pages = file_content.decode().split("\f")
+        self.finished_chunks.append(chunk)
+        return SimpleNamespace(
+            job_id="", document_type=DocumentType.PDF, total_pages=len(pages), tables=[],
+            text_blocks=[ExtractedText(content=page, page_number=n, confidence=0.9) for n, page in enumerate(pages, 1)],
+            raw_text="\n".join(pages), metadata={}, processing_time=0.0, confidence_score=0.9
+        )
+
+
+class MemoryStorage:
+    async def store_chunk_ai_results(self, job_id, chunk_id, chunk_result):
+        pass
+
+
+async def test_chunk_streaming():
+    """Tradelines are published while later chunks are still in flight, matching whole-document extraction"""
+    print("\n🧪 Testing tradeline streaming from Document AI chunks...")
+    service = EnhancedExtractionService()
+    service._validate_and_enhance_tradelines = lambda tradelines: tradelines
+    text = "TransUnion Credit Report\n" + SAMPLE_TEXT * 5
+    expected = [(t['creditor_name'], t['account_number']) for t in
+                service.extract_enhanced_tradelines(text, "Unknown")]
+
+    pages = split_into_pages(text, 7)
+    chunks = [{"chunk_data": "\f".join(pages[i:i + 4]).encode(), "page_range": {"start": i + 1, "end": i + 4},
+               "total_pages": len(pages[i:i + 4])} for i in range(0, len(pages), 4)]
+    document_ai = PagedDocumentAI()
+    hub = ProgressHub()
+    published = []
+    original_publish = hub.publish
+    hub.publish = lambda job_id, event, **fields: published.append(
+        (event, list(document_ai.finished_chunks))) or original_publish(job_id, event, **fields)
+
+    stream = ChunkTradelineStream("job-1", service, EnhancedBureauDetector(), hub)
+    await ChunkProcessingService(document_ai, MemoryStorage(), hub).process_chunks(
+        "job-1", "report.pdf", chunks, stream.add_chunk)
+    tradelines = await stream.finish()
+
+    assert [(t['creditor_name'], t['account_number']) for t in tradelines] == expected
+    first_found = next(finished for event, finished in published if event == 'tradelines_found')
+    assert len(first_found) < len(chunks), "First tradelines should arrive before the last chunk finishes"
+    assert hub.get_state("job-1")['tradelines_found'] == len(expected)
+    print(f"  ✅ {len(tradelines)} tradelines from {len(chunks)} chunks, first after {len(first_found)} chunk(s)")
+
+
+if __name__ == "__main__":
+    test_streaming_parity()
+    asyncio.run(test_chunk_streaming())
+    print("\n✅ Test completed!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test the cached encoder registry and fast token estimation in TokenCounter
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.llm_helpers import TokenCounter, TokenEstimator, get_encoder, get_estimator
+
+SAMPLE_TEXT = """
+CHASE BANK USA, N.A.
+Account Number: ****1234
+Current Balance: $1,250.00
+Credit Limit: $5,000.00
+Payment Status: Current
+Date Opened: 01/15/2020
+""" * 50
+
+
+def test_construction_is_cheap():
+    """Constructing counters for unknown models neither fails nor loads anything"""
+    print("🧪 Testing construction...")
+    start = time.perf_counter()
+    counters = [TokenCounter("gemini-2.5-flash") for _ in range(100)]
+    elapsed = time.perf_counter() - start
+    print(f"  100 counters in {elapsed * 1000:.1f}ms")
+    assert counters[0].estimator is counters[-1].estimator
+    assert get_encoder("gemini-2.5-flash") is None
+    assert counters[0].count_tokens(SAMPLE_TEXT) > 0
+    print("  ✅ Shared estimator, no encoder required")
+
+
+def test_fit_prompt():
+    """fit_prompt truncates long prompts and reports the resulting token count"""
+    print("\n🧪 Testing prompt fitting...")
+    counter = TokenCounter("gemini-2.5-flash")
+    prompt, tokens = counter.fit_prompt(SAMPLE_TEXT, 10 ** 6)
+    assert prompt == SAMPLE_TEXT and tokens == counter.count_tokens(SAMPLE_TEXT)
+    truncated, truncated_tokens = counter.fit_prompt(SAMPLE_TEXT, 300)
+    assert "CONTENT TRUNCATED" in truncated
+    assert truncated_tokens == counter.count_tokens(truncated) <= 330
+    print(f"  {tokens} tokens -> {counter.count_tokens(truncated)} tokens after truncation")
+    print("  ✅ Truncation fits the budget")
+
+
+def test_pack_sections():
+    """Whole sections are packed in order and spill into extra groups, never dropped"""
+    print("\n🧪 Testing section packing...")
+    counter = TokenCounter("gemini-2.5-flash")
+    sections = [(i, f"CREDITOR {i}\nAccount Number: ****{i:04d}\nBalance: ${i * 100}.00") for i in range(40)]
+    sections.append((40, SAMPLE_TEXT))  # larger than the budget on its own
+    budget = 200
+    packs = counter.pack_sections(sections, budget)
+    for pack in packs:
+        assert sum(counter.count_packing_tokens(text) for _, text in pack) <= budget or len(pack) == 1
+    packed = [text for pack in packs for index, text in pack if index < 40]
+    assert packed == [text for _, text in sections[:40]]
+    oversized = "\n".join(text for pack in packs for index, text in pack if index == 40)
+    assert oversized.split() == SAMPLE_TEXT.split()
+    print(f"  ✅ {len(sections)} sections in {len(packs)} groups, nothing truncated")
+
+    # Calibration changes counts but not where the sections are split
+    calibrated = TokenCounter("packing-test-model")
+    before = calibrated.pack_sections(sections, budget)
+    for _ in range(20):
+        calibrated.add_tokens(prompt_tokens=300, completion_tokens=0, estimated_prompt_tokens=100)
+    assert calibrated.pack_sections(sections, budget) == before
+    print("  ✅ Packing unchanged by calibration")
+
+
+def test_calibration():
+    """Reported prompt usage pulls the estimator toward the provider's counts"""
+    print("\n🧪 Testing calibration...")
+    estimator = TokenEstimator()
+    raw = estimator.estimate(SAMPLE_TEXT)
+    for _ in range(30):
+        estimator.calibrate(estimator.estimate(SAMPLE_TEXT), int(raw * 1.3))
+    calibrated = estimator.estimate(SAMPLE_TEXT)
+    print(f"  Raw estimate {raw}, actual {int(raw * 1.3)}, calibrated {calibrated} (scale {estimator.scale:.3f})")
+    assert abs(calibrated - raw * 1.3) / (raw * 1.3) < 0.02
+
+    counter = TokenCounter("calibration-test-model")
+    counter.add_tokens(prompt_tokens=200, completion_tokens=10, estimated_prompt_tokens=100)
+    assert get_estimator("calibration-test-model").scale > 1.0
+    print("  ✅ Estimator converges")
+
+
+if __name__ == "__main__":
+    test_construction_is_cheap()
+    test_fit_prompt()
+    test_pack_sections()
+    test_calibration()
+    print("\n✅ Test completed!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory per-user tradeline index used for duplicate detection
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.tradeline_index import TradelineIndex, TradelineIndexCache, tradeline_index_key
+
+STORED = [
+    {'id': '1', 'creditor_name': 'CHASE BANK', 'account_number': '4147-****', 'date_opened': '01/2020'},
+    {'id': '2', 'creditor_name': 'CAPITAL ONE', 'account_number': 'xxxx1234', 'date_opened': '03/2018'},
+]
+
+
+def test_lookup():
+    """Duplicates match on normalized creditor, account first 4 and date opened"""
+    print("🧪 Testing index lookups...")
+    index = TradelineIndex('user-1', 'TransUnion', STORED)
+    assert index.find({'creditor_name': ' chase  bank', 'account_number': '4147 1111', 'date_opened': '01/2020'})['id'] == '1'
+    assert index.find({'creditor_name': 'Capital One', 'account_number': 'XXXX9999', 'date_opened': '03/2018'})['id'] == '2'
+    assert index.find({'creditor_name': 'CHASE BANK', 'account_number': '4147', 'date_opened': '02/2020'}) is None
+    assert tradeline_index_key('Chase', '41-47', None) == ('CHASE', '4147', '')
+    # Same normalization as the unique index: normalize_creditor_name, upper(first 4), btrim(date)
+    assert tradeline_index_key(' chase\t bank ', 'xx-x1', ' 01/2020 ') == ('CHASE BANK', 'XXX1', '01/2020')
+    print("  ✅ Lookups match")
+
+
+def test_add_replaces_by_id():
+    """Re-adding a row with the same id moves it to its new key; removed rows stop matching"""
+    print("\n🧪 Testing index updates...")
+    index = TradelineIndex('user-1', 'TransUnion', STORED)
+    index.add({'id': '1', 'creditor_name': 'CHASE BANK', 'account_number': '4147-****', 'date_opened': '01/2021'})
+    assert len(index) == 2
+    assert index.find({'creditor_name': 'CHASE BANK', 'account_number': '4147', 'date_opened': '01/2020'}) is None
+    assert index.find({'creditor_name': 'CHASE BANK', 'account_number': '4147', 'date_opened': '01/2021'})['id'] == '1'
+    index.remove('1')
+    assert len(index) == 1
+    assert index.find({'creditor_name': 'CHASE BANK', 'account_number': '4147', 'date_opened': '01/2021'}) is None
+    print("  ✅ Updated in place")
+
+
+def test_cache_lru_and_ttl():
+    """Indexes are loaded once, evicted least recently used first, and expire"""
+    print("\n🧪 Testing index cache...")
+    loads = []
+    cache = TradelineIndexCache(max_indexes=2, ttl_seconds=3600)
+    loader = lambda: loads.append(1) or list(STORED)
+    for _ in range(3):
+        cache.get_or_load('user-1', 'TransUnion', loader)
+    assert len(loads) == 1
+    cache.get_or_load('user-2', 'TransUnion', loader)
+    cache.get_or_load('user-1', 'TransUnion', loader)  # user-1 is now most recently used
+    cache.get_or_load('user-3', 'Experian', loader)
+    assert cache.get('user-2', 'TransUnion') is None
+    assert cache.get('user-1', 'TransUnion') is not None
+    cache.invalidate('user-1')
+    assert cache.get('user-1', 'TransUnion') is None
+
+    expiring = TradelineIndexCache(ttl_seconds=0)
+    expiring.get_or_load('user-1', 'TransUnion', loader)
+    time.sleep(0.01)
+    assert expiring.get('user-1', 'TransUnion') is None
+    print(f"  ✅ Stats: {cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    test_lookup()
+    test_add_replaces_by_id()
+    test_cache_lru_and_ttl()
+    print("\n✅ Test completed!")
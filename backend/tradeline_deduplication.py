@@ -1,9 +1,40 @@
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Any, Iterable
+import re
+import uuid
 import hashlib
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from sqlalchemy import text, bindparam
 from sqlalchemy.orm import Session
 from models.tradeline_models import Tradelines  
 from main import TradelineSchema
+from utils.tradeline_index import TradelineIndex, TradelineIndexCache, get_tradeline_index_cache, tradeline_index_key
+
+# Columns written by the bulk upsert (created_at keeps its database default)
+UPSERT_COLUMNS = [f.name for f in fields(Tradelines) if f.name != 'created_at']
+
+# Fields filled from new data when the stored value is empty (see merge_tradelines)
+MERGEABLE_FIELDS = [
+    'account_balance', 'credit_limit', 'monthly_payment',
+    'account_type', 'account_status', 'date_opened'
+]
+
+EMPTY_PLACEHOLDERS = ["", "NULL", "null", "N/A", "n/a", "xx/xx/xxxxx", "0"]
+
+# Conflict target and predicate of unique_tradeline_per_bureau_detailed (migration 20261016);
+# the key expressions match tradeline_index_key so the index and the cached lookups agree
+DETAILED_KEY_CONFLICT_TARGET = """
+    (user_id, normalize_creditor_name(creditor_name), upper(get_account_first_4(account_number)),
+     btrim(date_opened), credit_bureau)
+    WHERE user_id IS NOT NULL
+      AND creditor_name IS NOT NULL AND creditor_name != ''
+      AND credit_bureau IS NOT NULL AND credit_bureau != ''
+      AND date_opened IS NOT NULL AND date_opened != ''
+"""
+
+
+def get_account_first_4(account_number: Optional[str]) -> str:
+    """Python twin of the get_account_first_4() SQL function: first 4 alphanumeric characters"""
+    return re.sub(r'[^A-Za-z0-9]', '', account_number or '')[:4]
 
 @dataclass
 class TradelineKey:
@@ -15,7 +46,7 @@ class TradelineKey:
     def __post_init__(self):
         # Normalize the data for consistent comparison
         self.creditor_name = self.creditor_name.upper().strip()
-        self.account_number_first4 = self.account_number_first4[:4] if self.account_number_first4 else ""
+        self.account_number_first4 = get_account_first_4(self.account_number_first4)
         self.date_opened = self.date_opened.strip()
     
     def to_hash(self) -> str:
@@ -26,14 +57,15 @@ class TradelineKey:
 class TradelineDeduplicator:
     """Handles tradeline deduplication with smart merging logic"""
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, index_cache: TradelineIndexCache = None):
         self.db_session = db_session
+        self.index_cache = index_cache or get_tradeline_index_cache()
         
     def create_tradeline_key(self, tradeline: TradelineSchema) -> TradelineKey:
         """Create a tradeline key from a tradeline object"""
         return TradelineKey(
             creditor_name=tradeline.creditor_name or "",
-            account_number_first4=tradeline.account_number[:4] if tradeline.account_number else "",
+            account_number_first4=tradeline.account_number or "",
             date_opened=tradeline.date_opened or ""
         )
     
@@ -42,7 +74,7 @@ class TradelineDeduplicator:
         if value is None:
             return True
         if isinstance(value, str):
-            return value.strip() in ["", "NULL", "null", "N/A", "n/a", "xx/xx/xxxxx", "0"]
+            return value.strip() in EMPTY_PLACEHOLDERS
         if isinstance(value, (int, float)):
             return value == 0
         return False
@@ -53,13 +85,7 @@ class TradelineDeduplicator:
         """
         merged = existing.copy()
         
-        # Define fields that should be merged
-        mergeable_fields = [
-            'account_balance', 'credit_limit', 'monthly_payment', 
-            'account_type', 'account_status', 'date_opened'
-        ]
-        
-        for field in mergeable_fields:
+        for field in MERGEABLE_FIELDS:
             existing_value = getattr(existing, field)
             new_value = getattr(new_tradeline, field)
             
@@ -79,19 +105,16 @@ class TradelineDeduplicator:
     
     def find_existing_tradeline(self, tradeline_key: TradelineKey, credit_bureau: str, user_id: str) -> Optional[TradelineSchema]:
         """
-        Find existing tradeline in database with same key and credit bureau
+        Find existing tradeline with same key and credit bureau in the user's tradeline index
         """
         try:
-            existing = self.db_session.query(Tradelines).filter(
-                Tradelines.user_id == user_id,
-                Tradelines.creditor_name.ilike(f"%{tradeline_key.creditor_name}%"),
-                Tradelines.account_number.like(f"{tradeline_key.account_number_first4}%"),
-                Tradelines.date_opened == tradeline_key.date_opened,
-                Tradelines.credit_bureau == credit_bureau
-            ).first()
+            index = self.get_tradeline_indexes(user_id, [credit_bureau])[credit_bureau]
+            existing = index.find_key(tradeline_index_key(
+                tradeline_key.creditor_name, tradeline_key.account_number_first4, tradeline_key.date_opened
+            ))
             
             if existing:
-                return TradelineSchema.from_orm(existing)
+                return TradelineSchema(**existing)
             return None
             
         except Exception as e:
@@ -125,10 +148,54 @@ class TradelineDeduplicator:
             new_tradeline.user_id = user_id
             return True, new_tradeline, "NEW"
     
+    def get_tradeline_indexes(self, user_id: str, credit_bureaus: Iterable[str]) -> Dict[str, TradelineIndex]:
+        """
+        Indexes of the user's stored tradelines per bureau
+        
+        Indexes are served from the process-wide LRU cache; all bureaus missing from it
+        are loaded together in one query.
+        """
+        indexes = {}
+        missing = []
+        for credit_bureau in sorted(set(credit_bureaus)):
+            index = self.index_cache.get(user_id, credit_bureau)
+            if index is None:
+                missing.append(credit_bureau)
+            else:
+                indexes[credit_bureau] = index
+        if not missing:
+            return indexes
+        
+        query = text(
+            f"SELECT {', '.join(UPSERT_COLUMNS)} FROM tradelines "
+            "WHERE user_id = :user_id AND credit_bureau IN :credit_bureaus"
+        ).bindparams(bindparam('credit_bureaus', expanding=True))
+        rows = self.db_session.execute(query, {'user_id': user_id, 'credit_bureaus': missing})
+        
+        rows_by_bureau = {credit_bureau: [] for credit_bureau in missing}
+        for row in rows:
+            row = dict(row._mapping)
+            rows_by_bureau[row['credit_bureau']].append(row)
+        for credit_bureau, bureau_rows in rows_by_bureau.items():
+            indexes[credit_bureau] = self.index_cache.put(TradelineIndex(user_id, credit_bureau, bureau_rows))
+        return indexes
+    
+    def batch_key(self, tradeline: TradelineSchema) -> Tuple[str, ...]:
+        """Index key scoped to the tradeline's credit bureau"""
+        return (tradeline.credit_bureau,) + tradeline_index_key(
+            tradeline.creditor_name, tradeline.account_number, tradeline.date_opened
+        )
+    
     def process_tradeline_batch(self, tradelines: List[TradelineSchema], user_id: str) -> Dict[str, List[TradelineSchema]]:
         """
         Process a batch of tradelines with deduplication
         
+        Existing tradelines come from the user's cached tradeline indexes (missing ones
+        are loaded with one query for the whole batch) and are matched with dict
+        lookups; record_saved_tradelines keeps them in step with this service's writes.
+        Duplicates within the batch are merged with each other first, so every key
+        appears at most once in the result.
+        
         Returns:
             {
                 'to_save': [TradelineSchema],
@@ -143,19 +210,110 @@ class TradelineDeduplicator:
             'new': []
         }
         
+        # Validate minimum required data and collapse duplicates within the batch
+        incoming: Dict[Tuple[str, ...], TradelineSchema] = {}
         for tradeline in tradelines:
-            should_save, processed_tradeline, action = self.process_tradeline(tradeline, user_id)
-            
-            if should_save:
-                results['to_save'].append(processed_tradeline)
-                if action == "MERGED":
-                    results['merged'].append(processed_tradeline)
-                elif action == "NEW":
-                    results['new'].append(processed_tradeline)
-            else:
+            tradeline_key = self.create_tradeline_key(tradeline)
+            if not all([tradeline_key.creditor_name, tradeline_key.account_number_first4, tradeline.credit_bureau]):
                 results['invalid'].append(tradeline)
+                continue
+            key = self.batch_key(tradeline)
+            incoming[key] = self.merge_tradelines(incoming[key], tradeline) if key in incoming else tradeline
+        
+        indexes = self.get_tradeline_indexes(
+            user_id, (tradeline.credit_bureau for tradeline in incoming.values())
+        )
+        
+        for key, tradeline in incoming.items():
+            existing = indexes[tradeline.credit_bureau].find_key(key[1:])
+            if existing:
+                # Same credit bureau - merge data
+                processed_tradeline = self.merge_tradelines(TradelineSchema(**existing), tradeline)
+                results['merged'].append(processed_tradeline)
+            else:
+                processed_tradeline = tradeline
+                results['new'].append(processed_tradeline)
+            processed_tradeline.user_id = user_id  # Ensure user_id is set
+            results['to_save'].append(processed_tradeline)
         
         return results
+    
+    def _upsert_values(self, tradelines: List[TradelineSchema]) -> Tuple[str, Dict[str, Any]]:
+        """Build a multi-row VALUES clause and its bind parameters"""
+        rows = []
+        params = {}
+        for i, tradeline in enumerate(tradelines):
+            if not getattr(tradeline, 'id', None):
+                tradeline.id = uuid.uuid4()
+            data = tradeline.dict()
+            placeholders = []
+            for column in UPSERT_COLUMNS:
+                params[f"{column}_{i}"] = data.get(column)
+                placeholders.append(f":{column}_{i}")
+            rows.append(f"({', '.join(placeholders)})")
+        return ",\n".join(rows), params
+    
+    def has_detailed_key(self, tradeline: TradelineSchema) -> bool:
+        """Whether the tradeline is covered by unique_tradeline_per_bureau_detailed (see its predicate)"""
+        return all([tradeline.user_id, tradeline.creditor_name, tradeline.credit_bureau, tradeline.date_opened])
+    
+    def upsert_tradelines(self, results: Dict[str, List[TradelineSchema]]) -> List[Dict[str, Any]]:
+        """
+        Write a processed batch in at most three statements; returns the stored rows
+        
+        New tradelines go through one INSERT ... ON CONFLICT on the
+        unique_tradeline_per_bureau_detailed expression index; a row inserted
+        concurrently by another job is filled in with the same rules as
+        merge_tradelines. Merged tradelines already carry the merged values and are
+        upserted on the same index key, so they overwrite whichever row holds that key
+        now, even if it is not the row they were matched with. Merged tradelines
+        outside the index (no date_opened) cannot collide with it and are written by id.
+        
+        The returned rows come from RETURNING, so they carry the ids actually stored,
+        including those of existing rows that new tradelines were folded into.
+        """
+        column_list = ', '.join(UPSERT_COLUMNS)
+        saved_rows = []
+        
+        def execute(tradelines: List[TradelineSchema], conflict: str) -> None:
+            if not tradelines:
+                return
+            values, params = self._upsert_values(tradelines)
+            rows = self.db_session.execute(text(
+                f"INSERT INTO tradelines ({column_list}) VALUES {values} "
+                f"ON CONFLICT {conflict} RETURNING {column_list}"
+            ), params)
+            saved_rows.extend(dict(row._mapping) for row in rows)
+        
+        fill_empty = [
+            f"{column} = CASE WHEN tradelines.{column} IS NULL "
+            f"OR btrim(tradelines.{column}::text) IN ({', '.join(repr(p) for p in EMPTY_PLACEHOLDERS)}) "
+            f"THEN EXCLUDED.{column} ELSE tradelines.{column} END"
+            for column in MERGEABLE_FIELDS if column != 'date_opened'  # part of the conflict key
+        ]
+        fill_empty.append(
+            "account_number = CASE WHEN length(coalesce(EXCLUDED.account_number, '')) > "
+            "length(coalesce(tradelines.account_number, '')) "
+            "THEN EXCLUDED.account_number ELSE tradelines.account_number END"
+        )
+        fill_empty.append("dispute_count = GREATEST(tradelines.dispute_count, EXCLUDED.dispute_count)")
+        execute(results['new'], f"{DETAILED_KEY_CONFLICT_TARGET} DO UPDATE SET {', '.join(fill_empty)}")
+        
+        # The stored row keeps its id; every other column takes the merged value
+        overwrite = ', '.join(f"{column} = EXCLUDED.{column}" for column in UPSERT_COLUMNS if column != 'id')
+        execute([tradeline for tradeline in results['merged'] if self.has_detailed_key(tradeline)],
+                f"{DETAILED_KEY_CONFLICT_TARGET} DO UPDATE SET {overwrite}")
+        execute([tradeline for tradeline in results['merged'] if not self.has_detailed_key(tradeline)],
+                f"(id) DO UPDATE SET {overwrite}")
+        
+        return saved_rows
+    
+    def record_saved_tradelines(self, user_id: str, saved_rows: List[Dict[str, Any]]) -> None:
+        """Keep the user's cached indexes in step with a committed batch (rows from upsert_tradelines)"""
+        for row in saved_rows:
+            index = self.index_cache.get(user_id, row['credit_bureau'])
+            if index is not None:
+                index.add(row)
 
 # Usage example in your main processing function
 def process_tradelines_with_deduplication(extracted_tradelines: List[TradelineSchema], user_id: str, db_session: Session):
@@ -171,18 +329,17 @@ def process_tradelines_with_deduplication(extracted_tradelines: List[TradelineSc
     print(f"  - Invalid tradelines: {len(results['invalid'])}")
     print(f"  - Total to save: {len(results['to_save'])}")
     
-    # Save the processed tradelines to database
+    # Save the processed tradelines to database in bulk
     try:
-        for tradeline in results['to_save']:
-            # Convert to your database model and save
-            db_tradeline = Tradelines(**tradeline.dict())
-            db_session.merge(db_tradeline)  # Use merge instead of add for upsert behavior
-            
+        saved_rows = deduplicator.upsert_tradelines(results)
         db_session.commit()
-        print(f"Successfully saved {len(results['to_save'])} tradelines")
+        deduplicator.record_saved_tradelines(user_id, saved_rows)
+        print(f"Successfully saved {len(saved_rows)} tradelines")
         
     except Exception as e:
         db_session.rollback()
+        # A conflict means the cached indexes missed a row written elsewhere
+        deduplicator.index_cache.invalidate(user_id)
         print(f"Error saving tradelines: {e}")
         raise
     
@@ -0,0 +1,188 @@
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEXICON_PATH = Path(__file__).resolve().parent.parent / "data" / "creditor_lexicon.json"
+
+
+@dataclass
+class CreditorMention:
+    """A creditor name found in text"""
+    canonical_name: str
+    matched_text: str
+    start: int
+    end: int
+    priority: int
+
+
+class CreditorLexicon:
+    """
+    Aho-Corasick automaton over creditor names and aliases
+
+    Matching is case-insensitive, ignores spaces and tabs inside names (so "CAPITAL ONE",
+    "CAPITAL  ONE" and "CAPITALONE" all match) but never continues a name across a line
+    break, and requires word boundaries at both ends of a mention. Names listed under an
+    entry's "prefixes" only need a boundary at the start, so they also match as the
+    start of a longer word (CITI in CITICARDS). A scan is linear in the text length
+    regardless of lexicon size.
+    """
+
+    def __init__(self, entries: List[Dict[str, List[str]]]):
+        self.canonical_names: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int, bool]]] = [[]]
+
+        for entry in entries:
+            priority = len(self.canonical_names)
+            self.canonical_names.append(entry['canonical'])
+            prefixes = set(entry.get('prefixes', []))
+            for alias in set(entry.get('aliases', [])) | {entry['canonical']} | prefixes:
+                self._add_alias(alias, priority, alias in prefixes)
+
+        self._build_failure_links()
+        logger.info(f"Loaded creditor lexicon with {len(self.canonical_names)} creditors, "
+                    f"{len(self._goto)} automaton states")
+
+    @classmethod
+    def from_file(cls, path: Path) -> 'CreditorLexicon':
+        """Load a lexicon from a JSON file of canonical names and aliases"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data.get('creditors', []))
+
+    @staticmethod
+    def _normalize_char(char: str) -> str:
+        return char.lower()
+
+    def _add_alias(self, alias: str, priority: int, is_prefix: bool = False) -> None:
+        state = 0
+        length = 0
+        for char in alias:
+            if char.isspace():
+                continue
+            key = self._normalize_char(char)
+            next_state = self._goto[state].get(key)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][key] = next_state
+            state = next_state
+            length += 1
+        if length:
+            self._out[state].append((priority, length, is_prefix))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for key, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and key not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(key, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    @staticmethod
+    def _is_boundary(text: str, index: int) -> bool:
+        return index < 0 or index >= len(text) or not text[index].isalnum()
+
+    def find_mentions(self, text: str) -> List[CreditorMention]:
+        """Find every creditor mention in text, ordered by position"""
+        mentions = []
+        positions: List[int] = []
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+
+        for index, char in enumerate(text):
+            if char in '\r\n':
+                state = 0  # Names do not run across lines
+                continue
+            if char.isspace():
+                continue
+            key = self._normalize_char(char)
+            positions.append(index)
+            while state and key not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(key, 0)
+
+            for priority, length, is_prefix in out[state]:
+                start = positions[-length]
+                end = index + 1
+                if self._is_boundary(text, start - 1) and (is_prefix or self._is_boundary(text, end)):
+                    mentions.append(CreditorMention(
+                        canonical_name=self.canonical_names[priority],
+                        matched_text=' '.join(text[start:end].split()),
+                        start=start,
+                        end=end,
+                        priority=priority
+                    ))
+
+        mentions.sort(key=lambda m: (m.start, -(m.end - m.start), m.priority))
+        return mentions
+
+    def best_match(self, text: str) -> Optional[CreditorMention]:
+        """
+        Return the mention of the highest-priority creditor
+
+        Priority follows lexicon order, so specific creditors listed before generic
+        terms (e.g. "MORTGAGE") win. Within one creditor the leftmost, longest alias wins.
+        """
+        best = None
+        for mention in self.find_mentions(text):
+            if best is None or mention.priority < best.priority:
+                best = mention
+        return best
+
+    def starts_with_mention(self, text: str, start: int) -> bool:
+        """Whether a creditor name begins exactly at text[start] (walks the automaton from the root only)"""
+        if not self._is_boundary(text, start - 1):
+            return False
+        state = 0
+        consumed = 0
+        for index in range(start, len(text)):
+            char = text[index]
+            if char in '\r\n':
+                return False
+            if char.isspace():
+                continue
+            state = self._goto[state].get(self._normalize_char(char))
+            if state is None:
+                return False
+            consumed += 1
+            for _, length, is_prefix in self._out[state]:
+                if length == consumed and (is_prefix or self._is_boundary(text, index + 1)):
+                    return True
+        return False
+
+    def split_at_line_mentions(self, text: str) -> List[str]:
+        """Split text before every line that starts with a creditor mention"""
+        pieces = []
+        previous = 0
+        newline = text.find('\n')
+        while newline != -1:
+            line_start = newline + 1
+            while line_start < len(text) and text[line_start].isspace():
+                line_start += 1
+            if self.starts_with_mention(text, line_start):
+                pieces.append(text[previous:newline])
+                previous = line_start
+            newline = text.find('\n', line_start)
+        pieces.append(text[previous:])
+        return pieces
+
+
+@lru_cache(maxsize=None)
+def load_creditor_lexicon(path: Optional[str] = None) -> CreditorLexicon:
+    """Load and cache a creditor lexicon (once per process per path)"""
+    return CreditorLexicon.from_file(Path(path) if path else DEFAULT_LEXICON_PATH)
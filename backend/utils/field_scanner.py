@@ -0,0 +1,155 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLAGS = re.IGNORECASE | re.MULTILINE
+LITERAL_RUN = re.compile(r'[a-zA-Z ]+')
+QUANTIFIERS = ('?', '*', '+', '{')
+
+
+def _split_alternatives(pattern: str) -> List[str]:
+    """Split a regex at its top-level '|' (outside groups, classes and escapes)"""
+    alternatives, depth, in_class, start, i = [], 0, False, 0, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 1
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            alternatives.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    alternatives.append(pattern[start:])
+    return alternatives
+
+
+def _required_words(alternative: str) -> Tuple[str, ...]:
+    """Lowercase literal runs outside groups, classes and escapes that every match contains"""
+    words, depth, in_class, i = [], 0, False, 0
+    while i < len(alternative):
+        char = alternative[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and LITERAL_RUN.match(char):
+            run = LITERAL_RUN.match(alternative, i).group()
+            i += len(run)
+            if alternative[i:i + 1] in QUANTIFIERS and alternative[i:i + 1] != '+':
+                run = run[:-1]  # the last character is optional
+            if run.strip():
+                words.append(run.strip().lower())
+            continue
+        i += 1
+    return tuple(words)
+
+
+def required_literals(pattern: str) -> Optional[Tuple[Tuple[str, ...], ...]]:
+    """
+    Keywords a section must contain for pattern to match, or None if there are none
+
+    Returns one tuple of words per top-level alternative; a match needs every word of
+    at least one of them. A single group around the whole pattern is looked into, e.g.
+    'account\\s*opened...' -> (('account', 'opened'),) and '(past due|late)' ->
+    (('past due',), ('late',)).
+    """
+    body = pattern
+    if body.startswith('(') and not body.startswith('(?') and body.endswith(')') and '(' not in body[1:-1]:
+        body = body[1:-1]  # One group around the whole pattern, e.g. not '(\\d+)\\s*(late)'
+    alternatives = tuple(_required_words(alternative) for alternative in _split_alternatives(body))
+    if not all(alternatives):
+        return None
+    return alternatives
+
+
+@lru_cache(maxsize=None)
+def compile_patterns(patterns: Tuple[str, ...], flags: int = DEFAULT_FLAGS) -> Tuple[Pattern, ...]:
+    """Compile a tuple of regex strings once per process"""
+    return tuple(re.compile(pattern, flags) for pattern in patterns)
+
+
+class FieldScanner:
+    """
+    Precompiled scanner that extracts tradeline field values from a text section
+
+    Most patterns need keywords ('balance', 'date' + 'opened', ...) that are absent
+    from most sections. Each section is lowercased once and a pattern is only searched
+    when its keywords occur, which skips the bulk of the case-insensitive scans. Non-ASCII sections are searched without the prefilter,
+    since Unicode case folding can match characters that lower() does not map.
+    """
+
+    def __init__(self, field_patterns: Dict[str, List[str]], flags: int = DEFAULT_FLAGS):
+        self.field_patterns = field_patterns
+        self.flags = flags
+        self.compiled_patterns: Dict[str, Tuple[Pattern, ...]] = {
+            field_name: compile_patterns(tuple(patterns), flags)
+            for field_name, patterns in field_patterns.items()
+        }
+        self.pattern_literals: Dict[str, Tuple[Optional[Tuple[Tuple[str, ...], ...]], ...]] = {
+            field_name: tuple(required_literals(pattern) if flags & re.IGNORECASE else None
+                              for pattern in patterns)
+            for field_name, patterns in field_patterns.items()
+        }
+
+    @staticmethod
+    def match_value(match: 're.Match') -> str:
+        """Return the captured value of a match (first group, or the whole match)"""
+        if match.groups():
+            return (match.group(1) or '').strip()
+        return match.group(0).strip()
+
+    def extract_field(self, section: str, field_name: str,
+                      post_process: Optional[Callable[[str, str], Optional[str]]] = None,
+                      lowered: Optional[str] = None) -> Optional[str]:
+        """
+        Extract one field using first-match-per-pattern semantics
+
+        Patterns are tried in priority order; the leftmost match of each pattern is
+        post-processed and the first non-empty value wins. lowered is section.lower()
+        for an ASCII section, enabling the keyword prefilter.
+        """
+        compiled_patterns = self.compiled_patterns.get(field_name, ())
+        for compiled, literals in zip(compiled_patterns, self.pattern_literals.get(field_name, ())):
+            if lowered is not None and literals and \
+                    not any(all(word in lowered for word in words) for words in literals):
+                continue
+            match = compiled.search(section)
+            if not match:
+                continue
+            value = self.match_value(match)
+            if post_process:
+                value = post_process(value, field_name)
+            if value:
+                return value
+        return None
+
+    def scan(self, section: str,
+             post_process: Optional[Callable[[str, str], Optional[str]]] = None,
+             skip_fields: Tuple[str, ...] = ()) -> Dict[str, str]:
+        """Extract every configured field from a section in a single call"""
+        values = {}
+        lowered = section.lower() if section.isascii() else None
+        for field_name in self.compiled_patterns:
+            if field_name in skip_fields:
+                continue
+            value = self.extract_field(section, field_name, post_process, lowered)
+            if value:
+                values[field_name] = value
+        return values
@@ -0,0 +1,193 @@
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STRUCTURAL_CHARS = re.compile(r'[\\"{}\[\],]')
+SCALAR = r'(?:-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null)'
+SCALAR_VALUE = re.compile(SCALAR)
+KEY_SEPARATOR = re.compile(r':\s*(' + SCALAR + r')?')
+
+
+class _NotJSON(Exception):
+    """The bracket being tracked starts prose, not the JSON payload"""
+
+
+class IncrementalJSONParser:
+    """
+    Incremental tokenizer that emits array items of a streamed JSON response
+
+    Text is fed in arbitrary pieces as it arrives from the model. Every object that is a
+    direct element of the array under item_key (e.g. {"tradelines": [{...}, {...}]}), or
+    of a top-level array, is decoded and returned from feed() as soon as its closing
+    brace arrives. Markdown fences and prose around the JSON are skipped: until the
+    first item starts, the text between structural characters is checked against
+    the JSON grammar, and a bracket that turns out to start prose (e.g. "[2 items]" or
+    "{curly}") is abandoned and scanning resumes at the next bracket. Only that
+    unconfirmed prefix and the bytes of the current item are buffered, so memory stays
+    flat for long responses.
+    """
+
+    def __init__(self, item_key: str = "tradelines"):
+        self.item_key = item_key
+        self.decoder = json.JSONDecoder()
+        self.items_emitted = 0
+        self.finished = False  # A complete JSON value has been read
+        self._confirmed = False  # An item has started, so the tracked value is the payload
+        self._done = False  # The payload with the items has closed; ignore the rest
+        self._reset_scan()
+
+    def _reset_scan(self) -> None:
+        self._stack: List[str] = []  # '{' / '[' for each open container
+        self._in_string = False
+        self._escape = False
+        self._string_chars: List[str] = []
+        self._last_key: Optional[str] = None
+        self._key_stack: List[Optional[str]] = []  # key each open container was stored under
+        self._item_chars: List[str] = []
+        self._item_depth: Optional[int] = None
+        self._pending = ''  # Text from the tracked bracket on, until the payload is confirmed
+        self._prev: Optional[str] = None  # Last token: '{', '[', ',', 'key', 'value' or 'close'
+        self._gap_chars = ''
+
+    def _in_item_array(self) -> bool:
+        """Whether the innermost open container is the array whose items we emit"""
+        if not self._stack or self._stack[-1] != '[':
+            return False
+        return len(self._stack) == 1 or (len(self._stack) == 2 and self._key_stack[-1] == self.item_key)
+
+    def _check_gap(self, gap: str, next_char: str) -> None:
+        """Raise _NotJSON unless gap (the text before next_char) is valid JSON at this point"""
+        gap = gap.strip()
+        container, prev = self._stack[-1], self._prev
+        if container == '{' and prev == 'key':
+            match = KEY_SEPARATOR.fullmatch(gap)
+            valid = match is not None and next_char in (',}' if match.group(1) else '"{[')
+        elif prev in ('{', '[', ','):
+            if not gap:
+                valid = next_char in ('"}' if container == '{' else '"{[]')
+            else:
+                valid = container == '[' and SCALAR_VALUE.fullmatch(gap) is not None and next_char in ',]'
+        else:
+            valid = not gap and next_char in (',' + ('}' if container == '{' else ']'))
+        if not valid:
+            raise _NotJSON()
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume the next piece of the response; returns items completed by it"""
+        while True:
+            if not self._confirmed:
+                self._pending += text
+            try:
+                return self._scan(text)
+            except _NotJSON:
+                # Resume right after the abandoned bracket
+                text = self._pending[1:]
+                self._reset_scan()
+
+    def _scan(self, text: str) -> List[Dict[str, Any]]:
+        items = []
+        validating = not self._confirmed
+        item_start = 0 if self._item_depth is not None else None
+        string_start = 0 if self._in_string else None
+        gap_start = 0
+        skip_to = 0
+        if self._escape and text:
+            # The previous piece ended on a backslash inside a string
+            skip_to = 1
+            self._escape = False
+        
+        # Jump between structural characters instead of stepping through every character
+        for match in STRUCTURAL_CHARS.finditer(text):
+            position = match.start()
+            if self._done or position < skip_to:
+                continue
+            char = match.group()
+            
+            if self._in_string:
+                if char == '\\':
+                    skip_to = position + 2  # the escaped character, whatever it is
+                    self._escape = position + 1 >= len(text)
+                elif char == '"':
+                    self._in_string = False
+                    if self._item_depth is None:
+                        self._string_chars.append(text[string_start:position])
+                        self._last_key = ''.join(self._string_chars)
+                    string_start = None
+                    self._prev = 'key' if self._stack[-1] == '{' and self._prev in ('{', ',') else 'value'
+                    gap_start = position + 1
+                continue
+            
+            if not self._stack:
+                if char not in '{[':
+                    continue  # Prose before the payload
+                if validating:
+                    self._pending = self._pending[len(self._pending) - len(text) + position:]
+            elif validating:
+                self._check_gap(self._gap_chars + text[gap_start:position], char)
+                self._gap_chars = ''
+            gap_start = position + 1
+            
+            if char == '"':
+                self._in_string = True
+                self._string_chars = []
+                string_start = position + 1
+            elif char in '{[':
+                if char == '{' and self._item_depth is None and self._in_item_array():
+                    self._item_depth = len(self._stack) + 1
+                    self._item_chars = []
+                    item_start = position
+                    self._confirmed = True
+                    validating = False
+                    self._pending = ''
+                self._key_stack.append(self._last_key if self._stack and self._stack[-1] == '{' else None)
+                self._stack.append(char)
+                self._last_key = None
+                self._prev = char
+            elif char in '}]':
+                self._stack.pop()
+                self._key_stack.pop()
+                self._prev = 'close'
+                if self._item_depth is not None and len(self._stack) == self._item_depth - 1:
+                    self._item_chars.append(text[item_start:position + 1])
+                    item = self._decode_item(''.join(self._item_chars))
+                    if item is not None:
+                        items.append(item)
+                    self._item_depth = None
+                    self._item_chars = []
+                    item_start = None
+                if not self._stack:
+                    self.finished = True
+                    # A value without items may be prose such as "[1]"; keep looking
+                    self._done = self._confirmed
+            elif char == ',':
+                self._prev = ','
+                if self._stack[-1] == '{':
+                    self._last_key = None
+        
+        # Carry partial item, key and gap text into the next piece
+        if self._item_depth is not None and item_start is not None:
+            self._item_chars.append(text[item_start:])
+        if self._in_string and self._item_depth is None and string_start is not None:
+            self._string_chars.append(text[string_start:])
+        if validating and self._stack and not self._in_string:
+            self._gap_chars += text[gap_start:]
+        if not self._stack and not self._confirmed:
+            self._pending = ''
+        return items
+    
+    def _decode_item(self, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = self.decoder.decode(text)
+        except ValueError as e:
+            logger.warning(f"Skipping malformed streamed item: {str(e)}")
+            return None
+        self.items_emitted += 1
+        return item if isinstance(item, dict) else None
+
+
+def parse_streamed_items(text: str, item_key: str = "tradelines") -> List[Dict[str, Any]]:
+    """Parse a complete response with the same rules as IncrementalJSONParser"""
+    return IncrementalJSONParser(item_key).feed(text)
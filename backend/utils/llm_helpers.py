@@ -1,39 +1,131 @@
+import os
 import re
 import json
+import threading
 import tiktoken # type: ignore
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, date
 from decimal import Decimal
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Process-wide tiktoken encoders by model name; None marks models tiktoken can't serve
+_encoder_registry: Dict[str, Any] = {}
+_encoder_registry_lock = threading.Lock()
+
+
+def get_encoder(model_name: str) -> Optional[Any]:
+    """Load (once per process) the tiktoken encoding for a model, or None if unavailable"""
+    if model_name in _encoder_registry:
+        return _encoder_registry[model_name]
+    with _encoder_registry_lock:
+        if model_name not in _encoder_registry:
+            try:
+                _encoder_registry[model_name] = tiktoken.encoding_for_model(model_name)
+                logger.info(f"Loaded tiktoken encoding for {model_name}")
+            except KeyError:
+                logger.info(f"No tiktoken encoding for {model_name}, using estimated token counts")
+                _encoder_registry[model_name] = None
+            except Exception as e:
+                logger.warning(f"Could not load tiktoken encoding for {model_name}, using estimated token counts: {e}")
+                _encoder_registry[model_name] = None
+        return _encoder_registry[model_name]
+
+
+class TokenEstimator:
+    """
+    Fast token estimate for models without a local tokenizer
+
+    Counts words, numbers and punctuation (credit reports are dense with short numeric
+    tokens that a flat chars/4 rule undercounts) and scales the result by a factor that
+    is calibrated against the prompt token counts the provider reports.
+    """
+
+    PIECE_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+    def __init__(self, chars_per_token: float = 4.0, scale: float = 1.0, smoothing: float = 0.2):
+        self.chars_per_token = chars_per_token
+        self.scale = scale
+        self.smoothing = smoothing
+
+    def raw_estimate(self, text: str) -> float:
+        tokens = 0.0
+        for piece in self.PIECE_PATTERN.findall(text):
+            tokens += max(1.0, len(piece) / self.chars_per_token) if piece[0].isalpha() else -(-len(piece) // 3)
+        return tokens
+
+    def estimate(self, text: str) -> int:
+        return int(self.raw_estimate(text) * self.scale + 0.5)
+
+    def calibrate(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Move the scale toward the observed actual/estimated ratio"""
+        if estimated_tokens <= 0 or actual_tokens <= 0:
+            return
+        ratio = actual_tokens / (estimated_tokens / self.scale)
+        self.scale += self.smoothing * (ratio - self.scale)
+
+
+_estimator_registry: Dict[str, TokenEstimator] = {}
+
+# Fixed estimate scale for batch packing (see TokenCounter.count_packing_tokens); errs high
+PACKING_SCALE = float(os.getenv("TOKEN_PACKING_SCALE", "1.25"))
+
+
+def get_estimator(model_name: str) -> TokenEstimator:
+    """Process-wide estimator per model, so calibration is shared across instances"""
+    return _estimator_registry.setdefault(model_name, TokenEstimator())
+
+
 class TokenCounter:
     """Token counting and management for LLM requests"""
     
     def __init__(self, model_name: str = "gemini-2.5-flash"):
         self.model_name = model_name
-        self.encoding = tiktoken.encoding_for_model(model_name)
+        self.estimator = get_estimator(model_name)
         self.total_tokens = 0
         self.session_tokens = {
             "prompt_tokens": 0,
             "completion_tokens": 0
         }
     
+    @property
+    def encoding(self) -> Optional[Any]:
+        """tiktoken encoding for the model, loaded lazily on first use"""
+        return get_encoder(self.model_name)
+    
     def count_tokens(self, text: str) -> int:
         """Count tokens in text"""
+        encoding = self.encoding
+        if encoding is None:
+            return self.estimator.estimate(text)
         try:
-            return len(self.encoding.encode(text))
+            return len(encoding.encode(text))
         except Exception as e:
             logger.warning(f"Error counting tokens: {e}")
-            # Fallback estimation: ~4 characters per token
-            return len(text) // 4
+            return self.estimator.estimate(text)
     
-    def add_tokens(self, prompt_tokens: int, completion_tokens: int):
-        """Add token usage to session tracking"""
+    def count_packing_tokens(self, text: str) -> int:
+        """
+        Count tokens for deciding where batches split
+        
+        Exact with an encoder. Otherwise the uncalibrated estimate times PACKING_SCALE is
+        used, so the same document always packs into the same prompts and keeps hitting
+        the LLM response cache as calibration drifts. The cost is a fixed margin: when the
+        model's real ratio exceeds PACKING_SCALE, fit_prompt may still have to truncate.
+        """
+        if self.encoding is None:
+            return int(self.estimator.raw_estimate(text) * PACKING_SCALE + 0.5)
+        return self.count_tokens(text)
+    
+    def add_tokens(self, prompt_tokens: int, completion_tokens: int,
+                   estimated_prompt_tokens: Optional[int] = None):
+        """Add token usage to session tracking, calibrating estimates against actual usage"""
         self.session_tokens["prompt_tokens"] += prompt_tokens
         self.session_tokens["completion_tokens"] += completion_tokens
         self.total_tokens += prompt_tokens + completion_tokens
+        if estimated_prompt_tokens and self.encoding is None:
+            self.estimator.calibrate(estimated_prompt_tokens, prompt_tokens)
     
     def get_total_tokens(self) -> int:
         """Get total tokens used in session"""
@@ -46,23 +138,89 @@ class TokenCounter:
             "total_tokens": self.total_tokens
         }
     
-    def truncate_prompt(self, prompt: str, max_tokens: int) -> str:
-        """Truncate prompt to fit within token limit"""
-        tokens = self.encoding.encode(prompt)
-        if len(tokens) <= max_tokens:
-            return prompt
+    def fit_prompt(self, prompt: str, max_tokens: int) -> Tuple[str, int]:
+        """
+        Truncate prompt to fit within token limit, encoding it only once
         
-        # Truncate from the middle to preserve structure
-        start_tokens = tokens[:max_tokens//3]
-        end_tokens = tokens[-(max_tokens//3):]
+        Returns:
+            (prompt, token_count) where token_count is for the returned prompt
+        """
+        encoding = self.encoding
+        if encoding is None:
+            token_count = self.estimator.estimate(prompt)
+            if token_count <= max_tokens:
+                return prompt, token_count
+            # Keep the first and last third by characters, in proportion to the estimate
+            keep_chars = int(len(prompt) * (max_tokens // 3) / token_count)
+            truncated_text = prompt[:keep_chars] + prompt[-keep_chars:] if keep_chars else ""
+        else:
+            tokens = encoding.encode(prompt)
+            if len(tokens) <= max_tokens:
+                return prompt, len(tokens)
+            
+            # Truncate from the middle to preserve structure
+            start_tokens = tokens[:max_tokens//3]
+            end_tokens = tokens[-(max_tokens//3):]
+            
+            truncated_tokens = start_tokens + end_tokens
+            truncated_text = encoding.decode(truncated_tokens)
         
-        truncated_tokens = start_tokens + end_tokens
-        truncated_text = self.encoding.decode(truncated_tokens)
+        logger.warning(f"Prompt truncated to {max_tokens} tokens; callers sending report text "
+                       f"should pack whole sections with pack_sections instead")
         
         # Add truncation indicator
         truncated_text += "\n\n[... CONTENT TRUNCATED FOR LENGTH ...]\n\n"
         
-        return truncated_text
+        return truncated_text, self.count_tokens(truncated_text)
+    
+    def truncate_prompt(self, prompt: str, max_tokens: int) -> str:
+        """Truncate prompt to fit within token limit"""
+        return self.fit_prompt(prompt, max_tokens)[0]
+    
+    def split_to_budget(self, text: str, budget: int) -> List[str]:
+        """Split text on line boundaries into pieces of at most budget tokens (see count_packing_tokens)"""
+        if self.count_packing_tokens(text) <= budget:
+            return [text]
+        pieces, lines, lines_tokens = [], [], 0
+        for line in text.split('\n'):
+            line_tokens = self.count_packing_tokens(line) + 1
+            if lines and lines_tokens + line_tokens > budget:
+                pieces.append('\n'.join(lines))
+                lines, lines_tokens = [], 0
+            lines.append(line)
+            lines_tokens += line_tokens
+        if lines:
+            pieces.append('\n'.join(lines))
+        return pieces
+    
+    def pack_sections(self, sections: List[Tuple[int, str]], budget: int,
+                      max_sections_per_pack: Optional[int] = None) -> List[List[Tuple[int, str]]]:
+        """
+        Pack (index, text) sections in order into groups of at most budget tokens
+        
+        Whole sections are never cut to make room; a section that doesn't fit starts the
+        next group. Only a section larger than the entire budget is split, on line
+        boundaries, into pieces that keep its index. Every token of input ends up in
+        exactly one group, so callers spill extra groups into extra requests. Sizes come
+        from count_packing_tokens, so packing does not shift with calibration.
+        """
+        packs = []
+        pack, pack_tokens = [], 0
+        for index, section in sections:
+            for piece in self.split_to_budget(section, budget):
+                piece_tokens = self.count_packing_tokens(piece)
+                pack_full = max_sections_per_pack and len(pack) >= max_sections_per_pack
+                if pack and (pack_full or pack_tokens + piece_tokens > budget):
+                    packs.append(pack)
+                    pack, pack_tokens = [], 0
+                pack.append((index, piece))
+                pack_tokens += piece_tokens
+        if pack:
+            packs.append(pack)
+        return packs
+
+_json_decoder = json.JSONDecoder()
+
 
 class ResponseValidator:
     """Validate and clean LLM responses"""
@@ -102,22 +260,12 @@ class ResponseValidator:
             start_idx = response.find('[')
         
         if start_idx >= 0:
-            # Find matching closing bracket
-            bracket_count = 0
-            end_idx = start_idx
-            start_char = response[start_idx]
-            end_char = '}' if start_char == '{' else ']'
-            
-            for i in range(start_idx, len(response)):
-                if response[i] == start_char:
-                    bracket_count += 1
-                elif response[i] == end_char:
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        end_idx = i + 1
-                        break
-            
-            response = response[start_idx:end_idx]
+            # Let the C decoder find the end of the value instead of counting brackets
+            try:
+                _, end_idx = _json_decoder.raw_decode(response, start_idx)
+                response = response[start_idx:end_idx]
+            except json.JSONDecodeError:
+                response = response[start_idx:]
         
         return response
     
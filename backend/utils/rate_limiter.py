@@ -0,0 +1,99 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at capacity per period_seconds"""
+
+    def __init__(self, capacity: float, period_seconds: float = 60.0):
+        self.capacity = capacity
+        self.refill_rate = capacity / period_seconds
+        self.available = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        deficit = min(amount, self.capacity) - self.available
+        return max(0.0, deficit / self.refill_rate)
+
+
+class LLMRateLimiter:
+    """
+    Process-wide limiter on LLM requests per minute and tokens per minute
+
+    Callers reserve one request and an estimated token count before calling the
+    provider, then settle with the actual usage so unused tokens are returned to the
+    bucket. Buckets are guarded by a thread lock, so one limiter can be shared by every
+    event loop and thread in the process.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'throttled': 0, 'wait_seconds': 0.0}
+
+    async def acquire(self, estimated_tokens: int) -> int:
+        """
+        Wait until a request with estimated_tokens fits both budgets, then reserve it
+
+        Returns:
+            Number of tokens reserved (capped at the per-minute budget)
+        """
+        reserved = min(estimated_tokens, self.tokens.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(reserved))
+                if wait <= 0:
+                    self.requests.available -= 1
+                    self.tokens.available -= reserved
+                    self.stats['requests'] += 1
+                    if waited:
+                        self.stats['throttled'] += 1
+                        self.stats['wait_seconds'] += waited
+                    return reserved
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def settle(self, reserved_tokens: int, actual_tokens: int) -> None:
+        """Adjust the token bucket once the provider reports actual usage"""
+        with self._lock:
+            self.tokens.refill(time.monotonic())
+            self.tokens.available = min(self.tokens.capacity,
+                                        self.tokens.available + reserved_tokens - actual_tokens)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get request/throttle counters"""
+        return self.stats.copy()
+
+
+_llm_rate_limiter: Optional[LLMRateLimiter] = None
+_llm_rate_limiter_lock = threading.Lock()
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    """Return the process-wide LLM limiter (LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)"""
+    global _llm_rate_limiter
+    with _llm_rate_limiter_lock:
+        if _llm_rate_limiter is None:
+            _llm_rate_limiter = LLMRateLimiter(
+                requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")),
+                tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+            )
+            logger.info(f"LLM rate limiter: {_llm_rate_limiter.requests.capacity:.0f} requests/min, "
+                        f"{_llm_rate_limiter.tokens.capacity:.0f} tokens/min")
+        return _llm_rate_limiter
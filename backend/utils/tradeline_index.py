@@ -0,0 +1,158 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+IndexKey = Tuple[str, str, str]
+
+# Whitespace as matched by '\s' in PostgreSQL regular expressions
+WHITESPACE_RUN = re.compile(r'\s+', re.ASCII)
+
+
+def tradeline_index_key(creditor_name: Optional[str], account_number: Optional[str],
+                        date_opened: Optional[str]) -> IndexKey:
+    """
+    Duplicate-detection key: (normalized creditor, account first 4, date opened)
+
+    Mirrors the expressions of the unique_tradeline_per_bureau_detailed index:
+    normalize_creditor_name() (upper-cased, whitespace collapsed),
+    upper(get_account_first_4()) so masks such as "xxxx" and "XXXX" match, and
+    btrim(date_opened).
+    """
+    creditor = WHITESPACE_RUN.sub(' ', creditor_name or '').strip(' ').upper()
+    first_4 = re.sub(r'[^A-Za-z0-9]', '', account_number or '')[:4].upper()
+    return creditor, first_4, str(date_opened or '').strip(' ')
+
+
+class TradelineIndex:
+    """Stored tradelines of one user and bureau, keyed for O(1) duplicate lookups"""
+
+    def __init__(self, user_id: str, credit_bureau: str, rows: Iterable[Dict[str, Any]] = ()):
+        self.user_id = user_id
+        self.credit_bureau = credit_bureau
+        self.loaded_at = time.time()
+        self._rows: Dict[IndexKey, Dict[str, Any]] = {}
+        self._keys_by_id: Dict[str, IndexKey] = {}
+        for row in rows:
+            key = self.key_for(row)
+            if key not in self._rows:
+                self._rows[key] = row
+                self._keys_by_id[str(row.get('id'))] = key
+
+    @staticmethod
+    def key_for(tradeline: Dict[str, Any]) -> IndexKey:
+        return tradeline_index_key(
+            tradeline.get('creditor_name'), tradeline.get('account_number'), tradeline.get('date_opened')
+        )
+
+    def find(self, tradeline: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Stored row with the same key, if any"""
+        return self._rows.get(self.key_for(tradeline))
+
+    def find_key(self, key: IndexKey) -> Optional[Dict[str, Any]]:
+        """Stored row for a precomputed tradeline_index_key"""
+        return self._rows.get(key)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Record a row that was just written; an entry with the same id is replaced"""
+        previous_key = self._keys_by_id.pop(str(row.get('id')), None)
+        if previous_key is not None:
+            self._rows.pop(previous_key, None)
+        key = self.key_for(row)
+        self._rows[key] = row
+        self._keys_by_id[str(row.get('id'))] = key
+
+    def remove(self, row_id: Any) -> None:
+        """Forget a row that no longer exists in the database"""
+        key = self._keys_by_id.pop(str(row_id), None)
+        if key is not None:
+            self._rows.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+class TradelineIndexCache:
+    """
+    LRU cache of per-user, per-bureau tradeline indexes
+
+    An index is loaded with one query the first time a job needs it and stays warm
+    for that user's later uploads. Writers update it in place after saving, so it
+    only goes stale through changes made outside this process; ttl_seconds bounds
+    that staleness. The least recently used indexes are evicted beyond max_indexes.
+    """
+
+    def __init__(self, max_indexes: int = 256, ttl_seconds: float = 900):
+        self.max_indexes = max_indexes
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._indexes: "OrderedDict[Tuple[str, str], TradelineIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, credit_bureau: str) -> Optional[TradelineIndex]:
+        """Return a fresh cached index, or None"""
+        cache_key = (str(user_id), credit_bureau)
+        with self._lock:
+            index = self._indexes.get(cache_key)
+            if index is not None and time.time() - index.loaded_at > self.ttl_seconds:
+                del self._indexes[cache_key]
+                index = None
+            if index is None:
+                self.stats['misses'] += 1
+                return None
+            self._indexes.move_to_end(cache_key)
+            self.stats['hits'] += 1
+            return index
+
+    def put(self, index: TradelineIndex) -> TradelineIndex:
+        """Cache an index, evicting the least recently used ones over the limit"""
+        with self._lock:
+            self._indexes[(str(index.user_id), index.credit_bureau)] = index
+            self._indexes.move_to_end((str(index.user_id), index.credit_bureau))
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+                self.stats['evictions'] += 1
+        return index
+
+    def get_or_load(self, user_id: str, credit_bureau: str,
+                    loader: Callable[[], List[Dict[str, Any]]]) -> TradelineIndex:
+        """Return the cached index, building it from loader() on a miss"""
+        index = self.get(user_id, credit_bureau)
+        if index is None:
+            index = self.put(TradelineIndex(user_id, credit_bureau, loader()))
+            logger.debug(f"Loaded tradeline index for user {user_id} ({credit_bureau}): {len(index)} rows")
+        return index
+
+    def invalidate(self, user_id: str, credit_bureau: Optional[str] = None) -> None:
+        """Drop a user's indexes (all bureaus unless one is given)"""
+        with self._lock:
+            for cache_key in list(self._indexes):
+                if cache_key[0] == str(user_id) and credit_bureau in (None, cache_key[1]):
+                    del self._indexes[cache_key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get hit/miss/eviction counters and the number of cached indexes"""
+        with self._lock:
+            return {**self.stats, 'indexes': len(self._indexes)}
+
+
+_tradeline_index_cache: Optional[TradelineIndexCache] = None
+_tradeline_index_cache_lock = threading.Lock()
+
+
+def get_tradeline_index_cache() -> TradelineIndexCache:
+    """Return the process-wide tradeline index cache configured from the environment"""
+    global _tradeline_index_cache
+    if _tradeline_index_cache is None:
+        with _tradeline_index_cache_lock:
+            if _tradeline_index_cache is None:
+                _tradeline_index_cache = TradelineIndexCache(
+                    max_indexes=int(os.getenv("TRADELINE_INDEX_MAX_ENTRIES", "256")),
+                    ttl_seconds=float(os.getenv("TRADELINE_INDEX_TTL_SECONDS", "900"))
+                )
+    return _tradeline_index_cache
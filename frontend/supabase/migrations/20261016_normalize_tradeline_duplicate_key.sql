@@ -0,0 +1,55 @@
+-- Normalize the tradeline duplicate key
+-- Date: 2026-10-16
+-- Purpose: Make unique_tradeline_per_bureau_detailed match the backend's duplicate detection
+-- (backend/utils/tradeline_index.py), which ignores case and extra whitespace in creditor
+-- names and case in account prefixes. With the old case-sensitive key, rows the backend
+-- treats as one tradeline could be stored twice.
+
+-- Upper-case a creditor name and collapse its whitespace
+CREATE OR REPLACE FUNCTION normalize_creditor_name(creditor_name TEXT)
+RETURNS TEXT AS $$
+BEGIN
+  RETURN UPPER(BTRIM(REGEXP_REPLACE(COALESCE(creditor_name, ''), '\s+', ' ', 'g')));
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Remove rows that duplicate an older row under the normalized key; the backend merges
+-- new data into the oldest stored row, so that is the one kept
+DELETE FROM tradelines t
+USING tradelines older
+WHERE t.user_id = older.user_id
+  AND t.credit_bureau = older.credit_bureau
+  AND normalize_creditor_name(t.creditor_name) = normalize_creditor_name(older.creditor_name)
+  AND UPPER(get_account_first_4(t.account_number)) = UPPER(get_account_first_4(older.account_number))
+  AND BTRIM(t.date_opened) = BTRIM(older.date_opened)
+  AND (older.created_at, older.id::text) < (t.created_at, t.id::text)
+  AND t.user_id IS NOT NULL
+  AND t.creditor_name IS NOT NULL AND t.creditor_name != ''
+  AND t.credit_bureau IS NOT NULL AND t.credit_bureau != ''
+  AND t.date_opened IS NOT NULL AND t.date_opened != ''
+  AND older.creditor_name != '' AND older.credit_bureau != '' AND older.date_opened != '';
+
+-- Recreate the unique index on the normalized key
+DROP INDEX IF EXISTS unique_tradeline_per_bureau_detailed;
+
+CREATE UNIQUE INDEX unique_tradeline_per_bureau_detailed
+ON tradelines (
+  user_id,
+  normalize_creditor_name(creditor_name),
+  UPPER(get_account_first_4(account_number)),
+  BTRIM(date_opened),
+  credit_bureau
+)
+WHERE user_id IS NOT NULL
+  AND creditor_name IS NOT NULL
+  AND creditor_name != ''
+  AND credit_bureau IS NOT NULL
+  AND credit_bureau != ''
+  AND date_opened IS NOT NULL
+  AND date_opened != '';
+
+COMMENT ON INDEX unique_tradeline_per_bureau_detailed IS
+'Ensures one tradeline per user per credit bureau based on: creditor_name (case and whitespace insensitive), first 4 characters of account_number (case insensitive), and date_opened';
+
+COMMENT ON FUNCTION normalize_creditor_name(TEXT) IS
+'Upper-cases a creditor name and collapses its whitespace for duplicate detection';